@@ -0,0 +1,365 @@
+"""
+游戏图标缓存 - 英雄、物品、召唤师技能和召唤师头像图标
+
+图标优先从本地客户端的游戏资源接口（/lol-game-data/assets）获取，未连接客户端或客户端没有该资源时
+从CommunityDragon获取同一路径的文件。图片按内容的SHA-256保存在磁盘上（内容相同的图标只保存一份），
+SQLite中记录每个图标对应的内容，之后的请求直接从磁盘返回，不再经过网络。
+连接到新版本的客户端时在后台预取该版本全部英雄、物品和召唤师技能图标。
+获取失败的图标和资源目录在一段时间内不再重试（未打开客户端时避免每个图标都扫描进程、访问CommunityDragon），
+同时到达的相同请求只获取一次。
+"""
+
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from lcu import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 图标类型: (资源目录路径, 目录中的图标路径字段, 不查目录时直接使用的图标路径)
+ASSET_KINDS = {
+    'champion': ('/lol-game-data/assets/v1/champion-summary.json', 'squarePortraitPath',
+                 '/lol-game-data/assets/v1/champion-icons/{id}.png'),
+    'item': ('/lol-game-data/assets/v1/items.json', 'iconPath', None),
+    'spell': ('/lol-game-data/assets/v1/summoner-spells.json', 'iconPath', None),
+    'profileicon': (None, None, '/lol-game-data/assets/v1/profile-icons/{id}.jpg'),
+}
+
+# 后台预取的类型（召唤师头像有数千个，只按需获取）
+PREWARM_KINDS = ('champion', 'item', 'spell')
+
+# 预取的并发数（与界面请求共用LCU连接池，不宜过大）
+PREWARM_WORKERS = 4
+
+# 检查客户端版本是否变化的最短间隔（秒）
+BUILD_CHECK_SECONDS = 60
+
+# 获取失败的图标和资源目录在这段时间内直接返回找不到（秒），以及最多记录的失败图标数量
+MISS_TTL_SECONDS = 60
+MAX_MISSING_ENTRIES = 4096
+
+# 本地客户端的资源路径前缀，及CommunityDragon上对应的地址（路径为小写）
+LCU_ASSET_PREFIX = '/lol-game-data/assets/'
+REMOTE_ASSET_BASE = 'https://raw.communitydragon.org/latest/plugins/rcp-be-lol-game-data/global/default/'
+REMOTE_TIMEOUT = (3, 10)
+
+# 图片类型对应的文件扩展名
+EXTENSIONS = {'image/png': '.png', 'image/jpeg': '.jpg', 'image/webp': '.webp'}
+
+
+class Asset:
+    """已缓存的图标"""
+
+    __slots__ = ('path', 'content_type', 'digest')
+
+    def __init__(self, path, content_type, digest):
+        self.path = path
+        self.content_type = content_type
+        self.digest = digest
+
+
+class AssetCache:
+    """图标磁盘缓存"""
+
+    def __init__(self, directory, fetch_local, client_build):
+        """初始化缓存
+
+        Args:
+            directory: 缓存目录（其中的index.db为索引，blobs为图片文件）
+            fetch_local: 从本地客户端获取资源的函数 fetch_local(path, background)，返回 (内容, Content-Type)，
+                资源不存在时返回None，未连接客户端等情况抛出异常；预取时background为True
+            client_build: 获取当前客户端版本号的函数，未连接客户端时返回None
+        """
+        self.directory = directory
+        self._fetch_local = fetch_local
+        self._client_build = client_build
+        self._lock = threading.Lock()
+        self._entries = {}   # "类型/ID" -> Asset
+        self._catalogs = {}  # 类型 -> {ID: 图标路径}
+        self._missing = {}   # "类型/ID" -> 可以重试的时间（time.monotonic）
+        self._catalog_retry = {}  # 类型 -> 资源目录可以重试的时间
+        self._flights = SingleFlight()
+        self._remote = requests.Session()
+        self._next_build_check = 0.0
+        self._prewarm = {"build": None, "running": False, "done": 0, "total": 0, "failed": 0}
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.local_downloads = 0
+        self.remote_downloads = 0
+        self.failures = 0
+
+        os.makedirs(os.path.join(directory, 'blobs'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS assets (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                source TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS prewarmed_builds (
+                build TEXT PRIMARY KEY,
+                assets INTEGER NOT NULL,
+                finished_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+        for key, digest, content_type in self._db.execute("SELECT key, digest, content_type FROM assets"):
+            self._entries[key] = Asset(self._blob_path(digest, content_type), content_type, digest)
+
+    def get(self, kind, asset_id):
+        """获取图标，本地没有时下载并保存
+
+        Args:
+            kind: 图标类型（ASSET_KINDS中的键）
+            asset_id: 英雄、物品、召唤师技能或头像ID
+
+        Returns:
+            Asset: 缓存的图标，找不到时返回None
+        """
+        key = f"{kind}/{asset_id}"
+        with self._lock:
+            asset = self._entries.get(key)
+        if asset is not None and os.path.exists(asset.path):
+            with self._lock:
+                self.hits += 1
+            return asset
+
+        with self._lock:
+            if self._missing.get(key, 0) > time.monotonic():
+                self.negative_hits += 1
+                return None
+            self.misses += 1
+        asset = self._flights.do(key, lambda: self._download(kind, asset_id))
+        if asset is None:
+            with self._lock:
+                self._remember_missing(key)
+        return asset
+
+    def maybe_prewarm(self):
+        """客户端版本与上次预取时不同时，在后台预取该版本的图标（最多每BUILD_CHECK_SECONDS检查一次）"""
+        now = time.monotonic()
+        if now < self._next_build_check or self._prewarm["running"]:
+            return
+        self._next_build_check = now + BUILD_CHECK_SECONDS
+
+        try:
+            build = self._client_build()
+        except Exception as e:
+            logger.debug(f"获取客户端版本失败: {str(e)}")
+            return
+        if build is None:
+            return
+        with self._lock:
+            done = self._db.execute("SELECT 1 FROM prewarmed_builds WHERE build = ?", (build,)).fetchone()
+        if not done:
+            self.prewarm(build)
+
+    def prewarm(self, build=None):
+        """在后台重新下载所有英雄、物品和召唤师技能图标
+
+        Args:
+            build: 客户端版本号，完成后记录为已预取
+
+        Returns:
+            bool: 是否开始预取（已有预取在进行时返回False）
+        """
+        with self._lock:
+            if self._prewarm["running"]:
+                return False
+            self._prewarm = {"build": build, "running": True, "done": 0, "total": 0, "failed": 0}
+        threading.Thread(target=self._run_prewarm, args=(build,), name='asset-prewarm', daemon=True).start()
+        return True
+
+    def stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            blobs = {asset.path for asset in self._entries.values()}
+            stats = {
+                "entries": len(self._entries),
+                "blobs": len(blobs),
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "missing": len(self._missing),
+                "local_downloads": self.local_downloads,
+                "remote_downloads": self.remote_downloads,
+                "failures": self.failures,
+                "prewarm": dict(self._prewarm),
+            }
+        # 文件大小在锁外统计，避免阻塞图标请求
+        stats["bytes"] = sum(os.path.getsize(path) for path in blobs if os.path.exists(path))
+        return stats
+
+    def _run_prewarm(self, build):
+        start = time.perf_counter()
+        try:
+            targets = []
+            for kind in PREWARM_KINDS:
+                catalog = self._catalog(kind, refresh=True, background=True)
+                targets.extend((kind, asset_id) for asset_id in sorted(catalog))
+            with self._lock:
+                self._prewarm["total"] = len(targets)
+
+            # 新版本可能更换了同一ID的图标，全部重新下载；内容未变的图标不会重复写入
+            with ThreadPoolExecutor(max_workers=PREWARM_WORKERS, thread_name_prefix='asset-prewarm') as executor:
+                for asset in executor.map(lambda target: self._download(*target, background=True), targets):
+                    with self._lock:
+                        self._prewarm["done"] += 1
+                        if asset is None:
+                            self._prewarm["failed"] += 1
+
+            if build is not None and targets:
+                with self._lock:
+                    self._db.execute("INSERT OR REPLACE INTO prewarmed_builds (build, assets, finished_at) "
+                                     "VALUES (?, ?, ?)", (build, len(targets), time.time()))
+                    self._db.commit()
+            logger.info(f"图标预取完成（客户端 {build}）: {len(targets)} 个，失败 {self._prewarm['failed']} 个，"
+                        f"耗时 {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"预取图标时出错: {str(e)}")
+        finally:
+            with self._lock:
+                self._prewarm["running"] = False
+
+    def _download(self, kind, asset_id, background=False):
+        """下载图标并保存，返回Asset，找不到时返回None"""
+        try:
+            path = self._icon_path(kind, asset_id, background)
+            result = self._fetch(path, background) if path else None
+        except Exception as e:
+            logger.warning(f"获取图标 {kind}/{asset_id} 时出错: {str(e)}")
+            result = None
+        if result is None:
+            with self._lock:
+                self.failures += 1
+            return None
+
+        content, content_type, source = result
+        return self._store(f"{kind}/{asset_id}", content, content_type, source)
+
+    def _icon_path(self, kind, asset_id, background=False):
+        """图标在本地客户端中的资源路径，资源目录中没有该ID时返回None"""
+        _, _, template = ASSET_KINDS[kind]
+        if template:
+            return template.format(id=asset_id)
+        return self._catalog(kind, background=background).get(asset_id)
+
+    def _catalog(self, kind, refresh=False, background=False):
+        """获取资源目录 {ID: 图标路径}（每个客户端版本加载一次，获取失败后MISS_TTL_SECONDS内不再重试）"""
+        with self._lock:
+            catalog = self._catalogs.get(kind)
+            retry_at = self._catalog_retry.get(kind, 0)
+        if not refresh and (catalog is not None or retry_at > time.monotonic()):
+            return catalog or {}
+        # 同时缺少同一目录的图标请求只下载一次目录
+        return self._flights.do(('catalog', kind, refresh), lambda: self._load_catalog(kind, refresh, background))
+
+    def _load_catalog(self, kind, refresh, background):
+        with self._lock:
+            catalog = self._catalogs.get(kind)
+        if catalog is not None and not refresh:
+            return catalog
+
+        catalog_path, field, template = ASSET_KINDS[kind]
+        try:
+            result = self._fetch(catalog_path, background)
+        except Exception as e:
+            logger.warning(f"获取资源目录 {kind} 时出错: {str(e)}")
+            result = None
+        if result is None:
+            with self._lock:
+                self._catalog_retry[kind] = time.monotonic() + MISS_TTL_SECONDS
+            return catalog or {}
+
+        catalog = {}
+        for entry in json.loads(result[0]):
+            asset_id = entry.get("id")
+            # 英雄目录中有id为-1的占位项
+            if isinstance(asset_id, int) and asset_id >= 0 and (entry.get(field) or template):
+                catalog[asset_id] = entry.get(field) or template.format(id=asset_id)
+        with self._lock:
+            self._catalogs[kind] = catalog
+            self._catalog_retry.pop(kind, None)
+        return catalog
+
+    def _fetch(self, path, background=False):
+        """先从本地客户端、再从CommunityDragon获取资源
+
+        Args:
+            path: 本地客户端中的资源路径
+            background: 是否为后台预取
+
+        Returns:
+            tuple: (内容, Content-Type, 来源)，都找不到时返回None
+        """
+        try:
+            result = self._fetch_local(path, background)
+            if result is not None:
+                with self._lock:
+                    self.local_downloads += 1
+                content, content_type = result
+                return content, content_type or _guess_type(path), 'lcu'
+        except Exception as e:
+            logger.debug(f"从客户端获取 {path} 失败: {str(e)}")
+
+        if not path.startswith(LCU_ASSET_PREFIX):
+            return None
+        response = self._remote.get(REMOTE_ASSET_BASE + path[len(LCU_ASSET_PREFIX):].lower(), timeout=REMOTE_TIMEOUT)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        with self._lock:
+            self.remote_downloads += 1
+        return response.content, response.headers.get('Content-Type') or _guess_type(path), 'remote'
+
+    def _store(self, key, content, content_type, source):
+        """按内容哈希保存图片（先写临时文件再替换，中断时不会留下不完整的文件）"""
+        content_type = content_type.split(';', 1)[0].strip()
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest, content_type)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+
+        asset = Asset(path, content_type, digest)
+        with self._lock:
+            self._entries[key] = asset
+            self._missing.pop(key, None)
+            self._db.execute("INSERT OR REPLACE INTO assets (key, digest, content_type, source, updated_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (key, digest, content_type, source, time.time()))
+            self._db.commit()
+        return asset
+
+    def _remember_missing(self, key):
+        """记录获取失败的图标（调用方需持有锁），超出数量上限时先清理已过期的记录"""
+        now = time.monotonic()
+        if len(self._missing) >= MAX_MISSING_ENTRIES:
+            self._missing = {k: retry_at for k, retry_at in self._missing.items() if retry_at > now}
+            if len(self._missing) >= MAX_MISSING_ENTRIES:
+                self._missing.clear()
+        self._missing[key] = now + MISS_TTL_SECONDS
+
+    def _blob_path(self, digest, content_type):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest + EXTENSIONS.get(content_type, ''))
+
+
+def _guess_type(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
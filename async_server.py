@@ -0,0 +1,578 @@
+"""
+异步服务模式 - 基于aiohttp提供与Flask相同的 /api/* 接口
+
+所有LCU请求在同一个事件循环上通过带连接池的aiohttp客户端并发执行，
+不会像Werkzeug开发服务器那样为每个等待LCU响应的请求占用一个线程。
+未在此实现的接口会转交给Flask应用处理。
+
+需要额外安装aiohttp: pip install aiohttp
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import queue
+import time
+
+from requests import HTTPError
+
+from fast_json import dumps, loads, raw_json, serialization
+from horse_rank import horse_ranks
+from lcu import (BACKGROUND, BUILD_INFO_PATH, INTERACTIVE, MAX_RETRIES, POOL_SIZE, PRIORITY_HEADER, REQUEST_TIMEOUT,
+                 TRANSIENT_STATUSES, LCUNotConnectedError, credentials, endpoints, flights, governor, request_key,
+                 request_priority)
+from lcu_events import events
+from metrics import HTTP_LATENCY, LCU_LATENCY, PHASE_LATENCY, metrics, upstream_path
+from profiling import PROFILE_FILE_HEADER, profiler
+from projection import DETAIL_VIEWS, HISTORY_VIEWS, project_detail, project_history
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:  # 可选依赖
+    aiohttp = None
+    web = None
+
+logger = logging.getLogger(__name__)
+
+# 批量获取对局详情时的并发数，与Flask模式保持一致
+MATCH_DETAIL_CONCURRENCY = 4
+MAX_BATCH_SIZE = 20
+
+# 超过该大小的JSON响应才压缩（字节）
+COMPRESS_MIN_BYTES = 1024
+
+# 当前请求的接口名（处理函数名，与Flask的endpoint一致），用于统计序列化耗时
+_endpoint = contextvars.ContextVar('endpoint', default=None)
+
+# 事件推送保活间隔（秒）
+EVENT_KEEPALIVE_SECONDS = 15
+
+
+def json_response(data, status=200):
+    """编码JSON响应并记录序列化耗时"""
+    start = time.perf_counter()
+    body = dumps(data)
+    serialization.record(_endpoint.get(), time.perf_counter() - start, len(body))
+    return web.Response(body=body, status=status, content_type='application/json')
+
+
+class AsyncLCUClient:
+    """异步LCU客户端
+
+    复用同一个aiohttp.ClientSession，端口或令牌变化时重建。
+    """
+
+    def __init__(self, pool_size=POOL_SIZE * 4):
+        self._pool_size = pool_size
+        self._session = None
+        self._key = None
+        self._lock = asyncio.Lock()
+        self._in_flight = {}  # 请求标识 -> 进行中的任务
+
+    async def get(self, path, params=None, raw=False):
+        """向LCU发送GET请求
+
+        并发的相同请求只发送一次，共享同一个结果。
+        请求与同步客户端共用governor的并发上限和优先级排队；
+        遇到429/502/503/504时退避后重试，遇到401或连接被拒绝时使凭据失效并重新扫描一次。
+
+        Args:
+            path: LCU API路径
+            params: 查询参数
+            raw: 成功时返回原始字节串而不解析JSON
+
+        Returns:
+            tuple: (状态码, 解析后的JSON（raw时为原始字节串）或原始文本)
+
+        Raises:
+            LCUNotConnectedError: 找不到客户端
+        """
+        key = (request_key(path, params), raw)
+        task = self._in_flight.get(key)
+        flights.record(shared=task is not None)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._get(path, params, raw))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # 某个调用方被取消（例如前端断开）时不影响共享同一请求的其他调用方
+        return await asyncio.shield(task)
+
+    async def _get(self, path, params, raw):
+        loop = asyncio.get_running_loop()
+        priority = request_priority.get()
+        label = upstream_path(path)
+        retries = 0
+        reconnected = False
+        while True:
+            # 凭据校验可能触发进程扫描，放到线程池中执行
+            port, token = await loop.run_in_executor(None, credentials.get)
+            if not port:
+                raise LCUNotConnectedError("未连接到英雄联盟客户端")
+
+            session = await self._get_session(port, token)
+            await governor.acquire_async(priority)
+            start = time.perf_counter()
+            try:
+                async with session.get(f"https://127.0.0.1:{port}{path}", params=params) as response:
+                    if response.status == 200:
+                        body = await (response.read() if raw else response.json(content_type=None, loads=loads))
+                    else:
+                        body = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                elapsed = time.perf_counter() - start
+                governor.release(elapsed, label, overloaded=isinstance(e, asyncio.TimeoutError))
+                metrics.observe(LCU_LATENCY, elapsed, label, type(e).__name__)
+                if not isinstance(e, aiohttp.ClientConnectorError) or reconnected:
+                    raise
+                credentials.invalidate("连接被拒绝")
+                reconnected = True
+                continue
+            except BaseException:
+                # 调用方被取消等情况，归还名额但不计入上限调整
+                governor.release()
+                raise
+
+            elapsed = time.perf_counter() - start
+            governor.release(elapsed, label, overloaded=response.status in TRANSIENT_STATUSES)
+            metrics.observe(LCU_LATENCY, elapsed, label, response.status)
+            if response.status == 401 and not reconnected:
+                credentials.invalidate("LCU返回401")
+                reconnected = True
+                continue
+            if response.status in TRANSIENT_STATUSES and retries < MAX_RETRIES:
+                delay = governor.retry_delay(retries, response.headers.get('Retry-After'))
+                logger.info(f"LCU返回{response.status}，{delay:.2f}秒后重试: {path}")
+                await asyncio.sleep(delay)
+                retries += 1
+                continue
+            return response.status, body
+
+    async def get_any(self, name, paths, params=None):
+        """按接口解析器的记录请求接口，版本未知时并发请求所有候选路径（与lcu.EndpointResolver共用记录）
+
+        Args:
+            name: 接口名
+            paths: 候选路径列表，按优先级排序
+            params: 查询参数
+
+        Returns:
+            tuple: (成功的响应内容或None, 各候选路径的状态码列表)
+        """
+        port, _ = await asyncio.get_running_loop().run_in_executor(None, credentials.get)
+        if not port:
+            raise LCUNotConnectedError("未连接到英雄联盟客户端")
+        build = await self._client_build(port)
+        statuses = [None] * len(paths)
+
+        index = endpoints.preferred(build, name)
+        if index is not None:
+            endpoints.count(name, 'direct')
+            statuses[index], body = await self.get(paths[index], params)
+            if statuses[index] == 200:
+                return body, statuses
+            kind = 'fallback'
+        else:
+            kind = 'race'
+        endpoints.count(name, kind)
+        start = time.perf_counter()
+
+        async def attempt(i):
+            return i, await self.get(paths[i], params)
+
+        pending = {asyncio.ensure_future(attempt(i)) for i in range(len(paths)) if statuses[i] is None}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        if isinstance(task.exception(), LCUNotConnectedError):
+                            raise task.exception()
+                        continue
+                    i, (status, body) = task.result()
+                    statuses[i] = status
+                    if status == 200:
+                        endpoints.record(build, name, i)
+                        return body, statuses
+        finally:
+            for task in pending:
+                task.cancel()
+            metrics.observe(PHASE_LATENCY, time.perf_counter() - start, f"endpoint_{kind}")
+        return None, statuses
+
+    async def _client_build(self, port):
+        build = endpoints.known_build(port)
+        if build is None:
+            build = f"port-{port}"
+            try:
+                status, body = await self.get(BUILD_INFO_PATH)
+                if status == 200:
+                    build = body.get("version") or build
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            endpoints.remember_build(port, build)
+        return build
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self, port, token):
+        async with self._lock:
+            if self._session is None or self._key != (port, token):
+                if self._session is not None:
+                    await self._session.close()
+                connect_timeout, read_timeout = REQUEST_TIMEOUT
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=self._pool_size, ssl=False),
+                    auth=aiohttp.BasicAuth('riot', token),
+                    timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+                    headers={'Accept': 'application/json'},
+                )
+                self._key = (port, token)
+                logger.info(f"已为端口 {port} 建立异步LCU会话")
+            return self._session
+
+
+def create_app(flask_app, match_cache, history_store, player_index, match_columns, web_root):
+    """创建aiohttp应用
+
+    Args:
+        flask_app: Flask应用，未实现的接口转交给它处理
+        match_cache: 对局详情缓存
+        history_store: 战绩列表存储
+        player_index: 玩家汇总统计
+        match_columns: 对局列式存储
+        web_root: 静态文件目录
+
+    Returns:
+        web.Application: aiohttp应用
+    """
+    lcu = AsyncLCUClient()
+    flask_client = flask_app.test_client()
+    routes = web.RouteTableDef()
+
+    def not_connected():
+        return json_response({"status": "error", "message": "未连接到英雄联盟客户端"})
+
+    async def fetch_match_detail(match_id):
+        loop = asyncio.get_running_loop()
+        try:
+            cached = await loop.run_in_executor(None, match_cache.get, match_id)
+            if cached is not None:
+                return {"status": "success", "data": cached, "source": "cache"}
+
+            body, statuses = await lcu.get_any("match_detail", [
+                f"/lol-match-history/v1/games/{match_id}",
+                f"/lol-match-history/v1/match-details/{match_id}",
+            ])
+            if body is None:
+                logger.error(f"获取对局详情失败，状态码: {statuses}")
+                return {
+                    "status": "error",
+                    "message": f"获取对局详情失败，状态码: {statuses[0]}, 备用API状态码: {statuses[1]}"
+                }
+
+            await loop.run_in_executor(None, match_cache.put, match_id, body)
+            return {"status": "success", "data": body, "source": "api"}
+        except LCUNotConnectedError:
+            return {"status": "error", "message": "未连接到英雄联盟客户端"}
+        except Exception as e:
+            logger.error(f"获取对局详情时出错: {str(e)}")
+            return {"status": "error", "message": f"获取对局详情时出错: {str(e)}"}
+
+    async def enrich_match_details(results, view='full'):
+        # 马种评分在内存中计算，汇总统计需要写SQLite，放到线程池执行；列式存储只是放入后台写入队列；
+        # 评分和汇总需要完整数据，最后再裁剪
+        horse_ranks.annotate(results)
+        await asyncio.get_running_loop().run_in_executor(None, player_index.ingest_results, results)
+        match_columns.ingest_results(results)
+        for result in results:
+            if result["status"] == "success":
+                result["data"] = project_detail(result["data"], view)
+
+    @routes.get('/')
+    async def index(request):
+        return web.FileResponse(f"{web_root}/index.html")
+
+    @routes.get('/api/check_lcu_connection')
+    async def check_lcu_connection(request):
+        loop = asyncio.get_running_loop()
+        try:
+            port, token = await loop.run_in_executor(None, credentials.get)
+            if port and token:
+                return json_response({"status": "connected", "port": port, "token": token, "message": "连接成功",
+                                          "credential_cache": credentials.stats()})
+            return json_response({"status": "disconnected", "message": "英雄联盟客户端连接失败 ",
+                                      "credential_cache": credentials.stats()})
+        except Exception as e:
+            return json_response({"status": "error", "message": f"检查连接时出错: {str(e)}"})
+
+    @routes.get('/api/events')
+    async def lcu_event_stream(request):
+        if not events.available:
+            return json_response({"status": "error", "message": "未安装websocket-client，不支持事件推送"}, status=503)
+
+        events.start()
+        q = events.subscribe()
+        loop = asyncio.get_running_loop()
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        try:
+            while True:
+                try:
+                    event = await loop.run_in_executor(None, q.get, True, EVENT_KEEPALIVE_SECONDS)
+                    await response.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                except queue.Empty:
+                    await response.write(b": keep-alive\n\n")
+        except ConnectionResetError:
+            pass
+        finally:
+            events.unsubscribe(q)
+        return response
+
+    @routes.get('/api/get_current_summoner')
+    async def get_current_summoner(request):
+        try:
+            status, body = await lcu.get("/lol-summoner/v1/current-summoner", raw=True)
+            if status == 200:
+                return json_response({"status": "success", "data": raw_json(body)})
+            return json_response({
+                "status": "error",
+                "message": f"API请求失败，状态码: {status}",
+                "details": body
+            })
+        except LCUNotConnectedError:
+            return not_connected()
+        except Exception as e:
+            return json_response({"status": "error", "message": f"获取用户信息时出错: {str(e)}"})
+
+    @routes.get('/api/get_summoner_by_puuid')
+    async def get_summoner_by_puuid(request):
+        puuid = request.query.get('puuid')
+        if not puuid:
+            return json_response({"status": "error", "message": "缺少puuid参数"})
+
+        try:
+            status, body = await lcu.get(f"/lol-summoner/v2/summoners/puuid/{puuid}", raw=True)
+            if status == 200:
+                return json_response({"status": "success", "data": raw_json(body)})
+            logger.error(f"获取玩家信息失败，状态码: {status}")
+            return json_response({
+                "status": "error",
+                "message": f"获取玩家信息失败，状态码: {status}",
+                "details": body
+            })
+        except LCUNotConnectedError:
+            return not_connected()
+        except Exception as e:
+            logger.error(f"获取玩家信息时出错: {str(e)}")
+            return json_response({"status": "error", "message": f"获取玩家信息时出错: {str(e)}"})
+
+    @routes.get('/api/get_match_history')
+    async def get_match_history(request):
+        puuid = request.query.get('puuid')
+        view = request.query.get('view', 'full')
+        if view not in HISTORY_VIEWS:
+            return json_response({"status": "error", "message": f"不支持的视图: {view}"})
+        try:
+            begin_index = int(request.query.get('begin_index', 0))
+            end_index = int(request.query.get('end_index', 6))
+            # 存储使用同步的SQLite和LCU请求，放到线程池执行
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, history_store.get_window, puuid, begin_index, end_index)
+            return json_response({"status": "success", "data": project_history(data, view), "source": "store"})
+        except LCUNotConnectedError:
+            return not_connected()
+        except HTTPError as e:
+            return json_response({"status": "error", "data": None,
+                                      "message": f"API请求失败，状态码: {e.response.status_code}"})
+        except Exception as e:
+            logger.error(f"获取战绩时出错: {str(e)}")
+            return json_response({"status": "error", "data": None, "message": "获取战绩时出错啦"})
+
+    @routes.get('/api/get_match_detail')
+    async def get_match_detail(request):
+        match_id = request.query.get('match_id')
+        view = request.query.get('view', 'full')
+        if not match_id:
+            return json_response({"status": "error", "message": "缺少match_id参数"})
+        if view not in DETAIL_VIEWS:
+            return json_response({"status": "error", "message": f"不支持的视图: {view}"})
+        result = await fetch_match_detail(match_id)
+        await enrich_match_details([result], view)
+        return json_response(result)
+
+    @routes.get('/api/get_match_details')
+    async def get_match_details(request):
+        ids = [i.strip() for i in request.query.get('ids', '').split(',') if i.strip()]
+        view = request.query.get('view', 'full')
+        if not ids:
+            return json_response({"status": "error", "message": "缺少ids参数"})
+        if view not in DETAIL_VIEWS:
+            return json_response({"status": "error", "message": f"不支持的视图: {view}"})
+        if len(ids) > MAX_BATCH_SIZE:
+            return json_response({"status": "error", "message": f"一次最多获取{MAX_BATCH_SIZE}场对局"})
+        if not all(i.isdigit() for i in ids):
+            return json_response({"status": "error", "message": "ids参数格式错误"})
+
+        ids = list(dict.fromkeys(ids))
+        semaphore = asyncio.Semaphore(MATCH_DETAIL_CONCURRENCY)
+
+        async def bounded(match_id):
+            async with semaphore:
+                return match_id, await fetch_match_detail(match_id)
+
+        tasks = [asyncio.ensure_future(bounded(match_id)) for match_id in ids]
+
+        if request.query.get('stream') not in (None, '0'):
+            # 按完成顺序逐行返回（NDJSON）
+            response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await response.prepare(request)
+            for task in asyncio.as_completed(tasks):
+                match_id, result = await task
+                await enrich_match_details([result], view)
+                await response.write(dumps({"match_id": match_id, **result}) + b'\n')
+            await response.write_eof()
+            return response
+
+        results = dict(await asyncio.gather(*tasks))
+        await enrich_match_details(list(results.values()), view)
+        return json_response({"status": "success", "data": results})
+
+    @routes.get('/api/get_ranked_stats')
+    async def get_ranked_stats(request):
+        puuid = request.query.get('puuid')
+        if not puuid:
+            return json_response({"status": "error", "message": "缺少puuid参数"})
+
+        try:
+            body, statuses = await lcu.get_any("ranked_stats", [
+                f"/lol-ranked/v1/ranked-stats/{puuid}",
+                f"/lol-ranked/v1/ranked-stats-by-puuid/{puuid}",
+            ])
+            if body is not None:
+                return json_response({"status": "success", "data": body.get("queues", [])})
+
+            logger.error(f"获取排位数据失败，状态码: {statuses}")
+            return json_response({
+                "status": "error",
+                "message": f"获取排位数据失败，主API状态码: {statuses[0]}，备用API状态码: {statuses[1]}"
+            })
+        except LCUNotConnectedError:
+            return not_connected()
+        except Exception as e:
+            logger.error(f"获取排位数据时出错: {str(e)}")
+            return json_response({"status": "error", "message": f"获取排位数据时出错: {str(e)}"})
+
+    @routes.route('*', '/api/{tail:.*}')
+    async def flask_fallback(request):
+        # 其余接口（窗口控制、缓存管理等）交给Flask在线程池中处理
+        body = await request.read()
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(None, lambda: flask_client.open(
+            request.path,
+            method=request.method,
+            query_string=request.query_string,
+            data=body,
+            # 压缩由aiohttp中间件统一处理，Flask返回未压缩的内容
+            headers={k: v for k, v in request.headers.items() if k.lower() not in ('host', 'accept-encoding')},
+        ))
+        # 保留Flask设置的缓存相关响应头（ETag、Cache-Control等），长度和分块由aiohttp重新设置
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ('content-length', 'transfer-encoding', 'connection')}
+        return web.Response(body=response.get_data(), status=response.status_code, headers=headers)
+
+    async def on_cleanup(app):
+        await lcu.close()
+
+    @web.middleware
+    async def track_endpoint(request, handler):
+        name = getattr(request.match_info.handler, '__name__', None)
+        _endpoint.set(name)
+        request_priority.set(BACKGROUND if request.headers.get(PRIORITY_HEADER) == 'background' else INTERACTIVE)
+        # 转交给Flask的接口由Flask按实际的接口名记录
+        if name == 'flask_fallback':
+            return await handler(request)
+
+        start = time.perf_counter()
+        code = 500
+        try:
+            response = await handler(request)
+            code = response.status
+            return response
+        except web.HTTPException as e:
+            code = e.status
+            raise
+        finally:
+            resource = request.match_info.route.resource
+            route = 'static' if isinstance(resource, web.StaticResource) else name if resource else 'not_found'
+            metrics.observe(HTTP_LATENCY, time.perf_counter() - start, route, code)
+
+    @web.middleware
+    async def profile_request(request, handler):
+        # 事件循环是单线程的，分析期间同时在处理的其他请求也会计入结果
+        session = profiler.begin() if profiler.wanted(request.path, request.headers, request.query) else None
+        if session is None:
+            return await handler(request)
+        try:
+            response = await handler(request)
+        finally:
+            filename = profiler.finish(session, request.path)
+        response.headers[PROFILE_FILE_HEADER] = filename
+        return response
+
+    @web.middleware
+    async def compress_response(request, handler):
+        # 压缩较大的JSON响应（流式响应和静态文件不压缩）
+        response = await handler(request)
+        if (type(response) is web.Response and response.status == 200 and response.content_type == 'application/json'
+                and response.body is not None and len(response.body) >= COMPRESS_MIN_BYTES):
+            response.enable_compression()
+        return response
+
+    app = web.Application(middlewares=[profile_request, track_endpoint, compress_response])
+    app.add_routes(routes)
+    app.router.add_static('/', web_root)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run(flask_app, match_cache, history_store, player_index, match_columns, web_root, host='0.0.0.0', port=5000,
+        on_ready=None, sock=None):
+    """以异步模式启动服务
+
+    Args:
+        flask_app: Flask应用
+        match_cache: 对局详情缓存
+        history_store: 战绩列表存储
+        player_index: 玩家汇总统计
+        match_columns: 对局列式存储
+        web_root: 静态文件目录
+        host: 监听地址
+        port: 监听端口
+        on_ready: 开始监听后调用的函数 on_ready(port)，port为实际监听的端口
+        sock: 已绑定的监听套接字，指定时不再使用host和port
+    """
+    if aiohttp is None:
+        raise RuntimeError("异步模式需要安装aiohttp: pip install aiohttp")
+
+    async def serve():
+        runner = web.AppRunner(create_app(flask_app, match_cache, history_store, player_index, match_columns, web_root))
+        await runner.setup()
+        try:
+            site = web.SockSite(runner, sock) if sock is not None else web.TCPSite(runner, host, port)
+            await site.start()
+            bound_port = runner.addresses[0][1]
+            logger.info(f"以异步模式(aiohttp)启动服务: http://{host}:{bound_port}")
+            if on_ready is not None:
+                on_ready(bound_port)
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
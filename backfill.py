@@ -0,0 +1,413 @@
+"""
+全量战绩回填与导出 - 遍历玩家的全部战绩，并发获取对局详情，逐页写入NDJSON或列式文件
+
+整个流程由生成器串联：按页遍历战绩 → 每页并发获取详情 → 逐页写入文件，
+任意时刻内存中最多只有一页的对局，总场数再多内存占用也不会增长。
+每写完一页就把文件长度和遍历位置记录为检查点，中断（退出程序、客户端断开）后重新开始时
+先把文件截断到检查点，再从检查点继续，已写入的对局不会重复或缺失。
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from fast_json import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# 每页战绩数量：初始值和上下限。单页耗时低于目标的一半时加倍，超过目标时减半
+INITIAL_PAGE_SIZE = 20
+MIN_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 100
+TARGET_PAGE_SECONDS = 2.0
+
+# 获取一页战绩失败时的重试次数及首次重试前的等待时间（秒，之后每次加倍）
+MAX_PAGE_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 1.0
+
+# 获取对局详情的并发数
+DETAIL_WORKERS = 4
+
+# 同时运行的回填任务数
+MAX_RUNNING_JOBS = 2
+
+# 列式文件：文件头标记，之后每页一个行组（4字节长度 + zlib压缩的JSON {"rows": 行数, "columns": {列名: 值列表}}）
+COLUMNAR_MAGIC = b'JKCOL1\n'
+
+# 列式文件中每场对局的字段（均为被回填玩家的数据，team开头的为其所在队伍的合计）
+COLUMNS = (
+    'gameId', 'gameCreation', 'gameDuration', 'queueId', 'gameVersion',
+    'championId', 'teamId', 'win', 'kills', 'deaths', 'assists', 'cs', 'gold',
+    'damage', 'damageTaken', 'visionScore', 'champLevel', 'spell1Id', 'spell2Id', 'items',
+    'teamKills', 'teamDamage', 'horseRank', 'horseScore',
+)
+
+EXPORT_FORMATS = ('ndjson', 'columnar')
+
+
+class AdaptivePageSize:
+    """根据每页的获取耗时调整页大小：客户端响应快时每次多取，变慢或出错时少取"""
+
+    def __init__(self, size=INITIAL_PAGE_SIZE):
+        self.size = min(max(size, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+
+    def record(self, seconds):
+        """记录一次成功获取的耗时"""
+        if seconds < TARGET_PAGE_SECONDS / 2:
+            self.size = min(self.size * 2, MAX_PAGE_SIZE)
+        elif seconds > TARGET_PAGE_SECONDS:
+            self.size = max(self.size // 2, MIN_PAGE_SIZE)
+
+    def failed(self):
+        """记录一次失败"""
+        self.size = max(self.size // 2, MIN_PAGE_SIZE)
+
+
+class NDJSONWriter:
+    """每行一场对局：{"index": 序号（最新的对局为0）, "summary": 战绩列表中的对局, "detail": 对局详情, "horseRanks": 马种评分}"""
+
+    extension = 'ndjson'
+
+    def __init__(self, file, puuid):
+        self.file = file
+
+    def write_page(self, records):
+        self.file.write(b''.join(dumps(record) + b'\n' for record in records))
+
+
+class ColumnarWriter:
+    """列式文件，每页一个压缩的行组，读取见read_columnar"""
+
+    extension = 'jkc'
+
+    def __init__(self, file, puuid):
+        self.file = file
+        self.puuid = puuid
+        if file.tell() == 0:
+            file.write(COLUMNAR_MAGIC + dumps({"puuid": puuid, "columns": COLUMNS}) + b'\n')
+
+    def write_page(self, records):
+        rows = [_columnar_row(record, self.puuid) for record in records]
+        if not rows:
+            return
+        block = zlib.compress(dumps({"rows": len(rows),
+                                     "columns": {name: [row[i] for row in rows] for i, name in enumerate(COLUMNS)}}))
+        self.file.write(struct.pack('>I', len(block)) + block)
+
+
+WRITERS = {'ndjson': NDJSONWriter, 'columnar': ColumnarWriter}
+
+
+def read_columnar(path):
+    """逐行读取列式文件
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        generator: 每场对局一个dict（键为COLUMNS中的列名）
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"不是列式导出文件: {path}")
+        columns = loads(f.readline())["columns"]
+        while True:
+            prefix = f.read(4)
+            if len(prefix) < 4:
+                return
+            group = loads(zlib.decompress(f.read(struct.unpack('>I', prefix)[0])))
+            values = [group["columns"][name] for name in columns]
+            for i in range(group["rows"]):
+                yield {name: column[i] for name, column in zip(columns, values)}
+
+
+def _columnar_row(record, puuid):
+    """从对局详情（没有详情时从战绩列表中的对局）中取出被回填玩家的数据"""
+    detail = record.get("detail")
+    game = detail or record["summary"]
+    participant = None
+    if detail:
+        participant_id = next((identity.get("participantId") for identity in detail.get("participantIdentities", [])
+                               if (identity.get("player") or {}).get("puuid") == puuid), None)
+        participant = next((p for p in detail.get("participants", []) if p.get("participantId") == participant_id), None)
+    if participant is None:
+        participants = record["summary"].get("participants") or [{}]
+        participant = participants[0]
+
+    stats = participant.get("stats") or {}
+    team = [p.get("stats") or {} for p in (detail or {}).get("participants", [])
+            if p.get("teamId") == participant.get("teamId")]
+    rank = (record.get("horseRanks") or {}).get(str(participant.get("participantId"))) or {}
+    values = {
+        'gameId': game.get("gameId"),
+        'gameCreation': game.get("gameCreation"),
+        'gameDuration': game.get("gameDuration"),
+        'queueId': game.get("queueId"),
+        'gameVersion': game.get("gameVersion"),
+        'championId': participant.get("championId"),
+        'teamId': participant.get("teamId"),
+        'win': stats.get("win"),
+        'kills': stats.get("kills"),
+        'deaths': stats.get("deaths"),
+        'assists': stats.get("assists"),
+        'cs': (stats.get("totalMinionsKilled") or 0) + (stats.get("neutralMinionsKilled") or 0),
+        'gold': stats.get("goldEarned"),
+        'damage': stats.get("totalDamageDealtToChampions"),
+        'damageTaken': stats.get("totalDamageTaken"),
+        'visionScore': stats.get("visionScore"),
+        'champLevel': stats.get("champLevel"),
+        'spell1Id': participant.get("spell1Id"),
+        'spell2Id': participant.get("spell2Id"),
+        'items': [stats.get(f"item{i}", 0) for i in range(7)],
+        'teamKills': sum(s.get("kills") or 0 for s in team) if team else None,
+        'teamDamage': sum(s.get("totalDamageDealtToChampions") or 0 for s in team) if team else None,
+        'horseRank': rank.get("rank"),
+        'horseScore': rank.get("score"),
+    }
+    return [values[name] for name in COLUMNS]
+
+
+class BackfillManager:
+    """回填任务管理
+
+    每个玩家和导出格式对应一个任务，任务状态和检查点保存在SQLite中。
+    """
+
+    def __init__(self, db_path, export_dir, fetch_window, fetch_detail, on_details=None):
+        """初始化任务管理
+
+        Args:
+            db_path: SQLite数据库文件路径
+            export_dir: 导出文件目录
+            fetch_window: 获取战绩的函数 fetch_window(puuid, begin_index, end_index)，
+                返回对局列表（最新的在前），失败时抛出异常
+            fetch_detail: 获取对局详情的函数 fetch_detail(game_id)，返回 {"status", "data"/"message"}
+            on_details: 每页详情获取完成后调用 on_details(results)，用于附加马种评分、更新汇总统计
+        """
+        self.export_dir = export_dir
+        self._fetch_window = fetch_window
+        self._fetch_detail = fetch_detail
+        self._on_details = on_details
+        self._lock = threading.Lock()
+        self._running = {}  # job_id -> threading.Event（设置后停止）
+        self._executor = ThreadPoolExecutor(max_workers=DETAIL_WORKERS, thread_name_prefix='backfill-detail')
+
+        os.makedirs(export_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS backfill_jobs (
+                job_id TEXT PRIMARY KEY,
+                puuid TEXT NOT NULL,
+                format TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                next_index INTEGER NOT NULL DEFAULT 0,
+                games INTEGER NOT NULL DEFAULT 0,
+                failed_details INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                last_creation INTEGER,
+                last_game_id INTEGER,
+                page_size INTEGER NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        # 上次退出时仍在运行的任务可以从检查点继续
+        self._db.execute("UPDATE backfill_jobs SET status = 'interrupted' WHERE status = 'running'")
+        self._db.commit()
+
+    def start(self, puuid, export_format='ndjson', restart=False):
+        """开始或继续回填任务
+
+        Args:
+            puuid: 玩家PUUID
+            export_format: 导出格式（ndjson或columnar）
+            restart: 是否丢弃已有进度重新开始（已完成的任务需要重新开始才会包含之后的新对局）
+
+        Returns:
+            dict: 任务状态
+
+        Raises:
+            ValueError: 不支持的格式或同时运行的任务过多
+        """
+        if export_format not in WRITERS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+
+        job_id = f"{export_format}-{puuid}"
+        with self._lock:
+            if job_id in self._running:
+                return self._job(job_id)
+            if len(self._running) >= MAX_RUNNING_JOBS:
+                raise ValueError(f"最多同时运行{MAX_RUNNING_JOBS}个回填任务")
+
+            job = self._job(job_id)
+            if job is not None and job["status"] == 'completed' and not restart:
+                return job
+            if job is None or restart:
+                path = os.path.join(self.export_dir, f"{job_id}.{WRITERS[export_format].extension}")
+                now = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO backfill_jobs (job_id, puuid, format, path, status, page_size, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, 'running', ?, ?, ?)",
+                    (job_id, puuid, export_format, path, INITIAL_PAGE_SIZE, now, now))
+            else:
+                self._db.execute("UPDATE backfill_jobs SET status = 'running', error = NULL, updated_at = ? "
+                                 "WHERE job_id = ?", (time.time(), job_id))
+            self._db.commit()
+
+            stop = threading.Event()
+            self._running[job_id] = stop
+            job = self._job(job_id)
+
+        threading.Thread(target=self._run, args=(job, stop), name=f'backfill-{export_format}', daemon=True).start()
+        return job
+
+    def cancel(self, job_id):
+        """停止任务（写完当前页后停止，之后可以继续）
+
+        Returns:
+            bool: 任务是否正在运行
+        """
+        with self._lock:
+            stop = self._running.get(job_id)
+        if stop is None:
+            return False
+        stop.set()
+        return True
+
+    def jobs(self, job_id=None):
+        """获取任务状态
+
+        Args:
+            job_id: 任务ID，None表示所有任务
+
+        Returns:
+            list: 任务状态列表
+        """
+        with self._lock:
+            if job_id is not None:
+                job = self._job(job_id)
+                return [job] if job else []
+            return [dict(row) for row in self._db.execute("SELECT * FROM backfill_jobs ORDER BY updated_at DESC")]
+
+    def _job(self, job_id):
+        row = self._db.execute("SELECT * FROM backfill_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _run(self, job, stop):
+        job_id = job["job_id"]
+        start = time.perf_counter()
+        status, error = 'completed', None
+        try:
+            mode = 'r+b' if job["bytes"] and os.path.exists(job["path"]) else 'wb'
+            with open(job["path"], mode) as f:
+                # 丢弃检查点之后写入的不完整数据
+                f.truncate(job["bytes"])
+                f.seek(job["bytes"])
+                writer = WRITERS[job["format"]](f, job["puuid"])
+
+                for records, checkpoint in self._pipeline(job, stop):
+                    writer.write_page(records)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._checkpoint(job_id, bytes=f.tell(), **checkpoint)
+
+            if stop.is_set():
+                status = 'cancelled'
+        except Exception as e:
+            logger.error(f"回填任务 {job_id} 出错: {str(e)}")
+            status, error = 'failed', str(e)
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+                self._db.execute("UPDATE backfill_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                                 (status, error, time.time(), job_id))
+                self._db.commit()
+                job = self._job(job_id)
+            logger.info(f"回填任务 {job_id} {status}：共 {job['games']} 场，详情失败 {job['failed_details']} 场，"
+                        f"本次耗时 {time.perf_counter() - start:.1f}s")
+
+    def _pipeline(self, job, stop):
+        """遍历战绩并获取详情，每页产出 (记录列表, 检查点字段)"""
+        games_total = job["games"]
+        failed_total = job["failed_details"]
+        for index, games, checkpoint in self._pages(job, stop):
+            results = list(self._executor.map(lambda game: self._fetch_detail(game["gameId"]), games))
+            if self._on_details is not None:
+                self._on_details(results)
+
+            records = []
+            for offset, (game, result) in enumerate(zip(games, results)):
+                ok = result.get("status") == "success"
+                failed_total += not ok
+                records.append({
+                    "index": index + offset,
+                    "summary": game,
+                    "detail": result.get("data") if ok else None,
+                    "horseRanks": result.get("horseRanks"),
+                })
+            games_total += len(records)
+            yield records, {**checkpoint, "games": games_total, "failed_details": failed_total}
+
+    def _pages(self, job, stop):
+        """从检查点开始按页遍历战绩，产出 (首场的输出序号, 对局列表, 检查点字段)
+
+        遍历期间有新对局时索引会整体后移，按对局创建时间跳过已经写入的对局。
+        """
+        pager = AdaptivePageSize(job["page_size"])
+        begin = job["next_index"]
+        written = job["games"]
+        last = (job["last_creation"], job["last_game_id"]) if job["last_game_id"] is not None else None
+
+        while not stop.is_set():
+            games, requested = self._fetch_page(job["puuid"], begin, pager)
+            exhausted = len(games) < requested
+            begin += len(games)
+
+            if last is not None:
+                games = [game for game in games if (game.get("gameCreation", 0), game["gameId"]) < last]
+            if games:
+                last = (games[-1].get("gameCreation", 0), games[-1]["gameId"])
+                yield written, games, {"next_index": begin, "last_creation": last[0], "last_game_id": last[1],
+                                       "page_size": pager.size}
+                written += len(games)
+            if exhausted:
+                return
+
+    def _fetch_page(self, puuid, begin, pager):
+        """获取一页战绩，失败时缩小页大小后重试
+
+        Returns:
+            tuple: (对局列表, 请求的对局数)
+        """
+        for attempt in range(MAX_PAGE_RETRIES + 1):
+            end = begin + pager.size - 1
+            start = time.perf_counter()
+            try:
+                games = self._fetch_window(puuid, begin, end)
+            except Exception as e:
+                pager.failed()
+                if attempt == MAX_PAGE_RETRIES:
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                logger.warning(f"获取战绩 {begin}-{end} 失败，{delay:g}秒后重试: {str(e)}")
+                time.sleep(delay)
+                continue
+            pager.record(time.perf_counter() - start)
+            return games, end - begin + 1
+
+    def _checkpoint(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE backfill_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            self._db.commit()
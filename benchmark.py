@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测工具 - 对比不同后端服务（例如Flask模式与--async模式）的吞吐量和延迟
+
+用法示例：
+    python main.py --no-web                      # 端口5000，Flask模式
+    python benchmark.py --url http://127.0.0.1:5000 --path /api/get_current_summoner -c 32 -n 1000
+
+    # 压测套件：自动启动模拟LCU（mock_lcu.py）和后端，按前端实际的请求分布混合压测各接口
+    python benchmark.py --suite -c 16 -n 2000 --save baseline.json
+    python benchmark.py --suite --async --baseline baseline.json    # p95明显变慢时返回非0
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import mock_lcu
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s: %(message)s'
+)
+logger = logging.getLogger("benchmark")
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """计算百分位数
+
+    Args:
+        samples: 已排序的样本
+        p: 百分位（0-100）
+
+    Returns:
+        float: 对应百分位的值
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(p / 100 * len(samples))) - 1))
+    return samples[index]
+
+
+def timed_request(url: str, timeout: float) -> Tuple[float, bool]:
+    """发送一个GET请求
+
+    Returns:
+        Tuple[float, bool]: (耗时秒数, 是否成功)
+    """
+    # 与浏览器一样声明支持压缩，测到的是前端实际收到的响应
+    request = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip, deflate, br'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = response.status == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def summarize(results: List[Tuple[float, bool]], elapsed: float) -> Dict[str, float]:
+    """汇总一组请求的吞吐量和延迟
+
+    Args:
+        results: timed_request的结果列表
+        elapsed: 这组请求所在压测的总耗时（秒）
+
+    Returns:
+        Dict[str, float]: 吞吐量和延迟统计
+    """
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def run_load(url: str, concurrency: int, total: int, timeout: float) -> Dict[str, float]:
+    """以固定并发数向指定URL发送请求
+
+    Args:
+        url: 完整请求地址
+        concurrency: 并发数
+        total: 请求总数
+        timeout: 单个请求超时时间（秒）
+
+    Returns:
+        Dict[str, float]: 吞吐量和延迟统计
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: timed_request(url, timeout), range(total)))
+    return summarize(results, time.perf_counter() - started)
+
+
+class SuiteWorkload:
+    """压测套件的请求分布
+
+    按权重随机生成请求路径，比例大致对应前端的使用方式：连接检查和召唤师信息被频繁轮询，
+    战绩翻页和对局详情是主要负载，英雄选择时一次性获取所有玩家。
+    PUUID和gameId取自模拟LCU的确定性数据，不需要先请求一遍。
+    """
+
+    # 战绩翻页的页大小和最多翻到的页数
+    PAGE_SIZE = 7
+    MAX_PAGES = 6
+
+    def __init__(self, games_per_player: int, seed: int = 0):
+        self.data = mock_lcu.MockData(games_per_player)
+        self.rng = random.Random(seed)
+        self.scenarios: List[Tuple[str, int, Callable[[], str]]] = [
+            ('check_lcu_connection', 10, lambda: '/api/check_lcu_connection'),
+            ('get_current_summoner', 10, lambda: '/api/get_current_summoner'),
+            ('get_summoner_by_puuid', 10, lambda: f'/api/get_summoner_by_puuid?puuid={self.puuid()}'),
+            ('get_ranked_stats', 10, lambda: f'/api/get_ranked_stats?puuid={self.puuid()}'),
+            ('get_match_history', 20, self.match_history),
+            ('get_match_details', 15, self.match_details),
+            ('get_match_detail', 10, lambda: f'/api/get_match_detail?match_id={self.game_id()}&view=summary'),
+            ('get_player_summary', 5, lambda: f'/api/get_player_summary?puuid={self.puuid()}'),
+            ('lobby_snapshot', 5, lambda: '/api/lobby_snapshot'),
+        ]
+        self.weights = [weight for _, weight, _ in self.scenarios]
+
+    def puuid(self) -> str:
+        return self.rng.choice(mock_lcu.LOBBY_PUUIDS)
+
+    def page(self) -> int:
+        return self.rng.randrange(self.MAX_PAGES)
+
+    def game_id(self) -> int:
+        return self.data.game_id(self.puuid(), self.rng.randrange(self.PAGE_SIZE * self.MAX_PAGES))
+
+    def match_history(self) -> str:
+        begin = self.page() * self.PAGE_SIZE
+        return (f'/api/get_match_history?puuid={self.puuid()}'
+                f'&begin_index={begin}&end_index={begin + self.PAGE_SIZE - 1}&view=list')
+
+    def match_details(self) -> str:
+        # 前端渲染一页战绩后批量获取这一页的对局详情
+        puuid, begin = self.puuid(), self.page() * self.PAGE_SIZE
+        ids = ','.join(str(self.data.game_id(puuid, index)) for index in range(begin, begin + self.PAGE_SIZE))
+        return f'/api/get_match_details?ids={ids}&view=summary'
+
+    def requests(self, total: int) -> List[Tuple[str, str]]:
+        """生成total个 (接口名, 路径)"""
+        chosen = self.rng.choices(self.scenarios, weights=self.weights, k=total)
+        return [(name, make_path()) for name, _, make_path in chosen]
+
+
+def run_mixed_load(base_url: str, requests: List[Tuple[str, str]], concurrency: int,
+                   timeout: float) -> Dict[str, Dict[str, float]]:
+    """以固定并发数混合发送请求，按接口分别统计
+
+    Returns:
+        Dict[str, Dict[str, float]]: 接口名 -> 统计，另有"total"为全部请求的统计
+    """
+    def one_request(item):
+        name, path = item
+        return name, timed_request(base_url + path, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one_request, requests))
+    elapsed = time.perf_counter() - started
+
+    by_endpoint: Dict[str, List[Tuple[float, bool]]] = {}
+    for name, result in results:
+        by_endpoint.setdefault(name, []).append(result)
+
+    report = {name: summarize(samples, elapsed) for name, samples in sorted(by_endpoint.items())}
+    report["total"] = summarize([result for _, result in results], elapsed)
+    return report
+
+
+def wait_until(check: Callable[[], bool], timeout: float, what: str) -> None:
+    """轮询直到check返回True
+
+    Raises:
+        TimeoutError: 超时仍未就绪
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{what}在{timeout:.0f}秒内未就绪")
+
+
+def fetch_json(url: str, timeout: float = 5) -> dict:
+    # 模拟LCU使用自签名证书
+    context = ssl._create_unverified_context()
+    with urllib.request.urlopen(url, timeout=timeout, context=context) as response:
+        return json.loads(response.read())
+
+
+def compare_with_baseline(report: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                          threshold: float, min_delta_ms: float) -> List[str]:
+    """对比基线，找出p95明显变慢的接口
+
+    Args:
+        report: 本次结果
+        baseline: 基线结果（--save保存的文件）
+        threshold: 允许的相对增幅，例如0.2表示20%
+        min_delta_ms: 绝对增幅小于该值时视为噪声
+
+    Returns:
+        List[str]: 变慢的接口说明
+    """
+    regressions = []
+    for name, stats in report.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        delta = stats["p95_ms"] - base["p95_ms"]
+        if delta > min_delta_ms and stats["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.1f}ms -> {stats['p95_ms']:.1f}ms")
+    return regressions
+
+
+def run_suite(args: argparse.Namespace) -> int:
+    """启动模拟LCU和后端，运行混合压测并输出各接口的延迟分布
+
+    Returns:
+        int: 程序退出状态码，0表示成功，非0表示有非预期的失败请求或性能回退
+    """
+    processes: List[subprocess.Popen] = []
+    data_dir = tempfile.mkdtemp(prefix='jk-benchmark-')
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    mock_url = f"https://127.0.0.1:{args.mock_port}"
+
+    try:
+        if not args.no_mock:
+            processes.append(mock_lcu.spawn_fake_client(
+                mock_lcu.config_arguments(args), args.mock_port, mock_lcu.DEFAULT_TOKEN,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            wait_until(lambda: fetch_json(f"{mock_url}/mock/v1/stats") is not None, 15, "模拟LCU")
+
+        if args.url:
+            base_url = args.url[0].rstrip('/')
+        else:
+            # 使用空的数据目录启动后端，每次压测都从冷缓存开始
+            command = [sys.executable, os.path.join(base_dir, 'main.py'), '--no-web', '--port', str(args.port)]
+            if args.use_async:
+                command.append('--async')
+            processes.append(subprocess.Popen(command, cwd=base_dir, env={**os.environ, 'JK_DATA_DIR': data_dir},
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            base_url = f"http://127.0.0.1:{args.port}"
+
+        wait_until(lambda: fetch_json(f"{base_url}/api/check_lcu_connection")["status"] == 'connected', 30, "后端")
+
+        workload = SuiteWorkload(args.games, args.seed)
+        if args.warmup:
+            logger.info(f"预热 {args.warmup} 个请求...")
+            run_mixed_load(base_url, workload.requests(args.warmup), args.concurrency, args.timeout)
+
+        upstream_before = fetch_json(f"{mock_url}/mock/v1/stats")["total"] if not args.no_mock else None
+        report = run_mixed_load(base_url, workload.requests(args.requests), args.concurrency, args.timeout)
+
+        logger.info(f"{'接口':<24} {'请求数':>7} {'req/s':>9} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'错误':>6}")
+        for name, stats in report.items():
+            logger.info(
+                f"{name:<24} {stats['requests']:>7} {stats['rps']:>9.1f} {stats['mean_ms']:>6.1f}ms "
+                f"{stats['p50_ms']:>6.1f}ms {stats['p95_ms']:>6.1f}ms {stats['p99_ms']:>6.1f}ms {stats['errors']:>6}"
+            )
+        if upstream_before is not None:
+            upstream = fetch_json(f"{mock_url}/mock/v1/stats")["total"] - upstream_before
+            logger.info(f"LCU请求数: {upstream}（每个API请求平均 {upstream / args.requests:.2f} 次）")
+
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            logger.info(f"结果已保存到 {args.save}")
+
+        failed = False
+        # 注入了故障时失败请求是预期的
+        faults_injected = args.error_rate or args.hang_rate or args.drop_rate
+        if report["total"]["errors"] and not faults_injected:
+            logger.error(f"有 {report['total']['errors']} 个请求失败")
+            failed = True
+
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                regressions = compare_with_baseline(report, json.load(f), args.threshold, args.min_delta)
+            for regression in regressions:
+                logger.error(f"性能回退 - {regression}")
+            failed = failed or bool(regressions)
+
+        return 1 if failed else 0
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数对象
+    """
+    parser = argparse.ArgumentParser(description='后端服务压测与吞吐量对比')
+    parser.add_argument('--url', action='append',
+                       help='服务地址，可重复指定多个进行对比，例如: http://127.0.0.1:5000'
+                            '（--suite模式下指定时不自动启动后端）')
+    parser.add_argument('--path', action='append',
+                       help='请求路径，可重复指定，默认: /api/get_current_summoner')
+    parser.add_argument('-c', '--concurrency', type=int, default=16,
+                       help='并发数')
+    parser.add_argument('-n', '--requests', type=int, default=500,
+                       help='每个路径的请求总数')
+    parser.add_argument('--timeout', type=float, default=30,
+                       help='单个请求超时时间（秒）')
+
+    suite = parser.add_argument_group('压测套件（--suite）')
+    suite.add_argument('--suite', action='store_true',
+                       help='启动模拟LCU和后端，按前端的请求分布混合压测各接口')
+    suite.add_argument('--async', dest='use_async', action='store_true', help='以--async模式启动后端')
+    suite.add_argument('--port', type=int, default=5099, help='自动启动的后端端口')
+    suite.add_argument('--mock-port', type=int, default=mock_lcu.DEFAULT_PORT, help='模拟LCU端口')
+    suite.add_argument('--no-mock', action='store_true', help='不启动模拟LCU（使用已运行的客户端或模拟服务）')
+    suite.add_argument('--warmup', type=int, default=0, help='正式压测前的预热请求数（0表示从冷缓存开始测）')
+    suite.add_argument('--save', help='把各接口的统计保存为JSON文件，可作为之后对比的基线')
+    suite.add_argument('--baseline', help='与基线文件对比，p95明显变慢时返回非0')
+    suite.add_argument('--threshold', type=float, default=0.2, help='p95允许的相对增幅')
+    suite.add_argument('--min-delta', type=float, default=5, help='p95增幅小于该毫秒数时视为噪声')
+    mock_lcu.add_config_arguments(suite)
+
+    args = parser.parse_args()
+    if not args.suite and not args.url:
+        parser.error('需要指定--url，或使用--suite')
+    return args
+
+
+def main() -> int:
+    """主函数
+
+    Returns:
+        int: 程序退出状态码，0表示成功，非0表示存在失败请求
+    """
+    args = parse_args()
+    if args.suite:
+        return run_suite(args)
+
+    paths = args.path or ['/api/get_current_summoner']
+
+    has_errors = False
+    logger.info(f"{'服务':<28} {'路径':<40} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'错误':>6}")
+    for base_url in args.url:
+        for path in paths:
+            stats = run_load(base_url.rstrip('/') + path, args.concurrency, args.requests, args.timeout)
+            has_errors = has_errors or stats["errors"] > 0
+            logger.info(
+                f"{base_url:<28} {path:<40} {stats['rps']:>9.1f} "
+                f"{stats['p50_ms']:>6.1f}ms {stats['p95_ms']:>6.1f}ms {stats['p99_ms']:>6.1f}ms {stats['errors']:>6}"
+            )
+
+    return 1 if has_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
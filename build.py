@@ -11,7 +11,11 @@ import subprocess
 import platform
 import argparse
 import logging
-from typing import Optional
+import statistics
+import tempfile
+import threading
+import time
+from typing import List, Optional
 
 # 配置日志
 logging.basicConfig(
@@ -24,7 +28,16 @@ logger = logging.getLogger("builder")
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 WEB_DIR = os.path.join(ROOT_DIR, 'web')
 BUILD_DIR = os.path.join(ROOT_DIR, 'dist_python')
-PYTHON_FILES = ['main.py']
+PYTHON_FILES = ['main.py', 'lcu.py', 'lcu_events.py', 'match_cache.py', 'match_history_store.py', 'horse_rank.py', 'player_summary.py', 'match_columns.py', 'asset_cache.py', 'backfill.py', 'projection.py', 'fast_json.py', 'metrics.py', 'profiling.py', 'async_server.py']
+
+# 快速启动构建时排除的模块：运行时用不到，其中pkg_resources被收集时PyInstaller会在启动时导入它，耗时明显
+FAST_START_EXCLUDES = ['pkg_resources', 'setuptools', 'pip', 'tkinter', 'lib2to3', 'pydoc_data', 'xmlrpc', 'curses']
+
+# 后端就绪信号（见main.py），测量启动时间时等待这一行
+READY_SIGNAL = 'JK_READY'
+
+# 测量启动时间时等待就绪信号的最长时间（秒）
+STARTUP_TIMEOUT = 60
 
 # 系统常量
 SYSTEM = platform.system().lower()
@@ -90,7 +103,9 @@ class Builder:
         logger.info("开始构建应用...")
         
         # 根据命令行参数决定构建流程
-        if self.args.electron_only:
+        if self.args.measure_startup:
+            return self._report_startup()
+        elif self.args.electron_only:
             return self._build_electron_only()
         elif self.args.python_only:
             return self._build_python_only()
@@ -104,7 +119,7 @@ class Builder:
             int: 返回状态码，0表示成功，非0表示失败
         """
         # 检查Python构建结果是否存在
-        if not os.path.exists(BUILD_DIR) or not os.path.exists(os.path.join(BUILD_DIR, 'main.exe')):
+        if self._executable_path() is None:
             logger.warning("没有找到Python构建结果，Electron应用需要依赖Python部分")
             logger.warning("建议先完成Python部分构建")
             user_input = input("是否继续只构建Electron部分? (y/n): ")
@@ -137,7 +152,11 @@ class Builder:
             self._build_python_executable()
             
             logger.info("Python应用构建成功！")
-            logger.info(f"可执行文件位于: {os.path.join(BUILD_DIR, 'main.exe')}")
+            logger.info(f"可执行文件位于: {self._executable_path()}")
+            
+            # 测量构建结果的启动时间
+            if not self.args.skip_startup_check:
+                return self._report_startup()
             return 0
         except Exception as e:
             logger.error(f"Python应用构建失败: {e}")
@@ -159,6 +178,10 @@ class Builder:
             # 构建Python可执行文件
             self._build_python_executable()
             
+            # 测量构建结果的启动时间
+            if not self.args.skip_startup_check and self._report_startup() != 0:
+                return 1
+            
             # 构建Electron应用
             electron_success = self._build_electron_app()
             
@@ -204,10 +227,11 @@ class Builder:
             raise RuntimeError("PyInstaller安装失败")
         
         # 构建命令
+        # 快速启动构建使用onedir：onefile每次启动都要先把整个包解压到临时目录
         cmd = [
             sys.executable, '-m', 'PyInstaller',
             '--name=main',
-            '--onefile',
+            '--onedir' if self.args.fast_start else '--onefile',
             '--clean',
             '--distpath=' + os.path.join(BUILD_DIR),
             '--workpath=' + os.path.join(BUILD_DIR, 'build'),
@@ -228,14 +252,21 @@ class Builder:
                 os.makedirs(web_data_path, exist_ok=True)
         
         # 添加依赖项
+        if self.args.fast_start:
+            # 不压缩（UPX压缩的文件每次启动都要解压），排除运行时用不到的模块
+            cmd.append('--noupx')
+            cmd.extend('--exclude-module=' + module for module in FAST_START_EXCLUDES)
+            logger.info(f"快速启动构建: onedir，排除模块: {', '.join(FAST_START_EXCLUDES)}")
+        else:
+            cmd.append('--hidden-import=pkg_resources.py2_warn')
         cmd.extend([
-            '--hidden-import=pkg_resources.py2_warn',
             '--hidden-import=flask',
             '--hidden-import=flask_cors',
             '--hidden-import=requests',
             '--hidden-import=psutil',
             '--hidden-import=urllib3',
             '--hidden-import=werkzeug',
+            '--hidden-import=websocket',
         ])
         
         # 主脚本
@@ -249,15 +280,84 @@ class Builder:
             subprocess.run(cmd, check=True)
             
             # 构建完成后，确保可执行文件存在
-            exe_path = os.path.join(BUILD_DIR, 'main.exe' if IS_WIN else 'main')
-            if os.path.exists(exe_path):
+            exe_path = self._executable_path()
+            if exe_path:
                 logger.info(f"构建成功，可执行文件在: {exe_path}")
             else:
-                logger.error(f"构建完成，但找不到可执行文件: {exe_path}")
+                logger.error(f"构建完成，但在 {BUILD_DIR} 中找不到可执行文件")
         except subprocess.CalledProcessError as e:
             logger.error(f"构建失败: {e}")
             raise RuntimeError("PyInstaller构建失败")
     
+    def _executable_path(self) -> Optional[str]:
+        """查找Python构建结果中的可执行文件
+        
+        Returns:
+            Optional[str]: 可执行文件路径（onefile为dist_python/main.exe，onedir为dist_python/main/main.exe），不存在时返回None
+        """
+        name = 'main.exe' if IS_WIN else 'main'
+        for path in (os.path.join(BUILD_DIR, name), os.path.join(BUILD_DIR, 'main', name)):
+            if os.path.isfile(path):
+                return path
+        return None
+    
+    def _measure_startup_once(self, cmd: List[str], data_dir: str) -> float:
+        """启动一次后端，测量从启动进程到收到就绪信号的时间
+        
+        Args:
+            cmd: 启动命令
+            data_dir: 用户数据目录（使用临时目录，不影响真实数据）
+            
+        Returns:
+            float: 启动时间（毫秒）
+            
+        Raises:
+            RuntimeError: 进程退出或超时仍未就绪
+        """
+        env = {**os.environ, 'JK_DATA_DIR': data_dir}
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd + ['--no-web', '--port', '0'], cwd=ROOT_DIR, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        watchdog = threading.Timer(STARTUP_TIMEOUT, proc.kill)
+        watchdog.start()
+        try:
+            for line in proc.stdout:
+                if line.startswith(READY_SIGNAL):
+                    return (time.perf_counter() - started) * 1000
+            raise RuntimeError(f"后端在就绪前退出，退出码: {proc.wait()}")
+        finally:
+            watchdog.cancel()
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    
+    def _report_startup(self) -> int:
+        """测量并输出后端的首次和之后的启动时间（没有构建结果时测量源码运行）
+        
+        Returns:
+            int: 返回状态码，0表示成功，非0表示后端无法启动
+        """
+        exe_path = self._executable_path()
+        cmd = [exe_path] if exe_path else [sys.executable, os.path.join(ROOT_DIR, 'main.py')]
+        logger.info(f"测量启动时间: {' '.join(cmd)}")
+        
+        try:
+            with tempfile.TemporaryDirectory(prefix='jk-startup-') as data_dir:
+                # 首次启动：刚构建完成，onefile还没有解包过，文件也不在系统缓存中
+                cold = self._measure_startup_once(cmd, data_dir)
+                warm = [self._measure_startup_once(cmd, data_dir) for _ in range(self.args.startup_runs)]
+        except RuntimeError as e:
+            logger.error(f"测量启动时间失败: {e}")
+            return 1
+        
+        logger.info(f"首次启动: {cold:.0f}ms")
+        if warm:
+            logger.info(f"之后启动（{len(warm)}次）: 中位数 {statistics.median(warm):.0f}ms，"
+                        f"最快 {min(warm):.0f}ms，最慢 {max(warm):.0f}ms")
+        return 0
+    
     def _build_electron_app(self) -> bool:
         """构建Electron应用
         
@@ -446,6 +546,14 @@ def parse_args() -> argparse.Namespace:
                        help='指定npm可执行文件的路径，例如: E:\\softwares\\nvm\\v19.8.0\\npm.cmd')
     parser.add_argument('--node-path', 
                        help='指定node可执行文件的路径，例如: E:\\softwares\\nvm\\v19.8.0\\node.exe')
+    parser.add_argument('--fast-start', action='store_true',
+                       help='启动优化构建：onedir（启动时不需要解包）、不使用UPX、排除运行时用不到的模块')
+    parser.add_argument('--measure-startup', action='store_true',
+                       help='不构建，只测量现有构建结果（没有时为源码）的启动时间')
+    parser.add_argument('--startup-runs', type=int, default=5,
+                       help='测量启动时间时首次启动之后再启动的次数')
+    parser.add_argument('--skip-startup-check', action='store_true',
+                       help='构建后不测量启动时间')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='显示详细日志信息')
     return parser.parse_args()
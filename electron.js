@@ -12,6 +12,14 @@ let tray = null;
 let pyProc = null;
 let pyPort = null;
 
+// 后端开始监听后输出的就绪信号: JK_READY {"port": 5000, "pid": ..., "init_ms": ...}
+const READY_SIGNAL = 'JK_READY ';
+// 等待就绪信号的最长时间，超时后仍按默认端口加载页面
+const READY_TIMEOUT = 30000;
+// 默认端口（页面的缓存和设置按地址保存，尽量使用固定端口；被占用时后端改用空闲端口并在就绪信号中告知）
+const DEFAULT_PORT = '5000';
+const PYTHON_ARGS = ['--no-web', '--port', DEFAULT_PORT, '--port-fallback'];
+
 // 获取python可执行文件的路径
 const getPythonPath = () => {
   if (isDev) {
@@ -66,6 +74,8 @@ const getPythonPath = () => {
   
   // 尝试多种可能的路径
   const possiblePaths = [
+    // 资源目录中的Python可执行文件（快速启动构建，onedir）
+    path.join(process.resourcesPath, 'dist_python', 'main', 'main.exe'),
     // 资源目录中的Python可执行文件
     path.join(process.resourcesPath, 'dist_python', 'main.exe'),
     // app目录中的Python可执行文件
@@ -137,13 +147,14 @@ const startPython = () => {
   
   console.log("========== 开始启动Python后端 ==========");
   
-  // 确定端口号
-  pyPort = '5000';
+  // 默认端口，实际端口以就绪信号为准
+  pyPort = DEFAULT_PORT;
+  const startedAt = Date.now();
   
   // 启动Python进程
   if (isDev) {
     // 开发模式
-    pyProc = spawn('python', ['main.py', '--no-web']);
+    pyProc = spawn('python', ['main.py', ...PYTHON_ARGS]);
   } else {
     // 生产模式
     const pythonPath = getPythonPath();
@@ -159,8 +170,8 @@ const startPython = () => {
       if (fs.existsSync(directPath)) {
         console.log(`找到直接路径下的Python可执行文件!`);
         try {
-          console.log(`启动Python进程: ${directPath} --no-web`);
-          pyProc = spawn(directPath, ['--no-web']);
+          console.log(`启动Python进程: ${directPath} ${PYTHON_ARGS.join(' ')}`);
+          pyProc = spawn(directPath, PYTHON_ARGS);
         } catch (err) {
           console.error(`启动Python进程失败: ${err.message}`);
           dialog.showErrorBox(
@@ -183,7 +194,7 @@ const startPython = () => {
       // 可执行文件存在，启动它
       console.log(`找到Python可执行文件，尝试启动: ${pythonPath}`);
       try {
-        pyProc = spawn(pythonPath, ['--no-web']);
+        pyProc = spawn(pythonPath, PYTHON_ARGS);
       } catch (err) {
         console.error(`启动Python进程失败: ${err.message}`);
         dialog.showErrorBox(
@@ -219,12 +230,50 @@ const startPython = () => {
     }
   });
   
-  // 等待500ms确保Python进程已启动
-  return new Promise((resolve) => {
-    setTimeout(resolve, 500);
-  });
+  // 等待后端输出就绪信号，而不是固定等待一段时间
+  return waitForReady(pyProc, startedAt);
 };
 
+// 等待后端的就绪信号并记录实际端口，进程提前退出或超时时直接返回（退出由close事件处理）
+const waitForReady = (proc, startedAt) => new Promise((resolve) => {
+  let buffer = '';
+  
+  const finish = () => {
+    clearTimeout(timer);
+    proc.stdout.off('data', onData);
+    proc.off('close', finish);
+    resolve();
+  };
+  
+  const onData = (data) => {
+    buffer += data.toString();
+    let index;
+    while ((index = buffer.indexOf('\n')) !== -1) {
+      const line = buffer.slice(0, index).trim();
+      buffer = buffer.slice(index + 1);
+      if (!line.startsWith(READY_SIGNAL)) continue;
+      
+      try {
+        const info = JSON.parse(line.slice(READY_SIGNAL.length));
+        pyPort = String(info.port);
+        console.log(`Python后端已就绪，端口: ${pyPort}，启动用时: ${Date.now() - startedAt}ms（其中导入和初始化 ${info.init_ms}ms）`);
+      } catch (err) {
+        console.error(`无法解析就绪信号: ${line}`);
+      }
+      finish();
+      return;
+    }
+  };
+  
+  const timer = setTimeout(() => {
+    console.warn(`${READY_TIMEOUT}ms内未收到Python后端的就绪信号，使用默认端口 ${pyPort}`);
+    finish();
+  }, READY_TIMEOUT);
+  
+  proc.stdout.on('data', onData);
+  proc.on('close', finish);
+});
+
 // 结束Python进程
 const exitPyProc = () => {
   if (pyProc) {
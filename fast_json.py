@@ -0,0 +1,122 @@
+"""
+JSON序列化 - 优先使用orjson，并记录各接口的序列化耗时
+
+LCU返回的对局文档有几百KB，标准库json的解析和编码是接口的主要开销之一。
+不需要修改的上游数据用raw_json包装后原样输出，跳过解析和重新编码。
+需要安装orjson；未安装时使用标准库json，行为不变。
+"""
+
+import json
+import threading
+import time
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import ENCODE_LATENCY, metrics
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+# orjson.Fragment可以把已编码的JSON原样嵌入输出（orjson 3.9+）
+_Fragment = getattr(orjson, 'Fragment', None)
+
+ENCODER = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj):
+    """编码为JSON字节串
+
+    Args:
+        obj: 要编码的对象
+
+    Returns:
+        bytes: UTF-8编码的JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """解析JSON字节串或字符串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def raw_json(content):
+    """包装上游返回的原始JSON，编码时原样输出
+
+    Args:
+        content: 上游响应的JSON字节串
+
+    Returns:
+        可以放入响应数据中的对象；orjson不支持原样输出时返回解析后的数据
+    """
+    if _Fragment is not None:
+        return _Fragment(content)
+    return loads(content)
+
+
+class SerializationStats:
+    """按接口统计序列化耗时和输出大小"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}  # endpoint -> [次数, 总耗时, 最大耗时, 总字节数]
+
+    def record(self, endpoint, seconds, size):
+        endpoint = endpoint or 'unknown'
+        metrics.observe(ENCODE_LATENCY, seconds, endpoint)
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, [0, 0.0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += size
+
+    def stats(self):
+        """获取统计数据
+
+        Returns:
+            dict: 编码器名称及各接口的次数、平均/最大耗时（毫秒）和平均输出字节数
+        """
+        with self._lock:
+            return {
+                "encoder": ENCODER,
+                "passthrough": _Fragment is not None,
+                "endpoints": {
+                    endpoint: {
+                        "count": count,
+                        "avg_ms": round(total / count * 1000, 3),
+                        "max_ms": round(longest * 1000, 3),
+                        "avg_bytes": size // count,
+                    }
+                    for endpoint, (count, total, longest, size) in sorted(self._endpoints.items())
+                },
+            }
+
+
+# 全局序列化统计
+serialization = SerializationStats()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask的JSON提供器：使用orjson编码并记录耗时（jsonify会使用它）"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        start = time.perf_counter()
+        body = dumps(obj)
+        serialization.record(request.endpoint if has_request_context() else None,
+                             time.perf_counter() - start, len(body))
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,267 @@
+"""
+马种评分 - 批量计算对局中每位玩家的马种分数
+
+规则与前端 web/js/horse-tag.js 的 calculateHorseRank 一致，但把多场对局的玩家
+展开成列，团队总和、排名等都按列一次算完，结果按gameId缓存，每场对局只计算一次。
+需要安装numpy；未安装时不返回评分，由前端自行计算。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 最多缓存的对局评分数量
+MAX_CACHED_GAMES = 5000
+
+# 辅助眼石装备ID
+SUPPORT_ITEM_ID = 3853
+
+# 马种分数上限（包含） -> 马种，超过最后一档为通天代
+HORSE_RANKS = [
+    (94, "Workhorse"),
+    (105, "InferiorHorse"),
+    (125, "AverageHorse"),
+    (150, "EliteHorse"),
+    (180, "JuniorGeneration"),
+]
+TOP_HORSE_RANK = "Heaven-ConnectedGeneration"
+
+# 需要展开成列的玩家数据字段
+STAT_COLUMNS = [
+    'totalMinionsKilled', 'goldEarned', 'goldSpent', 'kills', 'deaths', 'assists',
+    'totalDamageDealtToChampions', 'visionScore', 'firstBloodKill', 'firstBloodAssist',
+    'pentaKills', 'quadraKills', 'tripleKills', 'win',
+]
+
+
+def is_support(participant):
+    """判断玩家是否是辅助位（与前端isSupportParticipant一致）"""
+    if (participant.get('timeline') or {}).get('role') == 'SUPPORT':
+        return True
+    stats = participant.get('stats') or {}
+    low_cs = stats.get('totalMinionsKilled', 0) < 70
+    high_assists = stats.get('assists', 0) > stats.get('kills', 0) * 2
+    has_ward_item = any(stats.get(f'item{i}') == SUPPORT_ITEM_ID for i in range(6))
+    return low_cs and high_assists or has_ward_item
+
+
+class HorseRankScorer:
+    """按gameId缓存的马种评分"""
+
+    def __init__(self, max_games=MAX_CACHED_GAMES):
+        self.max_games = max_games
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # game_id -> {participantId: {"score", "rank"}}
+        self.hits = 0
+        self.computed = 0
+
+    @property
+    def available(self):
+        """是否安装了numpy"""
+        return np is not None
+
+    def score(self, details):
+        """计算多场对局的马种评分，已缓存的对局直接返回
+
+        Args:
+            details: LCU返回的对局详情列表
+
+        Returns:
+            list: 与details一一对应的评分，格式为 {participantId: {"score": 分数, "rank": 马种}}；
+                未安装numpy时为None
+        """
+        if not self.available:
+            return [None] * len(details)
+
+        results = [None] * len(details)
+        missing = []
+        with self._lock:
+            for i, detail in enumerate(details):
+                cached = self._cache.get(detail.get('gameId'))
+                if cached is not None:
+                    self._cache.move_to_end(detail.get('gameId'))
+                    self.hits += 1
+                    results[i] = cached
+                else:
+                    missing.append(i)
+
+        if missing:
+            computed = score_matches([details[i] for i in missing])
+            with self._lock:
+                for i, ranks in zip(missing, computed):
+                    results[i] = ranks
+                    game_id = details[i].get('gameId')
+                    if game_id is not None:
+                        self._cache[game_id] = ranks
+                while len(self._cache) > self.max_games:
+                    self._cache.popitem(last=False)
+                self.computed += len(missing)
+
+        return results
+
+    def annotate(self, results):
+        """为对局详情接口的返回结果附加马种评分（horseRanks字段）
+
+        Args:
+            results: fetch_match_detail返回的结果列表，失败的结果会被跳过
+        """
+        results = [r for r in results if r.get("status") == "success" and r.get("data")]
+        if not results or not self.available:
+            return
+        try:
+            for result, ranks in zip(results, self.score([r["data"] for r in results])):
+                result["horseRanks"] = ranks
+        except Exception as e:
+            # 评分失败时前端会自行计算
+            logger.error(f"计算马种评分时出错: {str(e)}")
+
+    def stats(self):
+        """获取评分缓存统计"""
+        with self._lock:
+            return {"available": self.available, "cached_games": len(self._cache),
+                    "hits": self.hits, "computed": self.computed}
+
+
+def score_matches(details):
+    """批量计算马种评分（不使用缓存）
+
+    Args:
+        details: LCU返回的对局详情列表
+
+    Returns:
+        list: 每场对局的评分 {participantId: {"score": 分数, "rank": 马种}}
+    """
+    # 把所有对局的玩家展开成列
+    game_index, team_index, participant_ids, support, durations, rows = [], [], [], [], [], []
+    for g, detail in enumerate(details):
+        durations.append(detail.get('gameDuration', 0))
+        for participant in detail.get('participants') or []:
+            stats = participant.get('stats') or {}
+            game_index.append(g)
+            # 与前端一致：teamId不是100的都算作另一队
+            team_index.append(2 * g + (0 if participant.get('teamId') == 100 else 1))
+            participant_ids.append(participant.get('participantId'))
+            support.append(is_support(participant))
+            rows.append([float(stats.get(column) or 0) for column in STAT_COLUMNS])
+
+    if not rows:
+        return [{} for _ in details]
+
+    game = np.asarray(game_index)
+    team = np.asarray(team_index)
+    support = np.asarray(support)
+    cols = dict(zip(STAT_COLUMNS, np.asarray(rows).T))
+    kills, deaths, assists = cols['kills'], cols['deaths'], cols['assists']
+    damage = cols['totalDamageDealtToChampions']
+
+    # 团队总和
+    team_count = 2 * len(details)
+    team_kills = np.bincount(team, weights=kills, minlength=team_count)[team]
+    team_damage = np.bincount(team, weights=damage, minlength=team_count)[team]
+    team_assists = np.bincount(team, weights=assists, minlength=team_count)[team]
+
+    def share(values, totals):
+        return np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+
+    engagement = share(kills + assists, team_kills)
+    score = np.full(len(rows), 100.0)
+
+    # 分均补兵
+    with np.errstate(divide='ignore', invalid='ignore'):
+        minutes = np.asarray(durations, dtype=float)[game] / 60
+        cpm = cols['totalMinionsKilled'] / minutes
+    score += np.select([cpm > 10, cpm > 9, cpm > 8], [20, 10, 5], 0)
+
+    # 金钱排名
+    money_rank = rank_within_games(cols['goldEarned'], game)
+    score += np.select(
+        [money_rank == 1, money_rank == 2, (money_rank == 4) & ~support, (money_rank == 5) & ~support],
+        [10, 5, -5, -10], 0)
+
+    # KDA加分: (k+a)/d + (k-d)/5*参团率，与Math.round一致向上取整0.5
+    kda = (kills + assists) / np.maximum(deaths, 1)
+    score += np.floor((kda + (kills - deaths) / 5 * engagement) * 2 + 0.5)
+
+    # 击杀占比
+    kill_pct = share(kills, team_kills) * 100
+    score += np.select(
+        [(kill_pct > 50) & (kills > 15), (kill_pct > 50) & (kills > 10), (kill_pct > 50) & (kills > 5),
+         (kill_pct > 35) & (kill_pct <= 50) & (kills > 10), (kill_pct > 35) & (kill_pct <= 50) & (kills > 5)],
+        [40, 20, 10, 20, 5], 0)
+
+    # 伤害占比
+    damage_pct = share(damage, team_damage) * 100
+    high, mid = damage_pct > 50, (damage_pct > 30) & (damage_pct <= 50)
+    score += np.select(
+        [high & (damage > 15000), high & (damage > 10000), high & (damage > 5000),
+         mid & (damage > 15000), mid & (damage > 10000), mid & (damage > 5000)],
+        [40, 20, 10, 20, 10, 5], 0)
+
+    # 金钱转化比
+    gold_efficiency = cols['goldEarned'] / np.maximum(cols['goldSpent'], 1)
+    score += np.select([gold_efficiency > 1.2, gold_efficiency < 0.8], [10, -5], 0)
+
+    # 助攻占比
+    assist_pct = share(assists, team_assists) * 100
+    high, mid = assist_pct > 50, (assist_pct > 35) & (assist_pct <= 50)
+    score += np.select(
+        [high & (assists > 15), high & (assists > 10), high & (assists > 5),
+         mid & (assists > 15), mid & (assists > 10), mid & (assists > 5)],
+        [40, 20, 10, 20, 10, 5], 0)
+
+    # 参团率排名
+    engagement_rank = rank_within_games(engagement, game)
+    score += np.select(
+        [engagement_rank == 1, engagement_rank == 2, engagement_rank == 4, engagement_rank == 5],
+        [10, 5, -5, -10], 0)
+
+    # 视野得分排名
+    vision_rank = rank_within_games(cols['visionScore'], game)
+    score += np.select([vision_rank == 1, vision_rank == 2], [10, 5], 0)
+
+    # 一血
+    score += np.select([cols['firstBloodKill'] > 0, cols['firstBloodAssist'] > 0], [10, 5], 0)
+
+    # 多杀
+    score += np.select([cols['pentaKills'] > 0, cols['quadraKills'] > 0, cols['tripleKills'] > 0], [20, 10, 5], 0)
+
+    # 胜负加成
+    score += np.select([cols['win'] > 0, deaths >= 10], [5, -10], 0)
+
+    limits = np.asarray([limit for limit, _ in HORSE_RANKS])
+    names = [name for _, name in HORSE_RANKS] + [TOP_HORSE_RANK]
+    rank_index = np.searchsorted(limits, score, side='left')
+
+    results = [{} for _ in details]
+    for g, participant_id, value, index in zip(game_index, participant_ids, score.tolist(), rank_index.tolist()):
+        results[g][str(participant_id)] = {"score": int(value), "rank": names[index]}
+    return results
+
+
+def rank_within_games(values, game):
+    """计算每位玩家在所在对局中的降序排名（从1开始，数值相同时按原顺序，与前端稳定排序一致）
+
+    Args:
+        values: 每位玩家的数值
+        game: 每位玩家所在对局的序号（同一对局的玩家必须连续）
+
+    Returns:
+        numpy.ndarray: 排名
+    """
+    position = np.arange(len(values))
+    order = np.lexsort((position, -values, game))
+    game_start = np.searchsorted(game, game)
+    ranks = np.empty(len(values), dtype=int)
+    ranks[order] = position - game_start[order] + 1
+    return ranks
+
+
+# 全局评分器
+horse_ranks = HorseRankScorer()
@@ -0,0 +1,744 @@
+"""
+LCU（英雄联盟客户端）连接管理 - 负责发现并缓存客户端的端口和令牌
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psutil
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import ENDPOINT_RESOLUTIONS, LCU_LATENCY, PHASE_LATENCY, metrics, upstream_path
+
+logger = logging.getLogger(__name__)
+
+# 命令行参数匹配
+APP_PORT_PATTERN = re.compile(r'--app-port=(\d+)')
+AUTH_TOKEN_PATTERN = re.compile(r'--remoting-auth-token=([a-zA-Z0-9_-]+)')
+
+# 连接池大小（并发请求数上限）及请求超时（连接超时, 读取超时），单位秒
+POOL_SIZE = 10
+REQUEST_TIMEOUT = (3, 15)
+
+# 客户端版本信息接口
+BUILD_INFO_PATH = '/system/v1/builds'
+
+# 请求优先级：界面操作触发的请求优先于预取、图标预取、战绩回填等后台请求
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+# 前端通过该请求头（值为background）标记后台请求
+PRIORITY_HEADER = 'X-JK-Priority'
+
+# 并发上限的初始值和范围，后台请求最多占用的比例
+INITIAL_CONCURRENCY = 8
+MIN_CONCURRENCY = 2
+MAX_CONCURRENCY = 16
+BACKGROUND_SHARE = 0.5
+
+# 并发上限的调整：用满并发且响应正常时每轮加1，出现过载信号时乘以DECREASE_FACTOR（两次下调至少间隔DECREASE_COOLDOWN秒）
+DECREASE_FACTOR = 0.7
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+# 响应耗时超过该路径平时耗时的SLOW_FACTOR倍（且超过SLOW_FLOOR秒）视为过载
+SLOW_FACTOR = 4.0
+SLOW_FLOOR_SECONDS = 0.5
+LATENCY_EWMA_ALPHA = 0.2
+
+# 客户端过载或暂时不可用的状态码，重试的次数和退避时间（秒，指数增长，在0到上限间随机取值）
+TRANSIENT_STATUSES = (429, 502, 503, 504)
+MAX_RETRIES = 2
+RETRY_BASE_SECONDS = 0.2
+RETRY_MAX_SECONDS = 2.0
+
+# 排队等待的最长时间（秒）
+QUEUE_TIMEOUT_SECONDS = 30
+
+
+class LCUCredentialManager:
+    """LCU凭据管理器
+
+    只在首次使用或缓存失效时扫描进程表，之后通过缓存的PID快速校验客户端是否仍在运行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._create_time = None
+        self._port = None
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+        self.scans = 0
+        self.invalidations = 0
+
+    def get(self):
+        """获取当前有效的凭据
+
+        Returns:
+            tuple: (port, token)，未找到客户端时返回 (None, None)
+        """
+        with self._lock:
+            start = time.perf_counter()
+            if self._port and self._is_alive():
+                self.hits += 1
+                metrics.observe(PHASE_LATENCY, time.perf_counter() - start, 'credential_check')
+                return self._port, self._token
+
+            self.misses += 1
+            with metrics.timer(PHASE_LATENCY, 'credential_scan'):
+                self._scan()
+            return self._port, self._token
+
+    def invalidate(self, reason=''):
+        """使缓存的凭据失效，下次调用get时重新扫描进程
+
+        Args:
+            reason: 失效原因，仅用于日志
+        """
+        with self._lock:
+            if self._port is None:
+                return
+            self.invalidations += 1
+            logger.info(f"LCU凭据缓存失效: {reason}")
+            self._clear()
+
+    def stats(self):
+        """获取缓存命中统计
+
+        Returns:
+            dict: 命中、未命中、扫描及失效次数
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "scans": self.scans,
+                "invalidations": self.invalidations,
+                "pid": self._pid,
+            }
+
+    def _is_alive(self):
+        """通过PID和进程创建时间判断缓存的客户端进程是否仍然存在（避免PID被复用）"""
+        if not psutil.pid_exists(self._pid):
+            return False
+        try:
+            return psutil.Process(self._pid).create_time() == self._create_time
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+    def _clear(self):
+        self._pid = None
+        self._create_time = None
+        self._port = None
+        self._token = None
+
+    def _scan(self):
+        """扫描进程表查找英雄联盟客户端的端口和令牌"""
+        self.scans += 1
+        self._clear()
+        logger.info("开始扫描英雄联盟客户端进程...")
+
+        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time']):
+            name = proc.info['name']
+            cmdline = proc.info['cmdline']
+            if not name or 'League' not in name or not cmdline:
+                continue
+
+            cmdline = ' '.join(cmdline)
+            app_port_match = APP_PORT_PATTERN.search(cmdline)
+            auth_token_match = AUTH_TOKEN_PATTERN.search(cmdline)
+
+            if app_port_match and auth_token_match:
+                self._pid = proc.info['pid']
+                self._create_time = proc.info['create_time']
+                self._port = app_port_match.group(1)
+                self._token = auth_token_match.group(1)
+                logger.info(f"成功从进程找到端口:{self._port} 和令牌")
+                return
+
+
+# 全局凭据管理器
+credentials = LCUCredentialManager()
+
+
+class LCUNotConnectedError(Exception):
+    """未连接到英雄联盟客户端"""
+
+
+class LCUBusyError(Exception):
+    """等待LCU请求名额超时"""
+
+
+class LCUSessionPool:
+    """共享的LCU HTTPS会话
+
+    所有请求复用同一个带连接池的requests.Session，避免每次请求都重新进行TCP和TLS握手。
+    仅在端口或令牌变化（客户端重启）时重建会话。
+    """
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self._lock = threading.Lock()
+        self._pool_size = pool_size
+        self._session = None
+        self._key = None
+        self.rebuilds = 0
+
+    def get(self, port, token):
+        """获取与指定凭据匹配的会话
+
+        Args:
+            port: LCU端口
+            token: LCU令牌
+
+        Returns:
+            requests.Session: 可复用的会话
+        """
+        with self._lock:
+            if self._session is None or self._key != (port, token):
+                if self._session is not None:
+                    self._session.close()
+                self._session = self._build(token)
+                self._key = (port, token)
+                self.rebuilds += 1
+                logger.info(f"已为端口 {port} 建立LCU会话")
+            return self._session
+
+    def close(self):
+        """关闭当前会话"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._key = None
+
+    def _build(self, token):
+        session = requests.Session()
+        session.verify = False
+        session.auth = ('riot', token)
+        session.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        return session
+
+
+# 全局会话池
+sessions = LCUSessionPool()
+
+
+class SingleFlight:
+    """合并并发的相同请求
+
+    同一时刻对同一路径和参数的多个请求只向LCU发送一次，其余请求等待并共享这次的结果
+    （包括异常）。请求完成后不保留结果，之后的请求会重新发送。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> _Call
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """执行fn，相同key的请求正在进行时等待其结果
+
+        Args:
+            key: 请求标识
+            fn: 实际发送请求的函数
+
+        Returns:
+            fn的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def record(self, shared):
+        """记录一次请求是实际发送还是共享了其他请求的结果（供异步客户端使用）"""
+        with self._lock:
+            if shared:
+                self.shared += 1
+            else:
+                self.leaders += 1
+
+    def stats(self):
+        """获取合并统计"""
+        total = self.leaders + self.shared
+        return {
+            "upstream": self.leaders,
+            "shared": self.shared,
+            "shared_rate": round(self.shared / total, 4) if total else 0,
+            "in_flight": len(self._calls),
+        }
+
+
+class _Call:
+    """进行中的请求"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def request_key(path, params=None):
+    """生成合并请求使用的标识（路径 + 排序后的查询参数）"""
+    return path, tuple(sorted((params or {}).items()))
+
+
+# 全局请求合并器
+flights = SingleFlight()
+
+
+# 当前请求的优先级（Flask在before_request中按请求头设置，异步模式在中间件中设置，后台任务用background_priority）
+request_priority = contextvars.ContextVar('lcu_priority', default=INTERACTIVE)
+
+
+class background_priority:
+    """with块内（当前线程或协程）发出的LCU请求按后台请求排队"""
+
+    def __enter__(self):
+        self._token = request_priority.set(BACKGROUND)
+        return self
+
+    def __exit__(self, *exc_info):
+        request_priority.reset(self._token)
+
+
+class _Waiter:
+    """排队中的请求，获得名额时由释放名额的一方唤醒"""
+
+    __slots__ = ('priority', 'granted', 'event', 'loop', 'future')
+
+    def __init__(self, priority, loop=None):
+        self.priority = priority
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class UpstreamGovernor:
+    """LCU请求并发控制
+
+    所有发往LCU的请求（同步和异步客户端）共用一个并发上限，超出上限的请求按优先级排队，
+    同一优先级先到先得；后台请求最多占用上限的BACKGROUND_SHARE，界面请求始终有余量。
+    上限按AIMD调整：用满并发且响应正常时缓慢增加，出现429/503、超时或明显变慢时成倍减少。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limit = float(INITIAL_CONCURRENCY)
+        self._in_flight = 0
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._baselines = {}  # 路径 -> 正常响应耗时的指数移动平均
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.retries = 0
+        self.queued = 0
+        self.timeouts = 0
+
+    def acquire(self, priority=INTERACTIVE, timeout=QUEUE_TIMEOUT_SECONDS):
+        """获取一个请求名额，没有名额时排队等待
+
+        Args:
+            priority: INTERACTIVE或BACKGROUND
+            timeout: 最长等待时间（秒）
+
+        Raises:
+            LCUBusyError: 等待超时
+        """
+        with self._lock:
+            if self._can_start(priority):
+                self._in_flight += 1
+                return
+            waiter = self._enqueue(priority)
+
+        start = time.perf_counter()
+        granted = waiter.event.wait(timeout)
+        metrics.observe(PHASE_LATENCY, time.perf_counter() - start, 'governor_wait')
+        if not granted and self._abandon(waiter):
+            raise LCUBusyError(f"等待LCU请求名额超过{timeout}秒")
+
+    async def acquire_async(self, priority=INTERACTIVE, timeout=QUEUE_TIMEOUT_SECONDS):
+        """acquire的协程版本，等待时不占用线程"""
+        with self._lock:
+            if self._can_start(priority):
+                self._in_flight += 1
+                return
+            waiter = self._enqueue(priority, asyncio.get_running_loop())
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                raise LCUBusyError(f"等待LCU请求名额超过{timeout}秒")
+        except asyncio.CancelledError:
+            # 已经分配的名额不会被使用，直接归还
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        finally:
+            metrics.observe(PHASE_LATENCY, time.perf_counter() - start, 'governor_wait')
+
+    def release(self, seconds=None, path=None, overloaded=False):
+        """归还名额，并根据这次请求的结果调整并发上限
+
+        Args:
+            seconds: 请求耗时，None表示名额未被使用（不调整上限）
+            path: LCU路径，用于判断耗时是否异常
+            overloaded: 是否收到过载信号（429/503等状态码或超时）
+        """
+        with self._lock:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            if seconds is not None:
+                self._adjust(seconds, path, overloaded, saturated)
+            self._dispatch()
+
+    def retry_delay(self, attempt, retry_after=None):
+        """第attempt次重试前的等待时间（指数退避，随机取值避免多个请求同时重试）
+
+        Args:
+            attempt: 已重试的次数
+            retry_after: 响应中的Retry-After（秒）
+
+        Returns:
+            float: 等待时间（秒）
+        """
+        with self._lock:
+            self.retries += 1
+        delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+        try:
+            delay = max(delay, min(float(retry_after), RETRY_MAX_SECONDS))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    def stats(self):
+        """获取当前并发上限、进行中的请求数和排队情况"""
+        with self._lock:
+            return {
+                "limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "queue_depth": {PRIORITY_NAMES[p]: len(queue) for p, queue in self._queues.items()},
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "retries": self.retries,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+            }
+
+    def _allowed(self, priority):
+        limit = int(self._limit)
+        return limit if priority == INTERACTIVE else max(1, int(limit * BACKGROUND_SHARE))
+
+    def _can_start(self, priority):
+        """不需要排队：有空闲名额，且没有同等或更高优先级的请求在排队"""
+        if any(self._queues[p] for p in self._queues if p <= priority):
+            return False
+        return self._in_flight < self._allowed(priority)
+
+    def _enqueue(self, priority, loop=None):
+        waiter = _Waiter(priority, loop)
+        self._queues[priority].append(waiter)
+        self.queued += 1
+        return waiter
+
+    def _abandon(self, waiter):
+        """放弃排队，返回是否放弃成功（名额已经分配时返回False）"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._queues[waiter.priority].remove(waiter)
+            self.timeouts += 1
+            return True
+
+    def _dispatch(self):
+        """按优先级把空闲名额分配给排队的请求"""
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue and self._in_flight < self._allowed(priority):
+                self._in_flight += 1
+                queue.popleft().wake()
+
+    def _adjust(self, seconds, path, overloaded, saturated):
+        if not overloaded and path is not None:
+            baseline = self._baselines.get(path)
+            if baseline is not None and seconds > max(SLOW_FLOOR_SECONDS, baseline * SLOW_FACTOR):
+                overloaded = True
+            else:
+                self._baselines[path] = seconds if baseline is None else baseline + LATENCY_EWMA_ALPHA * (seconds - baseline)
+
+        if overloaded:
+            now = time.monotonic()
+            if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS and self._limit > MIN_CONCURRENCY:
+                self._limit = max(float(MIN_CONCURRENCY), self._limit * DECREASE_FACTOR)
+                self._last_decrease = now
+                self.decreases += 1
+                logger.info(f"LCU响应过载，并发上限降为 {self._limit:.1f}")
+        elif saturated and self._limit < MAX_CONCURRENCY:
+            # 每个名额各加1/limit，相当于每轮（limit个请求）加1
+            self._limit = min(float(MAX_CONCURRENCY), self._limit + 1 / self._limit)
+            self.increases += 1
+
+
+# 全局并发控制
+governor = UpstreamGovernor()
+
+
+def lcu_get(path, params=None, timeout=REQUEST_TIMEOUT):
+    """向LCU发送GET请求
+
+    并发的相同请求（路径和参数都相同）只发送一次，共享同一个响应。
+    请求经过governor排队，按当前请求的优先级（request_priority）分配名额；
+    遇到429/502/503/504时退避后重试，遇到401或连接被拒绝时使凭据失效并重新扫描一次。
+
+    Args:
+        path: LCU API路径，例如 /lol-summoner/v1/current-summoner
+        params: 查询参数
+        timeout: 超时时间（连接超时, 读取超时）
+
+    Returns:
+        requests.Response: LCU响应
+
+    Raises:
+        LCUNotConnectedError: 找不到客户端
+    """
+    return flights.do(request_key(path, params), lambda: _lcu_get(path, params, timeout))
+
+
+def _lcu_get(path, params, timeout):
+    priority = request_priority.get()
+    label = upstream_path(path)
+    retries = 0
+    reconnected = False
+    while True:
+        port, token = credentials.get()
+        if not port:
+            raise LCUNotConnectedError("未连接到英雄联盟客户端")
+
+        governor.acquire(priority)
+        start = time.perf_counter()
+        try:
+            response = sessions.get(port, token).get(
+                f"https://127.0.0.1:{port}{path}",
+                params=params,
+                verify=False,  # 会话级verify会被REQUESTS_CA_BUNDLE等环境变量覆盖，需逐请求指定
+                timeout=timeout
+            )
+        except requests.exceptions.RequestException as e:
+            elapsed = time.perf_counter() - start
+            governor.release(elapsed, label, overloaded=isinstance(e, requests.exceptions.Timeout))
+            metrics.observe(LCU_LATENCY, elapsed, label, type(e).__name__)
+            if not isinstance(e, requests.exceptions.ConnectionError) or reconnected:
+                raise
+            credentials.invalidate("连接被拒绝")
+            reconnected = True
+            continue
+        elapsed = time.perf_counter() - start
+        governor.release(elapsed, label, overloaded=response.status_code in TRANSIENT_STATUSES)
+        metrics.observe(LCU_LATENCY, elapsed, label, response.status_code)
+
+        if response.status_code == 401 and not reconnected:
+            credentials.invalidate("LCU返回401")
+            reconnected = True
+            continue
+
+        if response.status_code in TRANSIENT_STATUSES and retries < MAX_RETRIES:
+            delay = governor.retry_delay(retries, response.headers.get('Retry-After'))
+            logger.info(f"LCU返回{response.status_code}，{delay:.2f}秒后重试: {path}")
+            time.sleep(delay)
+            retries += 1
+            continue
+
+        return response
+
+
+class EndpointResolver:
+    """LCU接口路径解析
+
+    不同版本的客户端对同一数据可能使用不同的接口路径（例如排位数据、对局详情）。
+    解析器按客户端版本记住哪个路径可用，之后直接请求该路径；
+    版本未知时并发请求所有候选路径，取第一个成功的结果。
+    """
+
+    def __init__(self, max_workers=4):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lcu-race')
+        self._builds = {}     # port -> 客户端版本号
+        self._preferred = {}  # (客户端版本号, 接口名) -> 候选路径下标
+        self.direct_hits = 0
+        self.races = 0
+        self.fallbacks = 0
+
+    def client_build(self, port):
+        """获取客户端版本号（每次客户端启动只查询一次）
+
+        Args:
+            port: LCU端口
+
+        Returns:
+            str: 客户端版本号，查询失败时以端口代替
+        """
+        build = self.known_build(port)
+        if build is not None:
+            return build
+
+        build = f"port-{port}"
+        try:
+            response = lcu_get(BUILD_INFO_PATH)
+            if response.status_code == 200:
+                build = response.json().get("version") or build
+        except requests.exceptions.RequestException:
+            pass
+
+        self.remember_build(port, build)
+        return build
+
+    def known_build(self, port):
+        """获取已查询过的客户端版本号，未查询时返回None"""
+        with self._lock:
+            return self._builds.get(port)
+
+    def remember_build(self, port, build):
+        """记录客户端版本号"""
+        with self._lock:
+            self._builds[port] = build
+
+    def preferred(self, build, name):
+        """获取已知可用的路径下标，未知时返回None"""
+        with self._lock:
+            return self._preferred.get((build, name))
+
+    def record(self, build, name, index):
+        """记录可用的路径下标"""
+        with self._lock:
+            if self._preferred.get((build, name)) != index:
+                logger.info(f"客户端 {build} 的 {name} 接口使用候选路径 #{index}")
+            self._preferred[(build, name)] = index
+
+    def count(self, name, kind):
+        """统计一次直接命中(direct)、回退(fallback)或并发探测(race)"""
+        metrics.inc(ENDPOINT_RESOLUTIONS, name, kind)
+        with self._lock:
+            if kind == 'direct':
+                self.direct_hits += 1
+            elif kind == 'fallback':
+                self.fallbacks += 1
+            else:
+                self.races += 1
+
+    def get(self, name, paths, params=None):
+        """按解析结果请求接口
+
+        Args:
+            name: 接口名，用于记录可用路径
+            paths: 候选路径列表，按优先级排序
+            params: 查询参数
+
+        Returns:
+            tuple: (成功的响应或None, 各候选路径的状态码列表；未请求的路径为None)
+
+        Raises:
+            LCUNotConnectedError: 找不到客户端
+        """
+        port, _ = credentials.get()
+        if not port:
+            raise LCUNotConnectedError("未连接到英雄联盟客户端")
+        build = self.client_build(port)
+        statuses = [None] * len(paths)
+
+        index = self.preferred(build, name)
+        if index is not None:
+            self.count(name, 'direct')
+            response = lcu_get(paths[index], params=params)
+            statuses[index] = response.status_code
+            if response.status_code == 200:
+                return response, statuses
+            # 记录的路径失败（数据不存在或路径已变化），并发尝试其余路径，成功时更新记录
+            kind = 'fallback'
+        else:
+            kind = 'race'
+        self.count(name, kind)
+        start = time.perf_counter()
+
+        candidates = [i for i in range(len(paths)) if statuses[i] is None]
+        # 在当前请求的上下文中执行，保留请求优先级
+        futures = {self._executor.submit(contextvars.copy_context().run, lcu_get, paths[i], params): i
+                   for i in candidates}
+        winner = None
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException:
+                continue
+            statuses[i] = response.status_code
+            if response.status_code == 200:
+                winner = response
+                self.record(build, name, i)
+                break
+
+        metrics.observe(PHASE_LATENCY, time.perf_counter() - start, f"endpoint_{kind}")
+        return winner, statuses
+
+    def stats(self):
+        """获取解析统计"""
+        with self._lock:
+            return {
+                "direct_hits": self.direct_hits,
+                "races": self.races,
+                "fallbacks": self.fallbacks,
+                "known": {f"{build}:{name}": index for (build, name), index in self._preferred.items()},
+            }
+
+
+# 全局接口解析器
+endpoints = EndpointResolver()
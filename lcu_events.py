@@ -0,0 +1,205 @@
+"""
+LCU事件订阅 - 通过客户端的WAMP WebSocket接收召唤师、对局流程等变化，推送给前端
+
+替代前端定时轮询：客户端状态变化时立即通知，空闲时不再反复请求。
+需要安装websocket-client；未安装时前端继续使用定时轮询。
+"""
+
+import base64
+import json
+import logging
+import queue
+import ssl
+import threading
+
+from lcu import credentials
+
+try:
+    import websocket
+except ImportError:  # 可选依赖
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+# WAMP消息类型
+WAMP_SUBSCRIBE = 5
+WAMP_EVENT = 8
+
+# 订阅的LCU事件 -> 推送给前端的事件类型
+SUBSCRIPTIONS = {
+    'OnJsonApiEvent_lol-summoner_v1_current-summoner': 'summoner',
+    'OnJsonApiEvent_lol-gameflow_v1_gameflow-phase': 'gameflow',
+    'OnJsonApiEvent_lol-end-of-game_v1_eog-stats-block': 'end_of_game',
+}
+
+# 断线重连间隔（秒）
+RECONNECT_MIN_DELAY = 2
+RECONNECT_MAX_DELAY = 30
+
+# 每个订阅者最多积压的事件数，超出时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LCUEventHub:
+    """LCU事件中心
+
+    后台线程维持一个到LCU的WebSocket订阅，把事件分发给前端订阅者（SSE连接）
+    和后端处理函数（例如缓存失效）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._handlers = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._ws = None
+        self.connected = False
+        self.events_received = 0
+
+    @property
+    def available(self):
+        """是否安装了websocket-client"""
+        return websocket is not None
+
+    def start(self):
+        """启动后台订阅线程（重复调用无副作用）"""
+        if not self.available:
+            logger.warning("未安装websocket-client，无法订阅LCU事件，前端将使用定时轮询")
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='lcu-events', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止后台订阅线程"""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+
+    def subscribe(self):
+        """新增一个订阅者
+
+        Returns:
+            queue.Queue: 接收事件的队列
+        """
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+        # 先告知当前连接状态
+        q.put({"type": "connection", "status": "connected" if self.connected else "disconnected"})
+        return q
+
+    def unsubscribe(self, q):
+        """移除订阅者"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def on_event(self, handler):
+        """注册后端事件处理函数
+
+        Args:
+            handler: 接收事件字典的函数
+        """
+        self._handlers.append(handler)
+        return handler
+
+    def publish(self, event):
+        """分发事件给所有订阅者和处理函数
+
+        Args:
+            event: 事件字典，包含type字段
+        """
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"处理LCU事件时出错: {str(e)}")
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # 订阅者处理过慢，丢弃最旧的事件
+                try:
+                    q.get_nowait()
+                    q.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _set_connected(self, connected):
+        if self.connected != connected:
+            self.connected = connected
+            self.publish({"type": "connection", "status": "connected" if connected else "disconnected"})
+
+    def _run(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop.is_set():
+            port, token = credentials.get()
+            if port:
+                try:
+                    self._listen(port, token)
+                    delay = RECONNECT_MIN_DELAY
+                except Exception as e:
+                    # 客户端是否退出由凭据管理器的PID校验判断，这里只负责重连
+                    logger.info(f"LCU事件连接断开: {str(e)}")
+                finally:
+                    self._ws = None
+                    self._set_connected(False)
+
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _listen(self, port, token):
+        """连接LCU WebSocket并持续接收事件，连接断开时返回或抛出异常"""
+        auth = base64.b64encode(f"riot:{token}".encode()).decode()
+        ws = websocket.create_connection(
+            f"wss://127.0.0.1:{port}/",
+            header=[f"Authorization: Basic {auth}"],
+            sslopt={"cert_reqs": ssl.CERT_NONE, "check_hostname": False},
+            subprotocols=["wamp"],
+            timeout=10,
+        )
+        self._ws = ws
+        ws.settimeout(None)
+        for topic in SUBSCRIPTIONS:
+            ws.send(json.dumps([WAMP_SUBSCRIBE, topic]))
+
+        logger.info(f"已订阅LCU事件，端口: {port}")
+        self._set_connected(True)
+
+        while not self._stop.is_set():
+            message = ws.recv()
+            if not message:
+                if not ws.connected:
+                    return
+                continue
+            self._dispatch(message)
+
+    def _dispatch(self, message):
+        try:
+            opcode, topic, payload = json.loads(message)
+        except (ValueError, TypeError):
+            return
+        if opcode != WAMP_EVENT or topic not in SUBSCRIPTIONS:
+            return
+
+        self.events_received += 1
+        event_type = SUBSCRIPTIONS[topic]
+        event = {"type": event_type, "eventType": payload.get("eventType")}
+        if event_type == 'gameflow':
+            event["phase"] = payload.get("data")
+        elif event_type == 'summoner':
+            data = payload.get("data") or {}
+            event["puuid"] = data.get("puuid")
+        self.publish(event)
+
+
+# 全局事件中心
+events = LCUEventHub()
@@ -1,17 +1,47 @@
+import time
+
+# 开始加载的时间，用于统计导入依赖和初始化的耗时（解释器启动、PyInstaller解包等由启动方从外部计时）
+STARTED_AT = time.perf_counter()
+
 import argparse
+import contextvars
+import gzip
 import json
 import logging
 import os
-import re
+import queue
+import socket
 import sys
 import threading
 import webbrowser
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import psutil
-import requests
 import urllib3
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
+from requests import HTTPError
+from werkzeug.serving import make_server
+
+from asset_cache import ASSET_KINDS, AssetCache
+from backfill import EXPORT_FORMATS, BackfillManager
+from lcu import (BACKGROUND, INTERACTIVE, PRIORITY_HEADER, LCUNotConnectedError, background_priority, credentials,
+                 endpoints, flights, governor, lcu_get, request_priority)
+from fast_json import FastJSONProvider, dumps, loads, raw_json, serialization
+from horse_rank import horse_ranks
+from lcu_events import events
+from match_cache import MatchDetailCache
+from match_columns import MatchColumnStore
+from match_history_store import MatchHistoryStore
+from metrics import HTTP_LATENCY, PHASE_LATENCY, metrics
+from player_summary import PlayerSummaryIndex
+from profiling import ProfilerMiddleware, profiler
+from projection import DETAIL_VIEWS, HISTORY_VIEWS, project_detail, project_history
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时使用gzip
+    brotli = None
 
 # 禁用不安全的HTTPS警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -30,13 +60,16 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
+# 确定用户数据路径（打包后的资源目录是临时的，缓存等数据需要写到用户目录）
+def data_path(relative_path):
+    """ 获取用户数据文件的绝对路径，可通过JK_DATA_DIR环境变量指定目录 """
+    base_path = os.environ.get('JK_DATA_DIR') or os.path.join(os.environ.get('APPDATA') or os.path.expanduser('~'), 'JK')
+    return os.path.join(base_path, relative_path)
+
 # 创建Flask应用
 app = Flask(__name__, static_folder=resource_path('web'), static_url_path='')
 CORS(app)  # 启用CORS
-
-# LCU API 连接相关
-lcu_port = None
-lcu_token = ''
+app.json = FastJSONProvider(app)  # 使用orjson编码并记录各接口的序列化耗时
 
 # 检查是否在Electron环境中运行
 IS_ELECTRON = 'ELECTRON_RUN_AS_NODE' in os.environ or os.environ.get('ELECTRON', '') == 'true'
@@ -44,14 +77,120 @@ logging.info(f"是否在Electron环境中运行: {IS_ELECTRON}")
 
 # 全局变量
 current_summoner = None
-lcu_connection = {
-    "auth_key": None,
-    "process_id": None,
-    "port": None,
-    "url": None,
-    "session": None,
-    "connected": False
-}
+
+# 对局详情缓存（对局结束后详情不再变化，持久化到磁盘）
+match_cache = MatchDetailCache(data_path('match_cache.db'))
+
+# 战绩列表本地存储（按PUUID增量同步，只下载本地没有的对局）
+def fetch_match_history_page(puuid, begin_index, end_index):
+    response = lcu_get(f"/lol-match-history/v1/products/lol/{puuid}/matches",
+                       params={"begIndex": begin_index, "endIndex": end_index})
+    response.raise_for_status()
+    return loads(response.content)
+
+history_store = MatchHistoryStore(data_path('match_history.db'), fetch_match_history_page)
+
+# 游戏图标本地缓存（优先从客户端获取，客户端版本变化时在后台预取）
+def fetch_game_asset(path, background=False):
+    with background_priority() if background else nullcontext():
+        response = lcu_get(path)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.content, response.headers.get('Content-Type')
+
+def current_client_build():
+    port, _ = credentials.get()
+    return endpoints.client_build(port) if port else None
+
+assets = AssetCache(data_path('assets'), fetch_game_asset, current_client_build)
+
+# 图标内容不会变化（ETag为内容哈希），浏览器缓存一周，过期后先使用旧图标再在后台重新验证
+ASSET_CACHE_CONTROL = 'public, max-age=604800, stale-while-revalidate=2592000'
+
+# 玩家汇总统计（每获取一场对局详情就增量更新）
+player_index = PlayerSummaryIndex(data_path('player_summary.db'))
+
+# 对局列式存储（每获取一场对局详情就追加，用于跨对局统计）
+match_columns = MatchColumnStore(data_path('match_columns'))
+
+# 把已缓存但未写入列式存储的对局详情导入（首次启用或升级后），在后台进行不影响启动
+def import_cached_details():
+    imported = 0
+    try:
+        for details in match_cache.iter_details(skip=match_columns.has_game):
+            imported += match_columns.ingest(details)
+    except Exception as e:
+        logging.error(f"导入已缓存的对局详情时出错: {str(e)}")
+    if imported:
+        logging.info(f"已将 {imported} 场已缓存的对局导入列式存储")
+
+if match_columns.available:
+    threading.Thread(target=import_cached_details, name='match-columns-import', daemon=True).start()
+
+# 对局结束后需要重新检查最新战绩
+@events.on_event
+def refresh_history_after_game(event):
+    if event["type"] == 'end_of_game' or (event["type"] == 'gameflow' and event.get("phase") == 'EndOfGame'):
+        history_store.mark_stale()
+
+# 批量获取对局详情的并发数（避免同时向客户端发送过多请求）及单次最多对局数
+MATCH_DETAIL_WORKERS = 4
+MAX_BATCH_SIZE = 20
+detail_executor = ThreadPoolExecutor(max_workers=MATCH_DETAIL_WORKERS, thread_name_prefix='match-detail')
+
+# 对局玩家批量查询的并发数（10名玩家各3项查询，受LCU连接池大小限制）及每名玩家的近期战绩场数
+LOBBY_WORKERS = 8
+LOBBY_RECENT_GAMES = 5
+lobby_executor = ThreadPoolExecutor(max_workers=LOBBY_WORKERS, thread_name_prefix='lobby')
+
+# 超过该大小的JSON响应才压缩（字节）
+COMPRESS_MIN_BYTES = 1024
+
+# 事件推送保活间隔（秒）
+EVENT_KEEPALIVE_SECONDS = 15
+
+# 记录接口处理耗时（在压缩之后执行，包含压缩时间；流式响应只计到开始返回）
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# 前端的预取等请求标记为后台请求，访问客户端时排在界面请求之后
+@app.before_request
+def set_request_priority():
+    request_priority.set(BACKGROUND if request.headers.get(PRIORITY_HEADER) == 'background' else INTERACTIVE)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe(HTTP_LATENCY, time.perf_counter() - started, request.endpoint or 'not_found',
+                        response.status_code)
+    return response
+
+# 压缩较大的JSON响应（流式响应和静态文件不压缩）
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    
+    start = time.perf_counter()
+    if brotli is not None and 'br' in request.accept_encodings:
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(data, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    metrics.observe(PHASE_LATENCY, time.perf_counter() - start, f"compress_{response.headers['Content-Encoding']}")
+    response.vary.add('Accept-Encoding')
+    return response
 
 # 主页路由
 @app.route('/')
@@ -61,57 +200,51 @@ def index():
 # 检查LCU连接API
 @app.route('/api/check_lcu_connection', methods=['GET'])
 def check_lcu_connection():
-    global lcu_port, lcu_token
-    
     try:
-        logging.info("开始检查英雄联盟客户端连接...")
-
-        processes = list(psutil.process_iter(['pid', 'name', 'cmdline']))
-        league_processes = [p for p in processes if p.info['name'] and 'League' in p.info['name']]
-
-        for proc in league_processes:
-            if proc.info['cmdline']:
-                cmdline = ' '.join(proc.info['cmdline'])
-
-                # 查找端口和令牌
-                app_port_match = re.search(r'--app-port=(\d+)', cmdline)
-                auth_token_match = re.search(r'--remoting-auth-token=([a-zA-Z0-9_-]+)', cmdline)
-
-                if app_port_match and auth_token_match:
-                    lcu_port = app_port_match.group(1)
-                    lcu_token = auth_token_match.group(1)
-                    logging.info(f"成功从进程找到端口:{lcu_port} 和令牌")
-                    break
-                else:
-                    lcu_port = None
-                    lcu_token = None
+        lcu_port, lcu_token = credentials.get()
         
         if lcu_port and lcu_token:
-            return jsonify({"status": "connected", "port": lcu_port, "token": lcu_token, "message": "连接成功"})
+            return jsonify({"status": "connected", "port": lcu_port, "token": lcu_token, "message": "连接成功",
+                            "credential_cache": credentials.stats()})
         else:
-            return jsonify({"status": "disconnected", "message": "英雄联盟客户端连接失败 "})
+            return jsonify({"status": "disconnected", "message": "英雄联盟客户端连接失败 ",
+                            "credential_cache": credentials.stats()})
     
     except Exception as e:
         return jsonify({"status": "error", "message": f"检查连接时出错: {str(e)}"})
 
+# LCU事件推送（Server-Sent Events），替代前端定时轮询
+@app.route('/api/events', methods=['GET'])
+def lcu_event_stream():
+    if not events.available:
+        return jsonify({"status": "error", "message": "未安装websocket-client，不支持事件推送"}), 503
+    
+    events.start()
+    q = events.subscribe()
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                except queue.Empty:
+                    # 定期发送注释行保持连接
+                    yield ": keep-alive\n\n"
+        finally:
+            events.unsubscribe(q)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 # 获取当前登录用户信息
 @app.route('/api/get_current_summoner', methods=['GET'])
 def get_current_summoner():
-    connection_status = check_lcu_connection()
-    response_data = json.loads(connection_status.get_data(as_text=True))
-    if response_data["status"] != "connected":
-        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
-    
     try:
-        url = f"https://127.0.0.1:{lcu_port}/lol-summoner/v1/current-summoner"
-        response = requests.get(
-            url,
-            verify=False,
-            auth=('riot', lcu_token)
-        )
+        response = lcu_get("/lol-summoner/v1/current-summoner")
         
         if response.status_code == 200:
-            return jsonify({"status": "success", "data": response.json()})
+            # 数据不需要修改，原样输出LCU返回的JSON
+            return jsonify({"status": "success", "data": raw_json(response.content)})
         else:
             return jsonify({
                 "status": "error", 
@@ -119,46 +252,59 @@ def get_current_summoner():
                 "details": response.text
             })
     
+    except LCUNotConnectedError:
+        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
     except Exception as e:
         return jsonify({"status": "error", "message": f"获取用户信息时出错: {str(e)}"})
 
-# 根据puuid获取玩家信息
-@app.route('/api/get_summoner_by_puuid', methods=['GET'])
-def get_summoner_by_puuid():
-    puuid = request.args.get('puuid')
-    
-    if not puuid:
-        return jsonify({"status": "error", "message": "缺少puuid参数"})
-    
-    connection_status = check_lcu_connection()
-    response_data = json.loads(connection_status.get_data(as_text=True))
-    if response_data["status"] != "connected":
-        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
-    
+# 根据puuid获取玩家信息（供单个接口和对局玩家批量查询共用，不依赖请求上下文）
+def fetch_summoner(puuid):
     try:
         # 尝试通过puuid获取用户信息
-        url = f"https://127.0.0.1:{lcu_port}/lol-summoner/v2/summoners/puuid/{puuid}"
-        
-        response = requests.get(
-            url,
-            verify=False,
-            auth=('riot', lcu_token)
-        )
+        response = lcu_get(f"/lol-summoner/v2/summoners/puuid/{puuid}")
         
         if response.status_code == 200:
             logging.info(f"成功获取玩家信息，PUUID: {puuid}")
-            return jsonify({"status": "success", "data": response.json()})
+            return {"status": "success", "data": raw_json(response.content)}
         else:
             logging.error(f"获取玩家信息失败，状态码: {response.status_code}")
-            return jsonify({
+            return {
                 "status": "error", 
                 "message": f"获取玩家信息失败，状态码: {response.status_code}",
                 "details": response.text
-            })
+            }
     
+    except LCUNotConnectedError:
+        return {"status": "error", "message": "未连接到英雄联盟客户端"}
     except Exception as e:
         logging.error(f"获取玩家信息时出错: {str(e)}")
-        return jsonify({"status": "error", "message": f"获取玩家信息时出错: {str(e)}"})
+        return {"status": "error", "message": f"获取玩家信息时出错: {str(e)}"}
+
+# 根据puuid获取玩家信息
+@app.route('/api/get_summoner_by_puuid', methods=['GET'])
+def get_summoner_by_puuid():
+    puuid = request.args.get('puuid')
+    
+    if not puuid:
+        return jsonify({"status": "error", "message": "缺少puuid参数"})
+    
+    return jsonify(fetch_summoner(puuid))
+
+# 获取玩家战绩（不依赖请求上下文）
+def fetch_match_history(puuid, begin_index, end_index):
+    try:
+        data = history_store.get_window(puuid, begin_index, end_index)
+        logging.info(f"成功获取玩家战绩，PUUID: {puuid}")
+        return {"status": "success", "data": data, "source": "store"}
+
+    except LCUNotConnectedError:
+        return {"status": "error", "message": "未连接到英雄联盟客户端"}
+    except HTTPError as e:
+        logging.info(f"API请求失败，状态码: {e.response.status_code}")
+        return {"status": "error", "data": None, "message": f"API请求失败，状态码: {e.response.status_code}"}
+    except Exception as e:
+        logging.error(f"获取战绩时出错: {str(e)}")
+        return {"status": "error", "data": None, "message": f"获取战绩时出错啦"}
 
 # 获取玩家战绩
 @app.route('/api/get_match_history', methods=['GET'])
@@ -166,118 +312,200 @@ def get_match_history():
     puuid = request.args.get('puuid')
     begin_index = request.args.get('begin_index', 0, type=int)
     end_index = request.args.get('end_index', 6, type=int)
+    view = request.args.get('view', 'full')
     
-    connection_status = check_lcu_connection()
-    response_data = json.loads(connection_status.get_data(as_text=True))
-    if response_data["status"] != "connected":
-        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
+    if view not in HISTORY_VIEWS:
+        return jsonify({"status": "error", "message": f"不支持的视图: {view}"})
 
+    result = fetch_match_history(puuid, begin_index, end_index)
+    if result["status"] == "success":
+        result["data"] = project_history(result["data"], view)
+    return jsonify(result)
+
+# 获取单场对局详情（供单个和批量接口共用，不依赖请求上下文）
+def fetch_match_detail(match_id):
     try:
-        url = f"https://127.0.0.1:{lcu_port}/lol-match-history/v1/products/lol/{puuid}/matches"
-        params = {
-            "begIndex": begin_index,
-            "endIndex": end_index
-        }
+        # 优先从缓存读取
+        cached = match_cache.get(match_id)
+        if cached is not None:
+            return {"status": "success", "data": cached, "source": "cache"}
         
-        response = requests.get(
-            url,
-            params=params,
-            verify=False,
-            auth=('riot', lcu_token)
-        )
+        # 使用LCU API获取对局详情（备用路径：match-details，不同版本客户端路径不同）
+        response, statuses = endpoints.get("match_detail", [
+            f"/lol-match-history/v1/games/{match_id}",
+            f"/lol-match-history/v1/match-details/{match_id}",
+        ])
         
-        if response.status_code == 200:
-            logging.info(f"成功获取玩家战绩，PUUID: {puuid}")
-            return jsonify({"status": "success", "data": response.json(), "source": "api"})
+        if response is not None:
+            logging.info(f"成功获取对局{match_id}的详情")
+            detail = loads(response.content)
+            match_cache.put(match_id, detail)
+            return {"status": "success", "data": detail, "source": "api"}
         else:
-            logging.info(f"API请求失败，状态码: {response.status_code}")
-            return jsonify({"status": "error", "data": None, "message": f"API请求失败，状态码: {response.status_code}"})
+            logging.error(f"获取对局详情失败，状态码: {statuses}")
+            return {
+                "status": "error", 
+                "message": f"获取对局详情失败，状态码: {statuses[0]}, 备用API状态码: {statuses[1]}"
+            }
     
+    except LCUNotConnectedError:
+        return {"status": "error", "message": "未连接到英雄联盟客户端"}
     except Exception as e:
-        logging.error(f"获取战绩时出错: {str(e)}")
-        return jsonify({"status": "error", "data": None, "message": f"获取战绩时出错啦"})
+        logging.error(f"获取对局详情时出错: {str(e)}")
+        return {"status": "error", "message": f"获取对局详情时出错: {str(e)}"}
+
+# 为对局详情附加马种评分，累加到玩家汇总统计和列式存储，再按视图裁剪（评分和汇总需要完整数据）
+def enrich_match_details(results, view='full'):
+    horse_ranks.annotate(results)
+    player_index.ingest_results(results)
+    match_columns.ingest_results(results)
+    for result in results:
+        if result["status"] == "success":
+            result["data"] = project_detail(result["data"], view)
+
+# 全量战绩回填与导出（逐页写入文件，可从检查点继续）
+# 回填在后台进行，访问客户端时让位于界面请求
+def fetch_backfill_window(puuid, begin_index, end_index):
+    with background_priority():
+        return history_store.get_window(puuid, begin_index, end_index)["games"]["games"]
+
+def fetch_backfill_detail(match_id):
+    with background_priority():
+        return fetch_match_detail(match_id)
+
+def ingest_backfill_details(results):
+    horse_ranks.annotate(results)
+    player_index.ingest_results(results)
+    match_columns.ingest_results(results, wait=True)
+
+# 下载导出文件时每次读取的大小（字节）
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+backfill = BackfillManager(data_path('backfill.db'), data_path('exports'), fetch_backfill_window,
+                           fetch_backfill_detail, ingest_backfill_details)
 
 # 获取对局详情
 @app.route('/api/get_match_detail', methods=['GET'])
 def get_match_detail():
     match_id = request.args.get('match_id')
+    view = request.args.get('view', 'full')
     
     if not match_id:
         return jsonify({"status": "error", "message": "缺少match_id参数"})
-    
-    connection_status = check_lcu_connection()
-    response_data = json.loads(connection_status.get_data(as_text=True))
-    if response_data["status"] != "connected":
-        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
+    if view not in DETAIL_VIEWS:
+        return jsonify({"status": "error", "message": f"不支持的视图: {view}"})
 
-    try:
-        # 使用LCU API获取对局详情
-        url = f"https://127.0.0.1:{lcu_port}/lol-match-history/v1/games/{match_id}"
-        
-        response = requests.get(
-            url,
-            verify=False,
-            auth=('riot', lcu_token)
-        )
+    result = fetch_match_detail(match_id)
+    enrich_match_details([result], view)
+    return jsonify(result)
+
+# 批量获取对局详情
+@app.route('/api/get_match_details', methods=['GET'])
+def get_match_details():
+    ids = [i for i in request.args.get('ids', '').split(',') if i.strip()]
+    stream = request.args.get('stream', 0, type=int)
+    view = request.args.get('view', 'full')
+    
+    if not ids:
+        return jsonify({"status": "error", "message": "缺少ids参数"})
+    if view not in DETAIL_VIEWS:
+        return jsonify({"status": "error", "message": f"不支持的视图: {view}"})
+    if len(ids) > MAX_BATCH_SIZE:
+        return jsonify({"status": "error", "message": f"一次最多获取{MAX_BATCH_SIZE}场对局"})
+    if not all(i.strip().isdigit() for i in ids):
+        return jsonify({"status": "error", "message": "ids参数格式错误"})
+    
+    # 去重并保持顺序
+    ids = list(dict.fromkeys(i.strip() for i in ids))
+    # 在当前请求的上下文中执行，保留请求优先级
+    futures = {detail_executor.submit(contextvars.copy_context().run, fetch_match_detail, match_id): match_id
+               for match_id in ids}
+    
+    if stream:
+        # 按完成顺序逐行返回（NDJSON），前端可以边收边渲染
+        def generate():
+            for future in as_completed(futures):
+                result = future.result()
+                enrich_match_details([result], view)
+                yield dumps({"match_id": futures[future], **result}) + b'\n'
         
-        if response.status_code == 200:
-            logging.info(f"成功获取对局{match_id}的详情")
-            return jsonify({"status": "success", "data": response.json()})
-        else:
-            logging.error(f"获取对局详情失败，状态码: {response.status_code}")
-            # 尝试使用备用API
-            try:
-                # 备用方法：通过match timeline API获取
-                url_alt = f"https://127.0.0.1:{lcu_port}/lol-match-history/v1/match-details/{match_id}"
-                response_alt = requests.get(
-                    url_alt,
-                    verify=False,
-                    auth=('riot', lcu_token)
-                )
-                
-                if response_alt.status_code == 200:
-                    logging.info(f"通过备用API成功获取对局{match_id}的详情")
-                    return jsonify({"status": "success", "data": response_alt.json()})
-                else:
-                    return jsonify({
-                        "status": "error", 
-                        "message": f"获取对局详情失败，状态码: {response.status_code}, 备用API状态码: {response_alt.status_code}"
-                    })
-            except Exception as alt_error:
-                logging.error(f"备用API获取对局详情出错: {str(alt_error)}")
-                return jsonify({
-                    "status": "error", 
-                    "message": f"两种方法获取对局详情均失败，主方法: {response.status_code}, 备用方法: {str(alt_error)}"
-                })
+        return Response(generate(), mimetype='application/x-ndjson')
     
-    except Exception as e:
-        logging.error(f"获取对局详情时出错: {str(e)}")
-        return jsonify({"status": "error", "message": f"获取对局详情时出错: {str(e)}"})
+    results = {}
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+    
+    # 一次批量计算所有对局的马种评分
+    enrich_match_details(list(results.values()), view)
+    
+    logging.info(f"批量获取对局详情完成，共{len(ids)}场")
+    return jsonify({"status": "success", "data": results})
 
-# 获取排位数据
-@app.route('/api/get_ranked_stats', methods=['GET'])
-def get_ranked_stats():
+# 开始或继续回填任务：遍历玩家的全部战绩和对局详情，导出为NDJSON或列式文件
+@app.route('/api/start_backfill', methods=['POST'])
+def start_backfill():
     puuid = request.args.get('puuid')
-    
+    export_format = request.args.get('format', 'ndjson')
+    restart = request.args.get('restart', 0, type=int)
+
     if not puuid:
         return jsonify({"status": "error", "message": "缺少puuid参数"})
-    
-    connection_status = check_lcu_connection()
-    response_data = json.loads(connection_status.get_data(as_text=True))
-    if response_data["status"] != "connected":
-        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"不支持的导出格式: {export_format}"})
 
     try:
-        # 使用LCU API获取排位数据
-        url = f"https://127.0.0.1:{lcu_port}/lol-ranked/v1/ranked-stats/{puuid}"
-        
-        response = requests.get(
-            url,
-            verify=False,
-            auth=('riot', lcu_token)
-        )
+        return jsonify({"status": "success", "data": backfill.start(puuid, export_format, bool(restart))})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)})
+
+# 停止回填任务（写完当前页后停止，之后可以继续）
+@app.route('/api/cancel_backfill', methods=['POST'])
+def cancel_backfill():
+    job_id = request.args.get('job_id')
+    if not job_id:
+        return jsonify({"status": "error", "message": "缺少job_id参数"})
+    if not backfill.cancel(job_id):
+        return jsonify({"status": "error", "message": "任务未在运行"})
+    return jsonify({"status": "success", "data": backfill.jobs(job_id)})
+
+# 回填任务的状态和进度
+@app.route('/api/get_backfill_jobs', methods=['GET'])
+def get_backfill_jobs():
+    return jsonify({"status": "success", "data": backfill.jobs(request.args.get('job_id'))})
+
+# 下载回填任务的导出文件（运行中的任务只包含已完成的页）
+@app.route('/api/download_backfill', methods=['GET'])
+def download_backfill():
+    jobs = backfill.jobs(request.args.get('job_id', ''))
+    if not jobs or not os.path.exists(jobs[0]["path"]):
+        return jsonify({"status": "error", "message": "找不到导出文件"}), 404
+    job = jobs[0]
+    mimetype = 'application/x-ndjson' if job["format"] == 'ndjson' else 'application/octet-stream'
+    # 文件可能仍在写入，只返回到最近一个检查点的完整数据
+    def generate(remaining=job["bytes"]):
+        with open(job["path"], 'rb') as f:
+            while remaining > 0:
+                chunk = f.read(min(remaining, EXPORT_CHUNK_BYTES))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Length'] = str(job["bytes"])
+    response.headers['Content-Disposition'] = f'attachment; filename="{os.path.basename(job["path"])}"'
+    return response
+
+# 获取排位数据（不依赖请求上下文）
+def fetch_ranked_stats(puuid):
+    try:
+        # 使用LCU API获取排位数据（某些版本的客户端使用ranked-stats-by-puuid路径）
+        response, statuses = endpoints.get("ranked_stats", [
+            f"/lol-ranked/v1/ranked-stats/{puuid}",
+            f"/lol-ranked/v1/ranked-stats-by-puuid/{puuid}",
+        ])
         
-        if response.status_code == 200:
+        if response is not None:
             logging.info(f"成功获取召唤师 {puuid} 的排位数据")
             ranked_data = response.json()
             
@@ -286,44 +514,288 @@ def get_ranked_stats():
             if "queues" in ranked_data:
                 queues = ranked_data["queues"]
             
-            return jsonify({"status": "success", "data": queues})
+            return {"status": "success", "data": queues}
         else:
-            logging.error(f"获取排位数据失败，状态码: {response.status_code}")
-            
-            # 尝试使用备用API路径（某些版本的客户端可能使用不同的路径）
-            try:
-                alt_url = f"https://127.0.0.1:{lcu_port}/lol-ranked/v1/ranked-stats-by-puuid/{puuid}"
-                alt_response = requests.get(
-                    alt_url,
-                    verify=False,
-                    auth=('riot', lcu_token)
-                )
-                
-                if alt_response.status_code == 200:
-                    logging.info(f"通过备用API成功获取召唤师 {puuid} 的排位数据")
-                    alt_ranked_data = alt_response.json()
-                    
-                    # 提取排位队列数据
-                    alt_queues = []
-                    if "queues" in alt_ranked_data:
-                        alt_queues = alt_ranked_data["queues"]
-                    
-                    return jsonify({"status": "success", "data": alt_queues})
-                else:
-                    return jsonify({
-                        "status": "error", 
-                        "message": f"获取排位数据失败，主API状态码: {response.status_code}，备用API状态码: {alt_response.status_code}"
-                    })
-            except Exception as alt_e:
-                return jsonify({
-                    "status": "error", 
-                    "message": f"获取排位数据失败，状态码: {response.status_code}",
-                    "details": response.text
-                })
+            logging.error(f"获取排位数据失败，状态码: {statuses}")
+            return {
+                "status": "error", 
+                "message": f"获取排位数据失败，主API状态码: {statuses[0]}，备用API状态码: {statuses[1]}"
+            }
     
+    except LCUNotConnectedError:
+        return {"status": "error", "message": "未连接到英雄联盟客户端"}
     except Exception as e:
         logging.error(f"获取排位数据时出错: {str(e)}")
-        return jsonify({"status": "error", "message": f"获取排位数据时出错: {str(e)}"})
+        return {"status": "error", "message": f"获取排位数据时出错: {str(e)}"}
+
+# 获取排位数据
+@app.route('/api/get_ranked_stats', methods=['GET'])
+def get_ranked_stats():
+    puuid = request.args.get('puuid')
+    
+    if not puuid:
+        return jsonify({"status": "error", "message": "缺少puuid参数"})
+
+    return jsonify(fetch_ranked_stats(puuid))
+
+# 获取玩家汇总统计
+@app.route('/api/get_player_summary', methods=['GET'])
+def get_player_summary():
+    puuid = request.args.get('puuid')
+    
+    if not puuid:
+        return jsonify({"status": "error", "message": "缺少puuid参数"})
+    
+    summary = player_index.get(puuid)
+    if summary is None:
+        return jsonify({"status": "error", "data": None, "message": "暂无该玩家的对局数据"})
+    return jsonify({"status": "success", "data": summary})
+
+# 按条件统计已保存的对局（列式存储），指定puuid时统计该玩家，否则统计所有英雄
+@app.route('/api/get_match_stats', methods=['GET'])
+def get_match_stats():
+    if not match_columns.available:
+        return jsonify({"status": "error", "message": "未安装numpy，无法统计对局数据"})
+    
+    puuid = request.args.get('puuid')
+    queue_id = request.args.get('queue', type=int)
+    since = request.args.get('since', type=int)
+    if not puuid:
+        min_games = request.args.get('min_games', 1, type=int)
+        return jsonify({"status": "success", "data": match_columns.champion_stats(queue_id, since, min_games)})
+    
+    stats = match_columns.player_stats(puuid, queue_id, request.args.get('champion', type=int), since)
+    if stats is None:
+        return jsonify({"status": "error", "data": None, "message": "暂无符合条件的对局数据"})
+    return jsonify({"status": "success", "data": stats})
+
+# 读取英雄选择或游戏中的玩家列表
+def fetch_lobby_players():
+    """ 返回 (来源, 阶段, 玩家列表)，不在英雄选择或游戏中时玩家列表为None """
+    response = lcu_get("/lol-champ-select/v1/session")
+    if response.status_code == 200:
+        session = response.json()
+        players = [
+            {"puuid": member.get("puuid"), "summonerId": member.get("summonerId"), "team": team,
+             "championId": member.get("championId"), "position": member.get("assignedPosition")}
+            for team, key in (("ally", "myTeam"), ("enemy", "theirTeam"))
+            for member in session.get(key) or []
+        ]
+        return "champ_select", (session.get("timer") or {}).get("phase"), players
+
+    response = lcu_get("/lol-gameflow/v1/session")
+    if response.status_code == 200:
+        session = response.json()
+        game_data = session.get("gameData") or {}
+        players = [
+            {"puuid": member.get("puuid"), "summonerId": member.get("summonerId"), "team": team,
+             "championId": member.get("championId"), "position": member.get("selectedPosition")}
+            for team, key in (("team_one", "teamOne"), ("team_two", "teamTwo"))
+            for member in game_data.get(key) or []
+        ]
+        if players:
+            return "gameflow", session.get("phase"), players
+
+    return None, None, None
+
+# 一次获取英雄选择或游戏中所有玩家的信息、排位和近期战绩
+@app.route('/api/lobby_snapshot', methods=['GET'])
+def lobby_snapshot():
+    try:
+        source, phase, players = fetch_lobby_players()
+        if players is None:
+            return jsonify({"status": "error", "message": "当前不在英雄选择或游戏中"})
+        
+        # 所有玩家的所有查询一起提交，整体耗时约等于最慢的单个查询
+        lookups = {
+            "summoner": fetch_summoner,
+            "ranked": fetch_ranked_stats,
+            "matches": lambda puuid: fetch_match_history(puuid, 0, LOBBY_RECENT_GAMES - 1),
+        }
+        futures = {}
+        for index, player in enumerate(players):
+            # 排位中对方玩家在英雄选择阶段是隐藏的，没有puuid
+            if player["puuid"]:
+                for name, lookup in lookups.items():
+                    futures[lobby_executor.submit(contextvars.copy_context().run, lookup,
+                                                  player["puuid"])] = (index, name)
+        
+        for future in as_completed(futures):
+            index, name = futures[future]
+            players[index][name] = future.result()
+            if name == "matches" and players[index][name]["status"] == "success":
+                # 只返回玩家卡片用到的字段
+                players[index][name]["data"] = project_history(players[index][name]["data"], "card")
+        for player in players:
+            if player["puuid"]:
+                player["summary"] = player_index.get(player["puuid"])
+        
+        logging.info(f"获取对局玩家信息完成，共{len(players)}名玩家，{len(futures)}次查询")
+        return jsonify({"status": "success", "data": {"source": source, "phase": phase, "players": players}})
+    
+    except LCUNotConnectedError:
+        return jsonify({"status": "error", "message": "未连接到英雄联盟客户端"})
+    except Exception as e:
+        logging.error(f"获取对局玩家信息时出错: {str(e)}")
+        return jsonify({"status": "error", "message": f"获取对局玩家信息时出错: {str(e)}"})
+
+# LCU请求统计（凭据缓存、接口解析、并发请求合并）
+@app.route('/api/get_lcu_stats', methods=['GET'])
+def get_lcu_stats():
+    return jsonify({"status": "success", "data": {
+        "credentials": credentials.stats(),
+        "endpoints": endpoints.stats(),
+        "single_flight": flights.stats(),
+        "governor": governor.stats(),
+    }})
+
+# JSON序列化统计（各接口的编码耗时和输出大小）
+@app.route('/api/get_serialization_stats', methods=['GET'])
+def get_serialization_stats():
+    return jsonify({"status": "success", "data": serialization.stats()})
+
+# 对局缓存统计
+@app.route('/api/get_match_cache_stats', methods=['GET'])
+def get_match_cache_stats():
+    return jsonify({"status": "success", "data": match_cache.stats()})
+
+# 清理对局缓存内存占用（磁盘数据保留）
+@app.route('/api/evict_match_cache', methods=['POST'])
+def evict_match_cache():
+    target_bytes = request.args.get('target_bytes', 0, type=int)
+    removed = match_cache.evict_memory(target_bytes)
+    return jsonify({"status": "success", "data": {"evicted": removed, **match_cache.stats()}})
+
+# 整理对局缓存磁盘存储
+@app.route('/api/compact_match_cache', methods=['POST'])
+def compact_match_cache():
+    max_games = request.args.get('max_games', None, type=int)
+    try:
+        removed = match_cache.compact(max_games)
+        return jsonify({"status": "success", "data": {"removed": removed, **match_cache.stats()}})
+    except Exception as e:
+        logging.error(f"整理对局缓存时出错: {str(e)}")
+        return jsonify({"status": "error", "message": f"整理对局缓存时出错: {str(e)}"})
+
+# 战绩存储统计
+@app.route('/api/get_match_history_stats', methods=['GET'])
+def get_match_history_stats():
+    return jsonify({"status": "success", "data": history_store.stats()})
+
+# 玩家汇总索引统计
+@app.route('/api/get_player_summary_stats', methods=['GET'])
+def get_player_summary_stats():
+    return jsonify({"status": "success", "data": player_index.stats()})
+
+# 对局列式存储统计
+@app.route('/api/get_match_columns_stats', methods=['GET'])
+def get_match_columns_stats():
+    return jsonify({"status": "success", "data": match_columns.stats()})
+
+# 马种评分缓存统计
+@app.route('/api/get_horse_rank_stats', methods=['GET'])
+def get_horse_rank_stats():
+    return jsonify({"status": "success", "data": horse_ranks.stats()})
+
+# 缓存命中、请求合并等计数由各模块自行统计，输出指标时读取
+metrics.add_source('jk_cache_lookups_total', '缓存查询次数', ('cache', 'result'), lambda: {
+    ('lcu_credentials', 'hit'): credentials.hits,
+    ('lcu_credentials', 'miss'): credentials.misses,
+    ('match_detail', 'memory_hit'): match_cache.memory_hits,
+    ('match_detail', 'disk_hit'): match_cache.disk_hits,
+    ('match_detail', 'miss'): match_cache.misses,
+    ('horse_rank', 'hit'): horse_ranks.hits,
+    ('horse_rank', 'miss'): horse_ranks.computed,
+    ('asset', 'hit'): assets.hits,
+    ('asset', 'miss'): assets.misses,
+})
+metrics.add_source('jk_lcu_single_flight_total', 'LCU请求合并（shared为共享了进行中相同请求的结果）', ('result',),
+                   lambda: {('upstream',): flights.leaders, ('shared',): flights.shared})
+metrics.add_source('jk_match_history_total', '战绩存储读取与同步', ('kind',), lambda: {
+    ('windows_served',): history_store.served,
+    ('lcu_pages',): history_store.lcu_pages,
+    ('games_downloaded',): history_store.games_downloaded,
+})
+metrics.add_source('jk_lcu_governor_total', 'LCU并发控制：上限调整、重试、排队及排队超时次数', ('event',), lambda: {
+    (event,): value for event, value in governor.stats().items()
+    if event in ('increases', 'decreases', 'retries', 'queued', 'timeouts')
+})
+metrics.add_source('jk_lcu_concurrency', 'LCU并发上限和进行中的请求数', ('kind',), lambda: {
+    (kind,): value for kind, value in governor.stats().items() if kind in ('limit', 'in_flight')
+}, kind='gauge')
+metrics.add_source('jk_lcu_queue_depth', '等待LCU请求名额的请求数', ('priority',), lambda: {
+    (priority,): depth for priority, depth in governor.stats()["queue_depth"].items()
+}, kind='gauge')
+
+# 由计数器得出缓存命中率和接口路径回退率
+def metric_rates(counters):
+    caches = {}
+    for (cache, result), value in counters['jk_cache_lookups_total'][2].items():
+        entry = caches.setdefault(cache, {"hits": 0, "lookups": 0})
+        entry["lookups"] += value
+        if result != 'miss':
+            entry["hits"] += value
+    
+    resolutions = {}
+    for (name, kind), value in counters['jk_lcu_endpoint_resolutions_total'][2].items():
+        resolutions.setdefault(name, {"direct": 0, "race": 0, "fallback": 0})[kind] = value
+    
+    return {
+        "cache_hit_rate": {cache: round(entry["hits"] / entry["lookups"], 4) if entry["lookups"] else 0
+                           for cache, entry in caches.items()},
+        # 回退只发生在直接请求已记录的路径失败之后
+        "endpoint_fallback_rate": {name: round(kinds["fallback"] / kinds["direct"], 4) if kinds["direct"] else 0
+                                   for name, kinds in resolutions.items()},
+    }
+
+# 游戏图标（英雄、物品、召唤师技能、召唤师头像），按ID访问
+@app.route('/api/asset/<kind>/<int:asset_id>', methods=['GET'])
+def get_asset(kind, asset_id):
+    if kind not in ASSET_KINDS:
+        return jsonify({"status": "error", "message": f"未知的图标类型: {kind}"}), 404
+
+    assets.maybe_prewarm()
+    asset = assets.get(kind, asset_id)
+    if asset is None:
+        return jsonify({"status": "error", "message": f"找不到图标: {kind}/{asset_id}"}), 404
+
+    response = send_file(asset.path, mimetype=asset.content_type, etag=asset.digest, conditional=True)
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    return response
+
+# 重新预取当前客户端版本的英雄、物品和召唤师技能图标
+@app.route('/api/prewarm_assets', methods=['POST'])
+def prewarm_assets():
+    try:
+        started = assets.prewarm(current_client_build())
+    except Exception as e:
+        logging.error(f"预取图标时出错: {str(e)}")
+        return jsonify({"status": "error", "message": f"预取图标时出错: {str(e)}"})
+    if not started:
+        return jsonify({"status": "error", "message": "图标预取正在进行"})
+    return jsonify({"status": "success", "data": assets.stats()})
+
+# 图标缓存统计（包括预取进度）
+@app.route('/api/get_asset_stats', methods=['GET'])
+def get_asset_stats():
+    return jsonify({"status": "success", "data": assets.stats()})
+
+# 运行指标：默认为Prometheus文本格式，format=json时返回带估算百分位的JSON汇总
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    if request.args.get('format') == 'json':
+        return jsonify({"status": "success", "data": {**metrics.summary(), **metric_rates(metrics.counters())}})
+    return Response(metrics.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# 对所有线程的调用栈采样一段时间（需以--profile启动），结果写入分析目录中的折叠栈文件
+@app.route('/api/profile/sample', methods=['POST'])
+def profile_sample():
+    seconds = request.args.get('seconds', 10, type=float)
+    try:
+        filename = profiler.sample(seconds)
+        return jsonify({"status": "success", "data": {"file": filename, "directory": profiler.output_dir}})
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)})
 
 # 窗口控制API
 @app.route('/api/minimize_window', methods=['POST'])
@@ -336,25 +808,89 @@ def close_window():
     # 在Flask中，这需要通过其他方式实现，如通过Electron API
     return jsonify({"status": "success", "message": "Close command received"})
 
-def open_browser():
+# 服务开始监听后的状态（实际端口和启动用时），未就绪时为None
+ready_info = None
+
+# 就绪信号：服务开始监听后向标准输出写一行 "JK_READY {json}"，Electron和构建脚本据此得知后端已可用及实际端口
+READY_SIGNAL = 'JK_READY'
+
+# 健康检查
+@app.route('/api/health', methods=['GET'])
+def health():
+    if ready_info is None:
+        return jsonify({"status": "starting", "message": "服务启动中"}), 503
+    return jsonify({"status": "success", "data": {**ready_info, "uptime_seconds": round(time.perf_counter() - STARTED_AT, 3)}})
+
+def bind_port(preferred, fallback=False):
+    """ 绑定并监听端口，返回套接字交给服务使用（不再重新绑定，避免端口在两次绑定之间被占用）；
+    fallback为True时端口被占用则改用系统分配的空闲端口（0表示直接由系统分配） """
+    for port in ([preferred, 0] if fallback and preferred else [preferred]):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name != 'nt':
+            # 与werkzeug和aiohttp一致：允许重新绑定处于TIME_WAIT的端口（Windows上该选项含义不同，不设置）
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(('0.0.0.0', port))
+            sock.listen(128)
+            return sock
+        except OSError:
+            sock.close()
+            logging.warning(f"端口 {port} 已被占用")
+    raise SystemExit(f"端口 {preferred} 已被占用，可使用 --port 指定其他端口或加上 --port-fallback")
+
+def announce_ready(port, open_web=False):
+    """ 服务开始监听后调用：输出就绪信号，需要时打开浏览器 """
+    global ready_info
+    init_ms = round((time.perf_counter() - STARTED_AT) * 1000)
+    ready_info = {"port": port, "pid": os.getpid(), "init_ms": init_ms}
+    print(f"{READY_SIGNAL} {json.dumps(ready_info)}", flush=True)
+    logging.info(f"服务已就绪: http://localhost:{port}，导入和初始化用时 {init_ms}ms")
+    if open_web:
+        threading.Thread(target=open_browser, args=(port,), daemon=True).start()
+
+def open_browser(port=5000):
     """在新线程中打开浏览器，避免阻塞主线程"""
     if not IS_ELECTRON:
-        webbrowser.open('http://localhost:5000')
+        webbrowser.open(f'http://localhost:{port}')
 
 if __name__ == '__main__':
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='JK应用')
     parser.add_argument('--no-web', action='store_true', help='不自动打开Web浏览器')
     parser.add_argument('--debug', action='store_true', help='启用调试模式')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='使用异步模式(aiohttp)启动服务')
+    parser.add_argument('--port', type=int, default=5000, help='服务端口，0表示由系统分配')
+    parser.add_argument('--port-fallback', action='store_true', help='端口被占用时改用系统分配的空闲端口（实际端口见就绪信号）')
+    parser.add_argument('--profile', nargs='?', const='request', choices=['request', 'all'],
+                        help='启用性能分析：request只分析带有X-JK-Profile: 1请求头或profile=1参数的请求，all分析所有接口请求')
+    parser.add_argument('--profile-dir', default=data_path('profiles'), help='性能分析结果目录')
     args = parser.parse_args()
     
-    # 如果不在Electron环境下且没有--no-web参数，则自动打开浏览器
-    if not IS_ELECTRON and not args.no_web:
-        threading.Timer(1.5, open_browser).start()
+    if args.profile:
+        profiler.configure(args.profile_dir, profile_all=args.profile == 'all')
+        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, profiler)
+    
+    # 如果不在Electron环境下且没有--no-web参数，则在服务就绪后自动打开浏览器
+    open_web = not IS_ELECTRON and not args.no_web
     
     # 打印应用信息
     logging.info(f"静态文件路径: {resource_path('web')}")
     logging.info(f"当前工作目录: {os.getcwd()}")
     
-    # 启动Flask应用
-    app.run(host='0.0.0.0', port=5000, debug=args.debug)
+    if args.debug:
+        # 调试模式使用Flask的自动重载（在子进程中运行服务），不输出就绪信号
+        if open_web:
+            threading.Timer(1.5, open_browser, args=(args.port,)).start()
+        app.run(host='0.0.0.0', port=args.port, debug=True)
+    else:
+        sock = bind_port(args.port, args.port_fallback)
+        if args.use_async:
+            # 启动异步服务（需要aiohttp）
+            import async_server
+            async_server.run(app, match_cache, history_store, player_index, match_columns, resource_path('web'),
+                             host='0.0.0.0', sock=sock, on_ready=lambda port: announce_ready(port, open_web))
+        else:
+            # 启动Flask应用（与app.run相同的多线程服务，使用已监听的套接字，就绪信号中为实际监听的端口）
+            server = make_server('0.0.0.0', sock.getsockname()[1], app, threaded=True, fd=sock.fileno())
+            announce_ready(server.port, open_web)
+            server.serve_forever()
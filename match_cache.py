@@ -0,0 +1,226 @@
+"""
+对局详情缓存 - 内存LRU + SQLite持久化存储
+
+已结束的对局详情不会再变化，因此每场对局最多只需要从LCU获取一次。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 内存缓存默认上限（按JSON编码后的字节数估算）
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+
+
+class MatchDetailCache:
+    """按gameId缓存对局详情
+
+    内存中保存最近使用的对局（按字节数限制大小），所有对局都以zlib压缩后写入SQLite，
+    应用重启后仍然可以直接读取。
+    """
+
+    def __init__(self, db_path, max_memory_bytes=DEFAULT_MEMORY_BYTES):
+        """初始化缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_memory_bytes: 内存缓存字节数上限
+        """
+        self.db_path = db_path
+        self.max_memory_bytes = max_memory_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # game_id -> (data, size)
+        self._memory_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS match_details (
+                game_id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, game_id):
+        """获取对局详情
+
+        Args:
+            game_id: 对局ID
+
+        Returns:
+            dict: 对局详情，未缓存时返回None
+        """
+        game_id = int(game_id)
+        with self._lock:
+            entry = self._memory.get(game_id)
+            if entry is not None:
+                self._memory.move_to_end(game_id)
+                self.memory_hits += 1
+                return entry[0]
+
+            row = self._db.execute(
+                "SELECT data FROM match_details WHERE game_id = ?", (game_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            raw = zlib.decompress(row[0])
+            data = json.loads(raw)
+            self._db.execute(
+                "UPDATE match_details SET accessed_at = ? WHERE game_id = ?", (time.time(), game_id)
+            )
+            self._db.commit()
+            self.disk_hits += 1
+            self._remember(game_id, data, len(raw))
+            return data
+
+    def put(self, game_id, data):
+        """写入对局详情
+
+        Args:
+            game_id: 对局ID
+            data: LCU返回的对局详情
+        """
+        game_id = int(game_id)
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO match_details (game_id, data, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (game_id, zlib.compress(raw), len(raw), now, now)
+            )
+            self._db.commit()
+            self._remember(game_id, data, len(raw))
+
+    def iter_details(self, skip=None, batch_size=200):
+        """按gameId顺序分批读取磁盘上的所有对局详情（不放入内存缓存、不计入命中统计）
+
+        Args:
+            skip: 判断是否跳过某场对局的函数 skip(game_id)，跳过的对局不解压
+            batch_size: 每批的对局数量
+
+        Yields:
+            list: 一批对局详情
+        """
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT game_id, data FROM match_details WHERE game_id > ? ORDER BY game_id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            batch = [json.loads(zlib.decompress(data)) for game_id, data in rows if skip is None or not skip(game_id)]
+            if batch:
+                yield batch
+
+    def evict_memory(self, target_bytes=0):
+        """将内存缓存缩减到指定字节数以下（磁盘数据保留）
+
+        Args:
+            target_bytes: 目标字节数，0表示清空内存缓存
+
+        Returns:
+            int: 移出内存的对局数量
+        """
+        with self._lock:
+            return self._shrink(target_bytes)
+
+    def compact(self, max_games=None):
+        """整理磁盘存储
+
+        Args:
+            max_games: 最多保留的对局数量，超出时删除最久未访问的对局；None表示全部保留
+
+        Returns:
+            int: 删除的对局数量
+        """
+        with self._lock:
+            removed = 0
+            if max_games is not None:
+                stale = [row[0] for row in self._db.execute(
+                    "SELECT game_id FROM match_details ORDER BY accessed_at DESC LIMIT -1 OFFSET ?",
+                    (max_games,)
+                )]
+                self._db.executemany("DELETE FROM match_details WHERE game_id = ?", [(g,) for g in stale])
+                self._db.commit()
+                for game_id in stale:
+                    entry = self._memory.pop(game_id, None)
+                    if entry is not None:
+                        self._memory_bytes -= entry[1]
+                removed = len(stale)
+            self._db.execute("VACUUM")
+            logger.info(f"对局缓存整理完成，删除 {removed} 场对局")
+            return removed
+
+    def stats(self):
+        """获取缓存统计
+
+        Returns:
+            dict: 命中率、内存和磁盘占用等信息
+        """
+        with self._lock:
+            games, raw_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM match_details"
+            ).fetchone()
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "memory_games": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "disk_games": games,
+                "disk_raw_bytes": raw_bytes,
+                "disk_file_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remember(self, game_id, data, size):
+        """放入内存LRU（调用方需持有锁）"""
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(game_id, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[game_id] = (data, size)
+        self._memory_bytes += size
+        self._shrink(self.max_memory_bytes)
+
+    def _shrink(self, target_bytes):
+        """按LRU顺序移出内存缓存直到不超过target_bytes（调用方需持有锁）"""
+        removed = 0
+        while self._memory and self._memory_bytes > target_bytes:
+            _, (_, size) = self._memory.popitem(last=False)
+            self._memory_bytes -= size
+            removed += 1
+        self.evictions += removed
+        return removed
@@ -0,0 +1,479 @@
+"""
+对局列式存储 - 把每场对局中每名玩家的常用统计按列保存为定长数组文件，内存映射后直接做跨对局统计
+
+每列一个文件（小端定长整数，按行追加），一行为一场对局中的一名玩家，同一场对局的行相邻。
+查询时把各列文件映射为numpy数组，筛选和聚合都在映射的数组上按列完成，不需要解析任何对局JSON，
+数千场对局的统计在毫秒级完成，占用的内存只有实际读到的页面。
+写入时先追加所有列文件，再原子地更新meta.json中的行数；读取和重新打开时只使用已提交的行，
+写入中途退出留下的多余数据会在下次打开时截掉。
+接口请求中获取到的对局放入队列，由后台线程合并成批写入，查看对局详情不需要等待写盘。
+需要安装numpy；未安装时不保存也不提供统计。
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 列名 -> 数据类型（小端），每场对局的每名玩家一行
+COLUMNS = {
+    'game_id': '<i8',
+    'game_creation': '<i8',     # 毫秒时间戳
+    'player': '<i4',            # players.txt中的行号，没有PUUID（人机）时为-1
+    'participant_id': '<u1',
+    'team_id': '<u2',
+    'champion_id': '<i2',
+    'queue_id': '<i2',
+    'duration': '<i4',          # 秒
+    'win': '<u1',
+    'kills': '<u2',
+    'deaths': '<u2',
+    'assists': '<u2',
+    'damage': '<i4',            # 对英雄伤害
+    'gold': '<i4',
+    'cs': '<i2',                # 小兵和野怪
+    'team_kills': '<u2',
+    'team_damage': '<i4',
+}
+
+META_FILE = 'meta.json'
+PLAYERS_FILE = 'players.txt'
+FORMAT_VERSION = 1
+
+# 后台写入：最多等待写入的批数（超出时丢弃，下次启动时从对局详情缓存导入），
+# 以及收到对局后再等待多久合并之后到达的对局、每次最多写入的对局数
+MAX_PENDING_BATCHES = 256
+WRITE_DELAY_SECONDS = 1.0
+MAX_WRITE_GAMES = 500
+
+
+class MatchColumnStore:
+    """对局列式存储"""
+
+    def __init__(self, directory):
+        """打开（或创建）存储
+
+        Args:
+            directory: 存储目录
+        """
+        self.directory = directory
+        self.available = np is not None
+        self._lock = threading.Lock()        # 保护内存中的状态，只在短时间内持有
+        self._write_lock = threading.Lock()  # 同一时间只有一个写入，写盘期间不持有self._lock
+        self._pending = queue.Queue(maxsize=MAX_PENDING_BATCHES)
+        self._writer = None
+        self._rows = 0
+        self._players = {}   # puuid -> 编号
+        self._games = set()
+        self._maps = None    # (行数, {列名: 映射的数组})
+
+        self.ingested = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.queries = 0
+
+        if not self.available:
+            logger.info("未安装numpy，不启用对局列式存储")
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def ingest(self, details):
+        """追加对局并等待写入完成，已保存的对局会被跳过
+
+        Args:
+            details: LCU返回的对局详情列表
+
+        Returns:
+            int: 新追加的对局数
+        """
+        if not self.available:
+            return 0
+
+        with self._write_lock:
+            with self._lock:
+                rows = {name: [] for name in COLUMNS}
+                new_players = {}
+                added = set()
+                for detail in details:
+                    game_id = detail.get("gameId")
+                    if game_id is None or game_id in self._games or game_id in added:
+                        self.skipped += 1
+                        continue
+                    for row in _game_rows(detail):
+                        puuid = row.pop("puuid")
+                        if puuid and puuid not in self._players and puuid not in new_players:
+                            new_players[puuid] = len(self._players) + len(new_players)
+                        row["player"] = self._players.get(puuid, new_players.get(puuid)) if puuid else -1
+                        for name in COLUMNS:
+                            rows[name].append(row[name])
+                    added.add(game_id)
+                if not added:
+                    return 0
+                committed_rows = self._rows
+
+            # 写盘期间查询和判断对局是否已保存不受影响（只读取已提交的行）
+            try:
+                self._append(rows, list(new_players), committed_rows, len(self._players) + len(new_players))
+            except Exception:
+                self._truncate(committed_rows)
+                raise
+
+            with self._lock:
+                self._rows = committed_rows + len(rows['game_id'])
+                self._players.update(new_players)
+                self._games.update(added)
+                self.ingested += len(added)
+            return len(added)
+
+    def ingest_results(self, results, wait=False):
+        """把对局详情接口的返回结果放入后台写入队列（失败的结果会被跳过），不等待写盘
+
+        Args:
+            results: fetch_match_detail返回的结果列表
+            wait: 队列已满时是否等待（后台任务使用）；否则丢弃这些对局，下次启动时从对局详情缓存导入
+        """
+        if not self.available:
+            return
+        details = [result["data"] for result in results if result.get("status") == "success" and result.get("data")]
+        if not details:
+            return
+        self._start_writer()
+        try:
+            self._pending.put(details, block=wait)
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(details)
+
+    def flush(self, timeout=None):
+        """等待队列中的对局全部写入
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否已全部写入
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending.all_tasks_done:
+            while self._pending.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending.all_tasks_done.wait(remaining)
+        return True
+
+    def player_stats(self, puuid, queue_id=None, champion_id=None, since=None):
+        """统计玩家在已保存对局中的表现
+
+        Args:
+            puuid: 玩家PUUID
+            queue_id: 只统计该队列
+            champion_id: 只统计该英雄
+            since: 只统计该时间（毫秒时间戳）之后开始的对局
+
+        Returns:
+            dict: 场数、胜率、场均KDA、分均伤害/经济/补兵、参团率、伤害占比，以及按英雄和队列的分组统计；
+                没有符合条件的对局时返回None
+        """
+        if not self.available:
+            return None
+        start = time.perf_counter()
+        with self._lock:
+            player = self._players.get(puuid)
+        if player is None:
+            return None
+
+        columns = self._columns()
+        mask = columns['player'] == player
+        mask = self._filter(columns, mask, queue_id, champion_id, since)
+        selected = {name: columns[name][mask] for name in ('champion_id', 'queue_id', 'duration', 'win', 'kills',
+                                                           'deaths', 'assists', 'damage', 'gold', 'cs',
+                                                           'team_kills', 'team_damage')}
+        if not len(selected['win']):
+            return None
+
+        result = _summarize(selected)
+        result["champions"] = _group(selected, 'champion_id', 'championId')
+        result["queues"] = _group(selected, 'queue_id', 'queueId')
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        self.queries += 1
+        return result
+
+    def champion_stats(self, queue_id=None, since=None, min_games=1):
+        """统计所有已保存对局中各英雄的出场次数、胜率和场均数据
+
+        Args:
+            queue_id: 只统计该队列
+            since: 只统计该时间（毫秒时间戳）之后开始的对局
+            min_games: 出场次数少于该值的英雄不返回
+
+        Returns:
+            dict: {"rows": 统计的行数, "champions": [...], "elapsed_ms": 耗时}
+        """
+        if not self.available:
+            return None
+        start = time.perf_counter()
+        columns = self._columns()
+        mask = self._filter(columns, np.ones(len(columns['game_id']), dtype=bool), queue_id, None, since)
+        selected = {name: columns[name][mask] for name in ('champion_id', 'duration', 'win', 'kills', 'deaths',
+                                                           'assists', 'damage', 'gold', 'cs',
+                                                           'team_kills', 'team_damage')}
+        champions = [entry for entry in _group(selected, 'champion_id', 'championId') if entry["games"] >= min_games]
+        self.queries += 1
+        return {"rows": int(mask.sum()), "champions": champions,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def has_game(self, game_id):
+        """对局是否已保存"""
+        with self._lock:
+            return int(game_id) in self._games
+
+    def stats(self):
+        """获取存储统计"""
+        with self._lock:
+            rows = self._rows
+            return {
+                "available": self.available,
+                "games": len(self._games),
+                "rows": rows,
+                "players": len(self._players),
+                "bytes": rows * sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values()) if self.available else 0,
+                "ingested": self.ingested,
+                "skipped": self.skipped,
+                "pending": self._pending.qsize(),
+                "dropped": self.dropped,
+                "queries": self.queries,
+            }
+
+    def _filter(self, columns, mask, queue_id, champion_id, since):
+        if queue_id is not None:
+            mask &= columns['queue_id'] == queue_id
+        if champion_id is not None:
+            mask &= columns['champion_id'] == champion_id
+        if since is not None:
+            mask &= columns['game_creation'] >= since
+        return mask
+
+    def _columns(self):
+        """各列已提交部分的内存映射（行数变化后重新映射）"""
+        with self._lock:
+            rows = self._rows
+            if self._maps is not None and self._maps[0] == rows:
+                return self._maps[1]
+            if rows:
+                maps = {name: np.memmap(self._path(name), dtype=dtype, mode='r', shape=(rows,))
+                        for name, dtype in COLUMNS.items()}
+            else:
+                maps = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            self._maps = (rows, maps)
+            return maps
+
+    def _open(self):
+        """读取已提交的行数，截掉未提交的数据，加载玩家编号和已保存的对局"""
+        meta_path = os.path.join(self.directory, META_FILE)
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != FORMAT_VERSION:
+                logger.info("对局列式存储格式已变化，重新建立")
+                meta = {}
+        self._rows = meta.get("rows", 0)
+        player_count = meta.get("players", 0)
+
+        for name, dtype in COLUMNS.items():
+            with open(self._path(name), 'ab') as f:
+                f.truncate(self._rows * np.dtype(dtype).itemsize)
+
+        players_path = os.path.join(self.directory, PLAYERS_FILE)
+        players = []
+        if os.path.exists(players_path):
+            with open(players_path, encoding='utf-8') as f:
+                players = f.read().splitlines()[:player_count]
+        with open(players_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(puuid + '\n' for puuid in players))
+        self._players = {puuid: index for index, puuid in enumerate(players)}
+
+        self._games = set(np.unique(self._columns()['game_id']).tolist())
+        if self._rows:
+            logger.info(f"对局列式存储: {len(self._games)} 场对局，{self._rows} 行")
+
+    def _start_writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run_writer, name='match-columns-writer', daemon=True)
+                self._writer.start()
+
+    def _run_writer(self):
+        """后台写入：收到对局后等待WRITE_DELAY_SECONDS，把这段时间内到达的对局合并成一批写入"""
+        while True:
+            batches = [self._pending.get()]
+            deadline = time.monotonic() + WRITE_DELAY_SECONDS
+            games = len(batches[0])
+            while games < MAX_WRITE_GAMES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batches.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                games += len(batches[-1])
+            try:
+                self.ingest([detail for batch in batches for detail in batch])
+            except Exception as e:
+                logger.error(f"写入对局列式存储时出错: {str(e)}")
+            finally:
+                for _ in batches:
+                    self._pending.task_done()
+
+    def _append(self, rows, new_players, committed_rows, player_count):
+        """追加各列和新玩家，全部写入磁盘后再更新meta.json提交行数（调用方持有写入锁）"""
+        for name, dtype in COLUMNS.items():
+            with open(self._path(name), 'ab') as f:
+                f.write(np.asarray(rows[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        if new_players:
+            with open(os.path.join(self.directory, PLAYERS_FILE), 'a', encoding='utf-8') as f:
+                f.write(''.join(puuid + '\n' for puuid in new_players))
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta_path = os.path.join(self.directory, META_FILE)
+        temp_path = meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": FORMAT_VERSION, "rows": committed_rows + len(rows['game_id']),
+                       "players": player_count}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, meta_path)
+
+    def _truncate(self, committed_rows):
+        """写入失败后截掉各列和玩家列表中未提交的数据，之后的写入从已提交的位置继续（调用方持有写入锁）"""
+        try:
+            for name, dtype in COLUMNS.items():
+                with open(self._path(name), 'ab') as f:
+                    f.truncate(committed_rows * np.dtype(dtype).itemsize)
+            with self._lock:
+                players = sorted(self._players, key=self._players.get)
+            with open(os.path.join(self.directory, PLAYERS_FILE), 'w', encoding='utf-8') as f:
+                f.write(''.join(puuid + '\n' for puuid in players))
+        except OSError as e:
+            logger.error(f"截掉对局列式存储中未提交的数据时出错: {str(e)}")
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.col")
+
+
+def _game_rows(detail):
+    """把一场对局展开为每名玩家一行"""
+    identities = {
+        identity.get("participantId"): (identity.get("player") or {}).get("puuid")
+        for identity in detail.get("participantIdentities") or []
+    }
+    participants = detail.get("participants") or []
+    team_kills = {}
+    team_damage = {}
+    for participant in participants:
+        stats = participant.get("stats") or {}
+        team_id = participant.get("teamId")
+        team_kills[team_id] = team_kills.get(team_id, 0) + (stats.get("kills") or 0)
+        team_damage[team_id] = team_damage.get(team_id, 0) + (stats.get("totalDamageDealtToChampions") or 0)
+
+    rows = []
+    for participant in participants:
+        stats = participant.get("stats") or {}
+        team_id = participant.get("teamId") or 0
+        rows.append({
+            'game_id': detail["gameId"],
+            'game_creation': detail.get("gameCreation") or 0,
+            'puuid': identities.get(participant.get("participantId")),
+            'participant_id': participant.get("participantId") or 0,
+            'team_id': team_id,
+            'champion_id': participant.get("championId") or 0,
+            'queue_id': detail.get("queueId") or 0,
+            'duration': detail.get("gameDuration") or 0,
+            'win': 1 if stats.get("win") else 0,
+            'kills': stats.get("kills") or 0,
+            'deaths': stats.get("deaths") or 0,
+            'assists': stats.get("assists") or 0,
+            'damage': stats.get("totalDamageDealtToChampions") or 0,
+            'gold': stats.get("goldEarned") or 0,
+            'cs': (stats.get("totalMinionsKilled") or 0) + (stats.get("neutralMinionsKilled") or 0),
+            'team_kills': team_kills.get(participant.get("teamId"), 0),
+            'team_damage': team_damage.get(participant.get("teamId"), 0),
+        })
+    return rows
+
+
+def _summarize(selected):
+    """汇总选中的行：场数、胜率、场均KDA、分均数据、参团率和伤害占比"""
+    games = len(selected['win'])
+    minutes = int(selected['duration'].sum()) / 60
+    kills = int(selected['kills'].sum())
+    deaths = int(selected['deaths'].sum())
+    assists = int(selected['assists'].sum())
+    wins = int(selected['win'].sum())
+    team_kills = selected['team_kills'].astype(np.float64)
+    team_damage = selected['team_damage'].astype(np.float64)
+    participation = np.divide(selected['kills'] + selected['assists'].astype(np.float64), team_kills,
+                              out=np.zeros(games), where=team_kills > 0)
+    share = np.divide(selected['damage'].astype(np.float64), team_damage, out=np.zeros(games), where=team_damage > 0)
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": round(wins / games, 4),
+        "kills": round(kills / games, 2),
+        "deaths": round(deaths / games, 2),
+        "assists": round(assists / games, 2),
+        "kda": round((kills + assists) / max(deaths, 1), 2),
+        "damage_per_min": round(int(selected['damage'].sum()) / minutes, 1) if minutes else 0,
+        "gold_per_min": round(int(selected['gold'].sum()) / minutes, 1) if minutes else 0,
+        "cs_per_min": round(int(selected['cs'].sum()) / minutes, 2) if minutes else 0,
+        "kill_participation": round(float(participation.mean()), 4),
+        "damage_share": round(float(share.mean()), 4),
+    }
+
+
+def _group(selected, column, key):
+    """按列分组统计（bincount一次算完所有分组，比值也按列计算），按场数从多到少排序"""
+    values, inverse = np.unique(selected[column], return_inverse=True)
+    if not len(values):
+        return []
+    order = np.argsort(-np.bincount(inverse), kind='stable')
+    games = np.bincount(inverse)[order]
+    sums = {name: np.bincount(inverse, weights=selected[name])[order] for name in
+            ('win', 'kills', 'deaths', 'assists', 'damage', 'gold', 'cs', 'duration')}
+    minutes = sums['duration'] / 60
+    has_minutes = minutes > 0
+
+    def per_minute(name, digits):
+        rates = np.divide(sums[name], minutes, out=np.zeros(len(games)), where=has_minutes)
+        return np.round(rates, digits).tolist()
+
+    fields = {
+        key: values[order].tolist(),
+        "games": games.tolist(),
+        "wins": sums['win'].astype(np.int64).tolist(),
+        "win_rate": np.round(sums['win'] / games, 4).tolist(),
+        "kills": np.round(sums['kills'] / games, 2).tolist(),
+        "deaths": np.round(sums['deaths'] / games, 2).tolist(),
+        "assists": np.round(sums['assists'] / games, 2).tolist(),
+        "kda": np.round((sums['kills'] + sums['assists']) / np.maximum(sums['deaths'], 1), 2).tolist(),
+        "damage_per_min": per_minute('damage', 1),
+        "gold_per_min": per_minute('gold', 1),
+        "cs_per_min": per_minute('cs', 2),
+    }
+    return [dict(zip(fields, row)) for row in zip(*fields.values())]
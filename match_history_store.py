@@ -0,0 +1,272 @@
+"""
+战绩列表增量同步 - 按PUUID在本地保存玩家的对局列表
+
+本地保存的对局始终是该玩家从最新一场开始连续的一段战绩。
+有新对局时只向LCU请求比本地最新一场更新的对局，任意索引区间都从本地存储返回，
+翻页、重复打开同一玩家或区间重叠时不会重复下载已有的对局。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# 每次向LCU请求的对局数量
+SYNC_PAGE_SIZE = 20
+
+# 同步最新对局时最多向前翻的页数，超过后视为本地数据已无法衔接，重新建立
+MAX_HEAD_PAGES = 5
+
+# 未收到对局结束事件时，最新对局的检查间隔（秒），用于其他玩家的战绩
+HEAD_TTL_SECONDS = 120
+
+# 按PUUID同步时使用的锁数量（PUUID按哈希分配到固定数量的锁上，不为每名玩家单独创建）
+PUUID_LOCK_STRIPES = 64
+
+
+class MatchHistoryStore:
+    """按PUUID保存的战绩列表"""
+
+    def __init__(self, db_path, fetch_page):
+        """初始化存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+            fetch_page: 从LCU获取战绩的函数 fetch_page(puuid, begin_index, end_index)，
+                返回LCU原始响应（dict），失败时抛出异常
+        """
+        self.db_path = db_path
+        self._fetch_page = fetch_page
+        self._lock = threading.Lock()
+        self._puuid_locks = [threading.Lock() for _ in range(PUUID_LOCK_STRIPES)]
+        self._stale = set()
+
+        self.served = 0
+        self.lcu_pages = 0
+        self.games_downloaded = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS history_games (
+                puuid TEXT NOT NULL,
+                game_id INTEGER NOT NULL,
+                game_creation INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (puuid, game_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_games_order
+                ON history_games (puuid, game_creation DESC, game_id DESC);
+            CREATE TABLE IF NOT EXISTS history_sync (
+                puuid TEXT PRIMARY KEY,
+                synced_at REAL NOT NULL,
+                exhausted INTEGER NOT NULL DEFAULT 0,
+                meta TEXT
+            );
+        """)
+        self._db.commit()
+
+    def get_window(self, puuid, begin_index, end_index):
+        """获取指定索引区间的战绩（索引0为最新一场，区间包含两端）
+
+        Args:
+            puuid: 玩家PUUID
+            begin_index: 起始索引
+            end_index: 结束索引
+
+        Returns:
+            dict: 与LCU战绩接口相同结构的数据
+        """
+        with self._puuid_lock(puuid):
+            if self._head_is_stale(puuid):
+                self._sync_head(puuid)
+
+            depth = self._count(puuid)
+            if end_index >= depth and not self._is_exhausted(puuid):
+                self._sync_tail(puuid, depth, end_index)
+
+            games = self._read(puuid, begin_index, end_index)
+            meta = self._meta(puuid)
+            self.served += 1
+
+        return {
+            **meta,
+            "games": {
+                "gameBeginIndex": begin_index,
+                "gameEndIndex": begin_index + len(games) - 1 if games else begin_index,
+                "gameCount": len(games),
+                "games": games,
+            },
+        }
+
+    def mark_stale(self, puuid=None):
+        """标记需要重新检查最新对局（例如收到对局结束事件）
+
+        Args:
+            puuid: 玩家PUUID，None表示所有玩家
+        """
+        with self._lock:
+            if puuid is None:
+                self._db.execute("UPDATE history_sync SET synced_at = 0")
+                self._db.commit()
+            else:
+                self._stale.add(puuid)
+
+    def clear(self, puuid=None):
+        """删除本地战绩
+
+        Args:
+            puuid: 玩家PUUID，None表示所有玩家
+        """
+        with self._lock:
+            if puuid is None:
+                self._db.execute("DELETE FROM history_games")
+                self._db.execute("DELETE FROM history_sync")
+            else:
+                self._db.execute("DELETE FROM history_games WHERE puuid = ?", (puuid,))
+                self._db.execute("DELETE FROM history_sync WHERE puuid = ?", (puuid,))
+            self._db.commit()
+
+    def stats(self):
+        """获取存储统计
+
+        Returns:
+            dict: 玩家数、对局数、从LCU下载的页数等
+        """
+        with self._lock:
+            players, games = self._db.execute(
+                "SELECT COUNT(DISTINCT puuid), COUNT(*) FROM history_games"
+            ).fetchone()
+            return {
+                "players": players,
+                "games": games,
+                "served": self.served,
+                "lcu_pages": self.lcu_pages,
+                "games_downloaded": self.games_downloaded,
+            }
+
+    def _puuid_lock(self, puuid):
+        return self._puuid_locks[hash(puuid) % PUUID_LOCK_STRIPES]
+
+    def _head_is_stale(self, puuid):
+        with self._lock:
+            if puuid in self._stale:
+                return True
+            row = self._db.execute("SELECT synced_at FROM history_sync WHERE puuid = ?", (puuid,)).fetchone()
+        return row is None or time.time() - row[0] > HEAD_TTL_SECONDS
+
+    def _is_exhausted(self, puuid):
+        with self._lock:
+            row = self._db.execute("SELECT exhausted FROM history_sync WHERE puuid = ?", (puuid,)).fetchone()
+        return bool(row and row[0])
+
+    def _count(self, puuid):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM history_games WHERE puuid = ?", (puuid,)).fetchone()[0]
+
+    def _meta(self, puuid):
+        with self._lock:
+            row = self._db.execute("SELECT meta FROM history_sync WHERE puuid = ?", (puuid,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def _read(self, puuid, begin_index, end_index):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM history_games WHERE puuid = ? "
+                "ORDER BY game_creation DESC, game_id DESC LIMIT ? OFFSET ?",
+                (puuid, max(0, end_index - begin_index + 1), begin_index)
+            ).fetchall()
+        return [json.loads(zlib.decompress(row[0])) for row in rows]
+
+    def _fetch(self, puuid, begin_index, end_index):
+        """从LCU获取一页战绩
+
+        Returns:
+            tuple: (对局列表, 去掉对局列表后的其余字段)
+        """
+        data = self._fetch_page(puuid, begin_index, end_index)
+        self.lcu_pages += 1
+        games = (data.get("games") or {}).get("games") or []
+        meta = {key: value for key, value in data.items() if key != "games"}
+        return games, meta
+
+    def _sync_head(self, puuid):
+        """从最新一场开始向前获取，直到与本地已有的对局衔接"""
+        with self._lock:
+            known = {row[0] for row in self._db.execute(
+                "SELECT game_id FROM history_games WHERE puuid = ?", (puuid,)
+            )}
+
+        new_games = []
+        meta = {}
+        connected = not known
+        exhausted = False
+        for page in range(MAX_HEAD_PAGES):
+            begin = page * SYNC_PAGE_SIZE
+            games, meta = self._fetch(puuid, begin, begin + SYNC_PAGE_SIZE - 1)
+            fresh = [game for game in games if game.get("gameId") not in known]
+            new_games.extend(fresh)
+            if len(fresh) < len(games):
+                connected = True
+                break
+            if len(games) < SYNC_PAGE_SIZE:
+                exhausted = True
+                connected = True
+                break
+            if not known:
+                # 首次同步只取第一页，更早的对局在需要时由_sync_tail获取
+                break
+
+        if known and not connected:
+            # 新对局太多，无法与本地数据衔接，丢弃旧数据重新建立
+            logger.info(f"玩家 {puuid} 的本地战绩无法衔接，重新同步")
+            self.clear(puuid)
+
+        self._write(puuid, new_games, meta, exhausted=exhausted if not known or not connected else None)
+        if new_games:
+            logger.info(f"玩家 {puuid} 同步了 {len(new_games)} 场新对局")
+
+    def _sync_tail(self, puuid, depth, end_index):
+        """获取本地已有对局之后（更早）的对局，直到覆盖end_index"""
+        begin = depth
+        while begin <= end_index:
+            end = begin + max(SYNC_PAGE_SIZE, end_index - begin + 1) - 1
+            games, meta = self._fetch(puuid, begin, end)
+            exhausted = len(games) < end - begin + 1
+            self._write(puuid, games, meta, exhausted=exhausted)
+            if exhausted or not games:
+                break
+            begin += len(games)
+
+    def _write(self, puuid, games, meta, exhausted=None):
+        """写入对局并更新同步状态
+
+        Args:
+            exhausted: 是否已获取到最早的对局，None表示保持原状态
+        """
+        rows = [
+            (puuid, game["gameId"], game.get("gameCreation", 0),
+             zlib.compress(json.dumps(game, ensure_ascii=False, separators=(',', ':')).encode('utf-8')))
+            for game in games if game.get("gameId") is not None
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO history_games (puuid, game_id, game_creation, data) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            row = self._db.execute("SELECT exhausted FROM history_sync WHERE puuid = ?", (puuid,)).fetchone()
+            if exhausted is None:
+                exhausted = bool(row and row[0])
+            self._db.execute(
+                "INSERT OR REPLACE INTO history_sync (puuid, synced_at, exhausted, meta) VALUES (?, ?, ?, ?)",
+                (puuid, time.time(), int(exhausted), json.dumps(meta, ensure_ascii=False))
+            )
+            self._db.commit()
+            self._stale.discard(puuid)
+            self.games_downloaded += len(rows)
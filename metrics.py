@@ -0,0 +1,267 @@
+"""
+运行指标 - 按接口、LCU路径和处理阶段记录延迟直方图与计数
+
+热路径上每次记录只做一次加锁的桶计数，不保存单个样本；JSON汇总中的百分位由直方图的桶估算。
+指标可以用Prometheus文本格式输出，也可以输出便于直接查看的JSON汇总。
+"""
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# 延迟直方图的桶上限（秒），从亚毫秒的缓存命中到LCU读取超时
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+# 每个指标最多的标签组合数，超出后归入"other"，避免异常的路径或参数导致指标无限增长
+MAX_SERIES = 500
+
+# 接口处理耗时（Flask为before_request到after_request，异步模式为中间件内的处理时间）
+HTTP_LATENCY = 'jk_http_request_duration_seconds'
+# 实际发往LCU的请求耗时（合并的并发请求只记录一次）
+LCU_LATENCY = 'jk_lcu_request_duration_seconds'
+# 处理阶段耗时：凭据校验、进程扫描、候选路径探测/回退、压缩
+PHASE_LATENCY = 'jk_phase_duration_seconds'
+# 各接口的JSON编码耗时
+ENCODE_LATENCY = 'jk_json_encode_seconds'
+# LCU接口路径解析结果（direct、race、fallback）
+ENDPOINT_RESOLUTIONS = 'jk_lcu_endpoint_resolutions_total'
+
+HISTOGRAMS = {
+    HTTP_LATENCY: ('接口处理耗时', ('route', 'code')),
+    LCU_LATENCY: ('LCU请求耗时', ('path', 'status')),
+    PHASE_LATENCY: ('处理阶段耗时', ('phase',)),
+    ENCODE_LATENCY: ('JSON编码耗时', ('route',)),
+}
+
+COUNTERS = {
+    ENDPOINT_RESOLUTIONS: ('LCU接口路径解析次数', ('name', 'kind')),
+}
+
+# LCU路径中的ID段：纯数字（gameId、summonerId）或带连字符和数字的较长标识（PUUID）
+_NUMERIC_SEGMENT = re.compile(r'^\d+$')
+_ID_SEGMENT = re.compile(r'^(?=.*\d)(?=.*-)[\w-]{12,}$')
+
+
+def upstream_path(path):
+    """把LCU路径中的ID替换为占位符，作为指标标签
+
+    Args:
+        path: LCU API路径，例如 /lol-match-history/v1/games/123456
+
+    Returns:
+        str: 例如 /lol-match-history/v1/games/{id}
+    """
+    segments = path.split('?', 1)[0].split('/')
+    for i, segment in enumerate(segments):
+        if _NUMERIC_SEGMENT.match(segment):
+            segments[i] = '{id}'
+        elif _ID_SEGMENT.match(segment):
+            segments[i] = '{puuid}'
+    return '/'.join(segments)
+
+
+class _Histogram:
+    """单个标签组合的直方图，由Metrics的锁保护"""
+
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # 最后一个为超出所有上限的样本
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """按桶估算分位数（桶内线性插值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class Metrics:
+    """指标注册表
+
+    直方图和计数器的名称与标签在HISTOGRAMS、COUNTERS中声明。
+    已由各模块自行统计的计数（缓存命中等）通过add_source在输出时读取，不在热路径上重复计数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in HISTOGRAMS}  # name -> {标签值: _Histogram}
+        self._counters = {name: {} for name in COUNTERS}      # name -> {标签值: 计数}
+        self._sources = []  # (name, help, 标签名, 读取函数, 类型)
+        self.started_at = time.time()
+
+    def observe(self, name, seconds, *labels):
+        """记录一次耗时
+
+        Args:
+            name: 直方图名称
+            seconds: 耗时（秒）
+            *labels: 标签值，顺序与声明的标签名一致
+        """
+        labels = tuple(str(label) for label in labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                if len(series) >= MAX_SERIES:
+                    labels = ('other',) * len(labels)
+                histogram = series.setdefault(labels, _Histogram())
+            histogram.observe(seconds)
+
+    def inc(self, name, *labels, value=1):
+        """计数器加value
+
+        Args:
+            name: 计数器名称
+            *labels: 标签值
+            value: 增加的数量
+        """
+        labels = tuple(str(label) for label in labels)
+        with self._lock:
+            series = self._counters[name]
+            if labels not in series and len(series) >= MAX_SERIES:
+                labels = ('other',) * len(labels)
+            series[labels] = series.get(labels, 0) + value
+
+    @contextmanager
+    def timer(self, name, *labels):
+        """记录with块的耗时（发生异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, *labels)
+
+    def add_source(self, name, help_text, label_names, read, kind='counter'):
+        """注册由其他模块统计的计数器或当前值，输出指标时调用read读取
+
+        Args:
+            name: 指标名称
+            help_text: 说明
+            label_names: 标签名
+            read: 返回 {标签值元组: 数值} 的函数
+            kind: counter（累计计数）或gauge（当前值，例如并发上限、队列长度）
+        """
+        self._sources.append((name, help_text, tuple(label_names), read, kind))
+
+    def counters(self):
+        """获取所有计数器的当前值
+
+        Returns:
+            dict: name -> (说明, 标签名, {标签值元组: 计数})
+        """
+        with self._lock:
+            result = {name: (COUNTERS[name][0], COUNTERS[name][1], dict(series))
+                      for name, series in self._counters.items()}
+        for name, help_text, label_names, read, kind in self._sources:
+            if kind == 'counter':
+                result[name] = (help_text, label_names, read())
+        return result
+
+    def gauges(self):
+        """获取所有当前值指标
+
+        Returns:
+            dict: name -> (说明, 标签名, {标签值元组: 数值})
+        """
+        return {name: (help_text, label_names, read())
+                for name, help_text, label_names, read, kind in self._sources if kind == 'gauge'}
+
+    def prometheus(self):
+        """以Prometheus文本格式输出所有指标
+
+        Returns:
+            str: text/plain; version=0.0.4 格式的指标
+        """
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                help_text, label_names = HISTOGRAMS[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    base = _format_labels(label_names, labels)
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), histogram.buckets):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{name}_bucket{_format_labels(label_names + ('le',), labels + (le,))} {cumulative}")
+                    lines.append(f"{name}_sum{base} {histogram.sum!r}")
+                    lines.append(f"{name}_count{base} {histogram.count}")
+
+        for kind, values in (('counter', self.counters()), ('gauge', self.gauges())):
+            for name, (help_text, label_names, series) in values.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {value}")
+
+        lines.append("# HELP jk_uptime_seconds 服务运行时间")
+        lines.append("# TYPE jk_uptime_seconds gauge")
+        lines.append(f"jk_uptime_seconds {time.time() - self.started_at:.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """输出JSON汇总：各直方图的次数、平均值和估算的p50/p95/p99（毫秒），以及计数器和当前值指标
+
+        Returns:
+            dict: {"histograms": {name: [...]}, "counters": {name: [...]}, "gauges": {name: [...]}, "uptime_seconds": ...}
+        """
+        histograms = {}
+        with self._lock:
+            for name, series in self._histograms.items():
+                label_names = HISTOGRAMS[name][1]
+                histograms[name] = [
+                    {
+                        **dict(zip(label_names, labels)),
+                        "count": histogram.count,
+                        "avg_ms": round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0,
+                        "p50_ms": round(histogram.quantile(0.5) * 1000, 3),
+                        "p95_ms": round(histogram.quantile(0.95) * 1000, 3),
+                        "p99_ms": round(histogram.quantile(0.99) * 1000, 3),
+                        "max_ms": round(histogram.max * 1000, 3),
+                    }
+                    for labels, histogram in sorted(series.items())
+                ]
+
+        counters, gauges = (
+            {name: [{**dict(zip(label_names, labels)), "value": value} for labels, value in sorted(series.items())]
+             for name, (_, label_names, series) in values.items()}
+            for values in (self.counters(), self.gauges())
+        )
+        return {"histograms": histograms, "counters": counters, "gauges": gauges,
+                "uptime_seconds": round(time.time() - self.started_at, 3)}
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 全局指标
+metrics = Metrics()
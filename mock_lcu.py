@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟LCU服务 - 没有英雄联盟客户端时用于测试和压测后端
+
+提供main.py用到的LCU接口（HTTPS + Basic认证），返回确定性的模拟数据（相同参数每次结果相同），
+可以配置响应延迟和故障（错误响应、长时间无响应、直接断开连接）。
+使用--fake-process时以名为LeagueClientUx的子进程运行，命令行带有--app-port和--remoting-auth-token，
+后端扫描进程时会把它当作客户端，check_lcu_connection走的是与真实客户端相同的发现流程。
+
+用法示例：
+    python mock_lcu.py --fake-process --latency 30 --jitter 10
+    python mock_lcu.py --app-port=2999 --remoting-auth-token=mock-token --error-rate 0.05
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import ssl
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(levelname)s: %(message)s'
+)
+logger = logging.getLogger("mock_lcu")
+
+DEFAULT_PORT = 2999
+DEFAULT_TOKEN = 'mock-token'
+
+# 后端按进程名包含League识别客户端
+FAKE_PROCESS_NAME = 'LeagueClientUx'
+
+# 每名玩家的战绩总场数
+DEFAULT_GAMES_PER_PLAYER = 200
+
+# 当前召唤师，以及英雄选择中其他玩家的PUUID
+CURRENT_PUUID = 'mock-puuid-0000'
+LOBBY_PUUIDS = [CURRENT_PUUID] + [f'mock-puuid-{i:04d}' for i in range(1, 10)]
+
+QUEUE_IDS = [420, 420, 420, 440, 430, 450, 450, 900]
+SUPPORT_ITEM_ID = 3853
+
+# 游戏资源目录中的英雄数量、物品和召唤师技能
+CHAMPION_COUNT = 160
+ITEM_IDS = [1001, 1055, 2003, 2055, 3006, 3031, 3071, 3089, 3153, 3340, 3363, 3364, SUPPORT_ITEM_ID, 6672]
+SPELL_IDS = [1, 3, 4, 6, 7, 11, 12, 13, 14, 21, 32]
+
+# 真实对局详情中每名玩家的统计字段（只保证字段名和大致取值范围，用于让数据大小接近真实客户端）
+EXTRA_STAT_FIELDS = [
+    'causedEarlySurrender', 'combatPlayerScore', 'damageDealtToObjectives', 'damageDealtToTurrets',
+    'damageSelfMitigated', 'doubleKills', 'earlySurrenderAccomplice', 'firstInhibitorAssist',
+    'firstInhibitorKill', 'firstTowerAssist', 'firstTowerKill', 'gameEndedInEarlySurrender',
+    'gameEndedInSurrender', 'inhibitorKills', 'killingSprees', 'largestCriticalStrike',
+    'largestKillingSpree', 'largestMultiKill', 'longestTimeSpentLiving', 'magicDamageDealt',
+    'magicDamageDealtToChampions', 'magicalDamageTaken', 'neutralMinionsKilledEnemyJungle',
+    'neutralMinionsKilledTeamJungle', 'objectivePlayerScore', 'perk0', 'perk0Var1', 'perk0Var2',
+    'perk0Var3', 'perk1', 'perk1Var1', 'perk1Var2', 'perk1Var3', 'perk2', 'perk2Var1', 'perk2Var2',
+    'perk2Var3', 'perk3', 'perk3Var1', 'perk3Var2', 'perk3Var3', 'perk4', 'perk4Var1', 'perk4Var2',
+    'perk4Var3', 'perk5', 'perk5Var1', 'perk5Var2', 'perk5Var3', 'perkPrimaryStyle', 'perkSubStyle',
+    'physicalDamageDealt', 'physicalDamageDealtToChampions', 'physicalDamageTaken', 'playerScore0',
+    'playerScore1', 'playerScore2', 'playerScore3', 'playerScore4', 'playerScore5', 'playerScore6',
+    'playerScore7', 'playerScore8', 'playerScore9', 'sightWardsBoughtInGame', 'teamEarlySurrendered',
+    'timeCCingOthers', 'totalDamageDealt', 'totalHeal', 'totalPlayerScore', 'totalScoreRank',
+    'totalTimeCrowdControlDealt', 'totalUnitsHealed', 'trueDamageDealt', 'trueDamageDealtToChampions',
+    'trueDamageTaken', 'turretKills', 'unrealKills', 'visionWardsBoughtInGame', 'wardsKilled',
+    'wardsPlaced',
+]
+
+
+class MockConfig:
+    """模拟服务的延迟和故障配置
+
+    每个请求先等待 latency ± jitter 毫秒，然后依次按概率决定是否断开连接、长时间无响应或返回500错误。
+    设置max_concurrency时，同时处理的请求超过上限的请求直接返回503（带Retry-After）。
+    """
+
+    def __init__(self, latency_ms=20, jitter_ms=5, error_rate=0.0, hang_rate=0.0, hang_seconds=20,
+                 drop_rate=0.0, games_per_player=DEFAULT_GAMES_PER_PLAYER, phase='ChampSelect', seed=0,
+                 max_concurrency=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.drop_rate = drop_rate
+        self.games_per_player = games_per_player
+        self.phase = phase
+        self.seed = seed
+        self.max_concurrency = max_concurrency
+
+
+class MockData:
+    """确定性的模拟数据
+
+    同一PUUID或gameId每次生成的数据都相同，战绩中的对局和对局详情互相对应。
+    """
+
+    def __init__(self, games_per_player=DEFAULT_GAMES_PER_PLAYER, seed=0):
+        self.games_per_player = games_per_player
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._owners = {}  # gameId -> 战绩所属玩家的PUUID（该玩家在对局中是1号玩家）
+
+    def _random(self, *key):
+        return random.Random(f"{self.seed}:{':'.join(map(str, key))}")
+
+    def summoner(self, puuid):
+        rng = self._random('summoner', puuid)
+        name = f"模拟玩家{zlib.crc32(puuid.encode()) % 10000:04d}"
+        return {
+            "accountId": zlib.crc32(puuid.encode()),
+            "displayName": name,
+            "gameName": name,
+            "tagLine": f"{rng.randint(10000, 99999)}",
+            "internalName": name,
+            "percentCompleteForNextLevel": rng.randint(0, 99),
+            "profileIconId": rng.randint(1, 5000),
+            "puuid": puuid,
+            "summonerId": zlib.crc32(puuid.encode()) + 1,
+            "summonerLevel": rng.randint(30, 600),
+            "xpSinceLastLevel": rng.randint(0, 3000),
+            "xpUntilNextLevel": 3000,
+        }
+
+    def ranked(self, puuid):
+        rng = self._random('ranked', puuid)
+        tiers = ['IRON', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'EMERALD', 'DIAMOND', 'MASTER']
+        queues = []
+        for queue_type in ('RANKED_SOLO_5x5', 'RANKED_FLEX_SR'):
+            wins, losses = rng.randint(0, 300), rng.randint(0, 300)
+            tier = rng.choice(tiers)
+            queues.append({
+                "queueType": queue_type,
+                "tier": tier,
+                "division": 'NA' if tier == 'MASTER' else rng.choice(['I', 'II', 'III', 'IV']),
+                "leaguePoints": rng.randint(0, 99),
+                "wins": wins,
+                "losses": losses,
+                "isProvisional": False,
+            })
+        return {"queues": queues, "queueMap": {queue["queueType"]: queue for queue in queues}}
+
+    def game_id(self, puuid, index):
+        """玩家第index场（0为最近一场）对局的gameId"""
+        return (zlib.crc32(puuid.encode()) % 100000) * 100000 + (self.games_per_player - index)
+
+    def match_history(self, puuid, begin, end):
+        games = []
+        for index in range(max(begin, 0), min(end + 1, self.games_per_player)):
+            game_id = self.game_id(puuid, index)
+            with self._lock:
+                self._owners[game_id] = puuid
+            detail = self.game(game_id)
+            # 战绩列表中只包含该玩家自己
+            games.append({
+                **{key: value for key, value in detail.items() if key not in ('participants', 'participantIdentities', 'teams')},
+                "participants": detail["participants"][:1],
+                "participantIdentities": detail["participantIdentities"][:1],
+            })
+        return {
+            "accountId": zlib.crc32(puuid.encode()),
+            "platformId": "HN1",
+            "games": {
+                "gameBeginDate": "",
+                "gameCount": len(games),
+                "gameEndDate": "",
+                "gameIndexBegin": begin,
+                "gameIndexEnd": end,
+                "games": games,
+            },
+        }
+
+    def game(self, game_id):
+        rng = self._random('game', game_id)
+        with self._lock:
+            owner = self._owners.get(game_id)
+        duration = rng.randint(900, 2400)
+        winning_team = rng.choice([100, 200])
+        participants, identities = [], []
+        for index in range(10):
+            participant_id = index + 1
+            team_id = 100 if index < 5 else 200
+            support = index % 5 == 4
+            kills = rng.randint(0, 4 if support else 15)
+            deaths = rng.randint(0, 12)
+            assists = rng.randint(5, 30) if support else rng.randint(0, 15)
+            gold = rng.randint(6000, 18000)
+            stats = {
+                "participantId": participant_id,
+                "win": team_id == winning_team,
+                "kills": kills,
+                "deaths": deaths,
+                "assists": assists,
+                "champLevel": rng.randint(10, 18),
+                "totalMinionsKilled": rng.randint(10, 60) if support else rng.randint(100, 300),
+                "neutralMinionsKilled": rng.randint(0, 20),
+                "goldEarned": gold,
+                "goldSpent": gold - rng.randint(0, 1500),
+                "totalDamageDealtToChampions": rng.randint(3000, 45000),
+                "totalDamageTaken": rng.randint(8000, 40000),
+                "visionScore": rng.randint(40, 100) if support else rng.randint(5, 40),
+                "firstBloodKill": rng.random() < 0.1,
+                "firstBloodAssist": rng.random() < 0.1,
+                "tripleKills": int(rng.random() < 0.1),
+                "quadraKills": int(rng.random() < 0.03),
+                "pentaKills": int(rng.random() < 0.01),
+            }
+            for slot in range(7):
+                stats[f"item{slot}"] = rng.choice([0, 1055, 3006, 3031, 3071, 3089, 3153, 6672])
+            if support:
+                stats["item0"] = SUPPORT_ITEM_ID
+            stats.update({field: rng.randint(0, 20000) for field in EXTRA_STAT_FIELDS})
+
+            puuid = owner if owner and index == 0 else f"mock-puuid-{zlib.crc32(f'{game_id}:{index}'.encode()) % 10000:04d}"
+            participants.append({
+                "participantId": participant_id,
+                "teamId": team_id,
+                "championId": rng.randint(1, 160),
+                "spell1Id": rng.choice([4, 7, 14]),
+                "spell2Id": rng.choice([11, 12, 3, 21]),
+                "highestAchievedSeasonTier": "",
+                "stats": stats,
+                "timeline": {
+                    "participantId": participant_id,
+                    "role": "SUPPORT" if support else rng.choice(["SOLO", "NONE", "DUO_CARRY"]),
+                    "lane": rng.choice(["TOP", "JUNGLE", "MIDDLE", "BOTTOM"]),
+                },
+            })
+            identities.append({
+                "participantId": participant_id,
+                "player": {**{key: value for key, value in self.summoner(puuid).items()
+                              if key in ('gameName', 'tagLine', 'puuid', 'profileIconId', 'summonerId')},
+                           "summonerName": "", "platformId": "HN1"},
+            })
+
+        return {
+            "gameId": game_id,
+            "gameCreation": 1700000000000 + game_id % 100000 * 3600 * 1000,
+            "gameDuration": duration,
+            "gameMode": "CLASSIC",
+            "gameType": "MATCHED_GAME",
+            "gameVersion": "15.10.1",
+            "mapId": 11,
+            "platformId": "HN1",
+            "queueId": rng.choice(QUEUE_IDS),
+            "seasonId": 15,
+            "teams": [
+                {"teamId": team_id, "win": "Win" if team_id == winning_team else "Fail",
+                 "baronKills": rng.randint(0, 2), "dragonKills": rng.randint(0, 4), "towerKills": rng.randint(0, 11)}
+                for team_id in (100, 200)
+            ],
+            "participants": participants,
+            "participantIdentities": identities,
+        }
+
+    def champ_select_session(self):
+        members = [
+            {"cellId": index, "puuid": puuid, "summonerId": zlib.crc32(puuid.encode()) + 1,
+             "championId": 0, "assignedPosition": position}
+            for index, (puuid, position) in enumerate(zip(LOBBY_PUUIDS, ["top", "jungle", "middle", "bottom", "utility"] * 2))
+        ]
+        return {"timer": {"phase": "BAN_PICK"}, "myTeam": members[:5], "theirTeam": members[5:]}
+
+    def gameflow_session(self):
+        members = [{"puuid": puuid, "summonerId": zlib.crc32(puuid.encode()) + 1,
+                    "championId": zlib.crc32(puuid.encode()) % 160 + 1, "selectedPosition": "NONE"}
+                   for puuid in LOBBY_PUUIDS]
+        return {"phase": "InProgress", "gameData": {"teamOne": members[:5], "teamTwo": members[5:]}}
+
+    def champion_summary(self):
+        # 真实客户端的列表中有一个id为-1的占位项
+        return [{"id": champion_id, "name": f"Champion{champion_id}", "alias": f"Champion{champion_id}",
+                 "squarePortraitPath": f"/lol-game-data/assets/v1/champion-icons/{champion_id}.png"}
+                for champion_id in [-1] + list(range(1, CHAMPION_COUNT + 1))]
+
+    def items(self):
+        return [{"id": item_id, "name": f"Item{item_id}",
+                 "iconPath": f"/lol-game-data/assets/ASSETS/Items/Icons2D/{item_id}_Mock.png"} for item_id in ITEM_IDS]
+
+    def summoner_spells(self):
+        return [{"id": spell_id, "name": f"Spell{spell_id}",
+                 "iconPath": f"/lol-game-data/assets/DATA/Spells/Icons2D/Summoner_Mock{spell_id}.png"}
+                for spell_id in SPELL_IDS]
+
+    def icon(self, path):
+        """按路径生成颜色固定的1x1 PNG图片"""
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        color = zlib.crc32(path.encode()).to_bytes(4, 'big')[:3]
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(b'\x00' + color)) + chunk(b'IEND', b''))
+
+
+class MockLCUServer(ThreadingHTTPServer):
+    """模拟LCU的HTTPS服务"""
+
+    daemon_threads = True
+
+    def __init__(self, port, token, config, cert_file, key_file):
+        super().__init__(('127.0.0.1', port), MockLCUHandler)
+        self.token = token
+        self.config = config
+        self.data = MockData(config.games_per_player, config.seed)
+        self.authorization = 'Basic ' + base64.b64encode(f'riot:{token}'.encode()).decode()
+        self._stats_lock = threading.Lock()
+        self.request_counts = {}  # 路由名 -> 请求次数
+        self.in_flight = 0
+        self.rejected = 0
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    def count(self, route):
+        with self._stats_lock:
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+
+    def enter(self):
+        """开始处理一个请求，超过并发上限时返回False"""
+        with self._stats_lock:
+            if self.config.max_concurrency and self.in_flight >= self.config.max_concurrency:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._stats_lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {"requests": dict(self.request_counts), "total": sum(self.request_counts.values()),
+                    "rejected": self.rejected}
+
+
+class MockLCUHandler(BaseHTTPRequestHandler):
+    """按路径分发请求；路由表中的每一项为 (路由名, 路径正则, 处理函数)"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockLCU/1.0'
+
+    ROUTES = [
+        ('current_summoner', re.compile(r'^/lol-summoner/v1/current-summoner$'),
+         lambda data, match, query: data.summoner(CURRENT_PUUID)),
+        ('summoner_by_puuid', re.compile(r'^/lol-summoner/v2/summoners/puuid/([^/]+)$'),
+         lambda data, match, query: data.summoner(match.group(1))),
+        ('ranked_stats', re.compile(r'^/lol-ranked/v1/ranked-stats/([^/]+)$'),
+         lambda data, match, query: data.ranked(match.group(1))),
+        ('match_history', re.compile(r'^/lol-match-history/v1/products/lol/([^/]+)/matches$'),
+         lambda data, match, query: data.match_history(
+             match.group(1), int(query.get('begIndex', ['0'])[0]), int(query.get('endIndex', ['19'])[0]))),
+        ('match_detail', re.compile(r'^/lol-match-history/v1/games/(\d+)$'),
+         lambda data, match, query: data.game(int(match.group(1)))),
+        ('builds', re.compile(r'^/system/v1/builds$'),
+         lambda data, match, query: {"version": "15.10.1", "branch": "mock"}),
+        ('champion_summary', re.compile(r'^/lol-game-data/assets/v1/champion-summary\.json$'),
+         lambda data, match, query: data.champion_summary()),
+        ('items', re.compile(r'^/lol-game-data/assets/v1/items\.json$'),
+         lambda data, match, query: data.items()),
+        ('summoner_spells', re.compile(r'^/lol-game-data/assets/v1/summoner-spells\.json$'),
+         lambda data, match, query: data.summoner_spells()),
+        ('asset', re.compile(r'^/lol-game-data/assets/.+\.(png|jpg)$'),
+         lambda data, match, query: data.icon(match.group(0))),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+
+        if url.path == '/mock/v1/stats':
+            self._send_json(200, self.server.stats())
+            return
+
+        if self.headers.get('Authorization') != self.server.authorization:
+            self._send_json(401, {"errorCode": "UNAUTHORIZED", "httpStatus": 401, "message": "Invalid credentials"})
+            return
+
+        route, body = self._dispatch(url.path, parse_qs(url.query))
+        self.server.count(route)
+
+        # 模拟客户端过载：同时处理的请求超过上限时返回503
+        if not self.server.enter():
+            self.send_response(503)
+            self.send_header('Retry-After', '0.2')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        try:
+            if not self._apply_faults():
+                return
+        finally:
+            self.server.leave()
+
+        if body is None:
+            self._send_json(404, {"errorCode": "RPC_ERROR", "httpStatus": 404,
+                                  "message": f"No resource at {url.path}"})
+        elif isinstance(body, bytes):
+            self._send(200, body, 'image/jpeg' if url.path.endswith('.jpg') else 'image/png')
+        else:
+            self._send_json(200, body)
+
+    def _dispatch(self, path, query):
+        data = self.server.data
+        for name, pattern, handler in self.ROUTES:
+            match = pattern.match(path)
+            if match:
+                return name, handler(data, match, query)
+
+        # 英雄选择/游戏中的会话只在对应阶段存在
+        if path == '/lol-champ-select/v1/session':
+            return 'champ_select', data.champ_select_session() if self.server.config.phase == 'ChampSelect' else None
+        if path == '/lol-gameflow/v1/session':
+            return 'gameflow', data.gameflow_session() if self.server.config.phase == 'InProgress' else None
+        return 'not_found', None
+
+    def _apply_faults(self):
+        """按配置等待并注入故障，返回False表示本次请求不再正常响应"""
+        config = self.server.config
+        delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < config.drop_rate:
+            self.close_connection = True
+            return False
+        roll -= config.drop_rate
+        if roll < config.hang_rate:
+            time.sleep(config.hang_seconds)
+            self.close_connection = True
+            return False
+        roll -= config.hang_rate
+        if roll < config.error_rate:
+            self._send_json(500, {"errorCode": "RPC_ERROR", "httpStatus": 500, "message": "Injected failure"})
+            return False
+        return True
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def ensure_certificate(directory=None):
+    """生成（或复用）模拟服务使用的自签名证书
+
+    Args:
+        directory: 证书保存目录，默认为系统临时目录
+
+    Returns:
+        tuple: (证书文件, 私钥文件)
+
+    Raises:
+        RuntimeError: 系统中没有openssl，无法生成证书
+    """
+    directory = directory or os.path.join(tempfile.gettempdir(), 'jk-mock-lcu')
+    os.makedirs(directory, exist_ok=True)
+    cert_file = os.path.join(directory, 'cert.pem')
+    key_file = os.path.join(directory, 'key.pem')
+    if os.path.exists(cert_file) and os.path.exists(key_file):
+        return cert_file, key_file
+
+    try:
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '3650',
+                        '-subj', '/CN=127.0.0.1', '-keyout', key_file, '-out', cert_file],
+                       check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"无法生成自签名证书（需要openssl，或通过--cert/--key指定证书）: {e}")
+    return cert_file, key_file
+
+
+def start_server(config, port=DEFAULT_PORT, token=DEFAULT_TOKEN, cert_file=None, key_file=None):
+    """在后台线程启动模拟服务
+
+    Returns:
+        MockLCUServer: 已启动的服务，调用shutdown()停止
+    """
+    if not cert_file or not key_file:
+        cert_file, key_file = ensure_certificate()
+    server = MockLCUServer(port, token, config, cert_file, key_file)
+    threading.Thread(target=server.serve_forever, name='mock-lcu', daemon=True).start()
+    return server
+
+
+def spawn_fake_client(args, port=DEFAULT_PORT, token=DEFAULT_TOKEN, **popen_kwargs):
+    """以名为LeagueClientUx的子进程启动模拟服务，供后端的进程扫描发现
+
+    通过指向当前Python解释器的链接改变进程名，子进程命令行带有与真实客户端相同的--app-port和--remoting-auth-token。
+
+    Args:
+        args: 传给子进程的其他命令行参数（延迟、故障配置等）
+        port: 模拟服务端口
+        token: 认证令牌
+
+    Returns:
+        subprocess.Popen: 子进程
+    """
+    cert_file, key_file = ensure_certificate()
+    directory = tempfile.mkdtemp(prefix='jk-fake-client-')
+    executable = os.path.join(directory, FAKE_PROCESS_NAME + ('.exe' if os.name == 'nt' else ''))
+    try:
+        os.symlink(sys.executable, executable)
+    except (OSError, NotImplementedError):
+        # Windows上没有创建符号链接的权限时复制解释器
+        shutil.copy2(sys.executable, executable)
+
+    command = [executable, os.path.abspath(__file__), f'--app-port={port}', f'--remoting-auth-token={token}',
+               '--cert', cert_file, '--key', key_file, *args]
+    return subprocess.Popen(command, **popen_kwargs)
+
+
+def add_config_arguments(parser):
+    """添加延迟和故障相关的命令行参数（benchmark.py复用）"""
+    parser.add_argument('--latency', type=float, default=20, help='每个请求的平均延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=5, help='延迟的随机波动范围（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500错误的概率')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='长时间不响应的概率')
+    parser.add_argument('--hang-seconds', type=float, default=20, help='不响应时等待的秒数')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='不返回响应直接断开连接的概率')
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES_PER_PLAYER, help='每名玩家的战绩总场数')
+    parser.add_argument('--phase', choices=['None', 'ChampSelect', 'InProgress'], default='ChampSelect',
+                        help='模拟的游戏阶段（决定英雄选择/游戏会话接口是否有数据）')
+    parser.add_argument('--seed', type=int, default=0, help='模拟数据的随机种子')
+    parser.add_argument('--max-concurrency', type=int, default=0,
+                        help='同时处理的请求数上限，超出时返回503（0为不限制）')
+
+
+def config_arguments(args):
+    """把解析后的参数转换回命令行参数列表（传给--fake-process启动的子进程）"""
+    return ['--latency', str(args.latency), '--jitter', str(args.jitter), '--error-rate', str(args.error_rate),
+            '--hang-rate', str(args.hang_rate), '--hang-seconds', str(args.hang_seconds),
+            '--drop-rate', str(args.drop_rate), '--games', str(args.games), '--phase', args.phase,
+            '--seed', str(args.seed), '--max-concurrency', str(args.max_concurrency)]
+
+
+def config_from_args(args):
+    return MockConfig(latency_ms=args.latency, jitter_ms=args.jitter, error_rate=args.error_rate,
+                      hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, drop_rate=args.drop_rate,
+                      games_per_player=args.games, phase=args.phase, seed=args.seed,
+                      max_concurrency=args.max_concurrency)
+
+
+def parse_args():
+    """解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数对象
+    """
+    parser = argparse.ArgumentParser(description='模拟LCU服务')
+    parser.add_argument('--app-port', type=int, default=DEFAULT_PORT, help='监听端口')
+    parser.add_argument('--remoting-auth-token', default=DEFAULT_TOKEN, help='Basic认证令牌（用户名为riot）')
+    parser.add_argument('--cert', help='证书文件，默认自动生成自签名证书')
+    parser.add_argument('--key', help='私钥文件')
+    parser.add_argument('--fake-process', action='store_true',
+                        help=f'以名为{FAKE_PROCESS_NAME}的子进程运行，使后端能通过进程扫描发现')
+    add_config_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """主函数
+
+    Returns:
+        int: 程序退出状态码
+    """
+    args = parse_args()
+
+    if args.fake_process:
+        process = spawn_fake_client(config_arguments(args), args.app_port, args.remoting_auth_token)
+        logger.info(f"已启动模拟客户端进程 {FAKE_PROCESS_NAME} (PID {process.pid})，端口 {args.app_port}")
+        try:
+            return process.wait()
+        except KeyboardInterrupt:
+            process.terminate()
+            return 0
+
+    server = MockLCUServer(args.app_port, args.remoting_auth_token, config_from_args(args),
+                           *((args.cert, args.key) if args.cert and args.key else ensure_certificate()))
+    logger.info(f"模拟LCU服务已启动: https://127.0.0.1:{args.app_port} (riot:{args.remoting_auth_token})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+玩家汇总统计 - 按PUUID增量维护跨对局的统计数据
+
+每获取一场对局详情，就把对局中所有玩家的数据累加到各自的汇总中（每场对局只累加一次），
+查询时直接读取汇总结果，不需要重新遍历原始战绩。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 近期统计（胜率、马种分布）使用的对局数量
+RECENT_GAMES = 20
+
+# 内存中最多保留的玩家汇总数量（其余按需从磁盘读取）
+MAX_CACHED_PLAYERS = 2000
+
+
+class PlayerSummaryIndex:
+    """按PUUID保存的玩家汇总统计"""
+
+    def __init__(self, db_path, max_players=MAX_CACHED_PLAYERS):
+        """初始化汇总索引
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_players: 内存中最多保留的玩家汇总数量
+        """
+        self.db_path = db_path
+        self.max_players = max_players
+        self._lock = threading.Lock()
+        self._summaries = OrderedDict()  # puuid -> 汇总数据（按需从磁盘加载，LRU）
+
+        self.ingested = 0
+        self.skipped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS player_summary (
+                puuid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS summary_games (
+                game_id INTEGER PRIMARY KEY
+            );
+        """)
+        self._db.commit()
+        self._games = {row[0] for row in self._db.execute("SELECT game_id FROM summary_games")}
+
+    def ingest(self, detail, horse_ranks=None):
+        """把一场对局累加到所有参与玩家的汇总中，已累加过的对局会被跳过
+
+        Args:
+            detail: LCU返回的对局详情
+            horse_ranks: 该对局的马种评分 {participantId: {"score", "rank"}}，可选
+
+        Returns:
+            bool: 是否累加了该对局
+        """
+        game_id = detail.get("gameId")
+        if game_id is None:
+            return False
+
+        with self._lock:
+            if game_id in self._games:
+                self.skipped += 1
+                return False
+
+            identities = {
+                identity.get("participantId"): (identity.get("player") or {}).get("puuid")
+                for identity in detail.get("participantIdentities") or []
+            }
+            participants = detail.get("participants") or []
+            team_damage = {}
+            for participant in participants:
+                team_id = participant.get("teamId")
+                team_damage[team_id] = team_damage.get(team_id, 0) + \
+                    (participant.get("stats") or {}).get("totalDamageDealtToChampions", 0)
+
+            minutes = detail.get("gameDuration", 0) / 60
+            now = time.time()
+            rows = []
+            updated = {}
+            for participant in participants:
+                puuid = identities.get(participant.get("participantId"))
+                if not puuid:
+                    continue
+                # 在副本上累加，写入数据库成功后再替换内存中的汇总，写入失败时内存与磁盘保持一致
+                summary = json.loads(json.dumps(self._load(puuid, create=True)))
+                self._add(summary, detail, participant, minutes, team_damage.get(participant.get("teamId"), 0),
+                          (horse_ranks or {}).get(str(participant.get("participantId"))))
+                updated[puuid] = summary
+                rows.append((puuid, json.dumps(summary, ensure_ascii=False), now))
+
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO player_summary (puuid, data, updated_at) VALUES (?, ?, ?)", rows
+                )
+                self._db.execute("INSERT OR IGNORE INTO summary_games (game_id) VALUES (?)", (game_id,))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+            for puuid, summary in updated.items():
+                self._remember(puuid, summary)
+            self._games.add(game_id)
+            self.ingested += 1
+            return True
+
+    def ingest_results(self, results):
+        """累加对局详情接口的返回结果（失败的结果会被跳过）
+
+        Args:
+            results: fetch_match_detail返回的结果列表
+        """
+        for result in results:
+            if result.get("status") != "success" or not result.get("data"):
+                continue
+            try:
+                self.ingest(result["data"], result.get("horseRanks"))
+            except Exception as e:
+                logger.error(f"更新玩家汇总统计时出错: {str(e)}")
+
+    def get(self, puuid):
+        """获取玩家汇总统计
+
+        Args:
+            puuid: 玩家PUUID
+
+        Returns:
+            dict: 汇总统计，没有该玩家的对局时返回None
+        """
+        with self._lock:
+            summary = self._load(puuid)
+            if summary is None or not summary["games"]:
+                return None
+            return self._render(puuid, summary)
+
+    def stats(self):
+        """获取索引统计"""
+        with self._lock:
+            players = self._db.execute("SELECT COUNT(*) FROM player_summary").fetchone()[0]
+            return {"players": players, "games": len(self._games),
+                    "ingested": self.ingested, "skipped": self.skipped}
+
+    def _load(self, puuid, create=False):
+        """读取原始汇总数据（调用方需持有锁）
+
+        Args:
+            puuid: 玩家PUUID
+            create: 磁盘上没有该玩家时是否创建空的汇总（只在累加对局时创建）
+
+        Returns:
+            dict: 原始汇总数据，没有该玩家且create为False时返回None
+        """
+        summary = self._summaries.get(puuid)
+        if summary is not None:
+            self._summaries.move_to_end(puuid)
+            return summary
+
+        row = self._db.execute("SELECT data FROM player_summary WHERE puuid = ?", (puuid,)).fetchone()
+        if row is not None:
+            summary = json.loads(row[0])
+        elif create:
+            summary = {
+                "games": 0, "wins": 0, "minions": 0, "minutes": 0.0, "damage_share": 0.0,
+                "champions": {}, "recent": [],
+            }
+        else:
+            return None
+        self._remember(puuid, summary)
+        return summary
+
+    def _remember(self, puuid, summary):
+        """放入内存LRU（调用方需持有锁）"""
+        self._summaries[puuid] = summary
+        self._summaries.move_to_end(puuid)
+        while len(self._summaries) > self.max_players:
+            self._summaries.popitem(last=False)
+
+    @staticmethod
+    def _add(summary, detail, participant, minutes, team_damage, horse_rank):
+        """把一名玩家在一场对局中的数据累加到汇总中"""
+        stats = participant.get("stats") or {}
+        win = bool(stats.get("win"))
+        summary["games"] += 1
+        summary["wins"] += int(win)
+        summary["minions"] += stats.get("totalMinionsKilled", 0) + stats.get("neutralMinionsKilled", 0)
+        summary["minutes"] += minutes
+        if team_damage > 0:
+            summary["damage_share"] += stats.get("totalDamageDealtToChampions", 0) / team_damage
+
+        # 英雄: [场次, 胜场, 击杀, 死亡, 助攻]
+        champion = summary["champions"].setdefault(str(participant.get("championId")), [0, 0, 0, 0, 0])
+        champion[0] += 1
+        champion[1] += int(win)
+        champion[2] += stats.get("kills", 0)
+        champion[3] += stats.get("deaths", 0)
+        champion[4] += stats.get("assists", 0)
+
+        # 近期对局: [开始时间, 对局ID, 是否胜利, 马种]，按开始时间保留最新的RECENT_GAMES场
+        summary["recent"].append([detail.get("gameCreation", 0), detail.get("gameId"), win,
+                                  horse_rank["rank"] if horse_rank else None])
+        summary["recent"].sort(key=lambda game: game[0], reverse=True)
+        del summary["recent"][RECENT_GAMES:]
+
+    @staticmethod
+    def _render(puuid, summary):
+        """生成接口返回的汇总数据"""
+        def kda(kills, deaths, assists):
+            return round((kills + assists) / max(deaths, 1), 2)
+
+        champions = [
+            {"championId": int(champion_id), "games": games, "wins": wins,
+             "win_rate": round(wins / games, 4), "kills": kills, "deaths": deaths, "assists": assists,
+             "kda": kda(kills, deaths, assists)}
+            for champion_id, (games, wins, kills, deaths, assists) in summary["champions"].items()
+        ]
+        champions.sort(key=lambda champion: champion["games"], reverse=True)
+
+        recent = summary["recent"]
+        recent_wins = sum(1 for game in recent if game[2])
+        horse_ranks = {}
+        for game in recent:
+            if game[3]:
+                horse_ranks[game[3]] = horse_ranks.get(game[3], 0) + 1
+
+        return {
+            "puuid": puuid,
+            "games": summary["games"],
+            "wins": summary["wins"],
+            "win_rate": round(summary["wins"] / summary["games"], 4),
+            "avg_cpm": round(summary["minions"] / summary["minutes"], 2) if summary["minutes"] else 0,
+            "avg_damage_share": round(summary["damage_share"] / summary["games"], 4),
+            "recent": {
+                "games": len(recent),
+                "wins": recent_wins,
+                "win_rate": round(recent_wins / len(recent), 4) if recent else 0,
+                "horse_ranks": horse_ranks,
+            },
+            "champions": champions,
+        }
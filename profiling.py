@@ -0,0 +1,228 @@
+"""
+性能分析 - 按需分析单个请求（cProfile），或在一段时间内对所有线程的调用栈采样（火焰图）
+
+只在以 --profile 启动时可用。单个请求的结果保存为pstats文件（python -m pstats或snakeviz查看），
+同时在日志中输出累计耗时最多的函数；采样结果保存为折叠栈格式，flamegraph.pl和speedscope都可以直接打开。
+"""
+
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+# 请求带有该请求头（值为1）或查询参数 profile=1 时分析这个请求
+PROFILE_HEADER = 'X-JK-Profile'
+PROFILE_QUERY = 'profile'
+
+# 分析结果文件名（相对于分析目录）通过该响应头返回
+PROFILE_FILE_HEADER = 'X-JK-Profile-File'
+
+# 不分析的接口：事件推送是长连接，采样接口本身没有分析的意义
+SKIPPED_PATHS = ('/api/events', '/api/profile/sample')
+
+# 日志中输出的函数数量
+TOP_FUNCTIONS = 25
+
+# 采样间隔（秒）和单次采样的最长时间
+DEFAULT_SAMPLE_INTERVAL = 0.005
+MAX_SAMPLE_SECONDS = 300
+
+
+class RequestProfiler:
+    """请求分析器
+
+    同一时间只分析一个请求：Python 3.12起cProfile在整个解释器内只能有一个在运行，
+    其他同时到达的请求正常处理、不做分析。cProfile只记录处理请求的线程，
+    线程池中执行的部分（批量获取对局详情等）需要用采样查看。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.profile_all = False
+        self.output_dir = None
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._sampling = False
+        self._sequence = itertools.count(1)
+
+    def configure(self, output_dir, profile_all=False):
+        """启用分析
+
+        Args:
+            output_dir: 分析结果目录
+            profile_all: 是否分析所有接口请求（否则只分析带有标记的请求）
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.profile_all = profile_all
+        self.enabled = True
+        logger.info(f"性能分析已启用（{'所有请求' if profile_all else '带有标记的请求'}），结果保存在: {output_dir}")
+
+    def wanted(self, path, headers, query):
+        """判断是否需要分析这个请求
+
+        Args:
+            path: 请求路径
+            headers: 请求头（支持get的映射）
+            query: 查询参数（支持get的映射）
+
+        Returns:
+            bool: 是否分析
+        """
+        if not self.enabled or not path.startswith('/api/') or path in SKIPPED_PATHS:
+            return False
+        return self.profile_all or headers.get(PROFILE_HEADER) == '1' or query.get(PROFILE_QUERY) == '1'
+
+    def begin(self):
+        """开始分析
+
+        Returns:
+            tuple: 传给finish的会话；已有请求正在分析时返回None
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 其他分析工具（例如调试器）正在运行
+            self._lock.release()
+            return None
+        return profile, time.perf_counter()
+
+    def finish(self, session, name):
+        """结束分析，保存结果并在日志中输出耗时最多的函数
+
+        Args:
+            session: begin返回的会话
+            name: 请求名称，用于文件名
+
+        Returns:
+            str: 结果文件名（位于分析目录中）
+        """
+        profile, started = session
+        try:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            filename = self._filename(name, 'prof')
+            profile.dump_stats(os.path.join(self.output_dir, filename))
+        finally:
+            self._lock.release()
+
+        buffer = io.StringIO()
+        pstats.Stats(profile, stream=buffer).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        logger.info(f"请求 {name} 耗时 {elapsed * 1000:.1f}ms，分析结果: {filename}\n{buffer.getvalue()}")
+        return filename
+
+    def sample(self, seconds, interval=DEFAULT_SAMPLE_INTERVAL):
+        """在后台对所有线程的调用栈采样一段时间，结束后写入折叠栈文件
+
+        Args:
+            seconds: 采样时长（秒）
+            interval: 采样间隔（秒）
+
+        Returns:
+            str: 结果文件名（采样结束后才会写入）
+
+        Raises:
+            RuntimeError: 未启用分析或已有采样在进行
+        """
+        if not self.enabled:
+            raise RuntimeError("未启用性能分析，请使用 --profile 启动")
+        with self._sample_lock:
+            if self._sampling:
+                raise RuntimeError("已有采样正在进行")
+            self._sampling = True
+
+        seconds = min(seconds, MAX_SAMPLE_SECONDS)
+        filename = self._filename(f"sample-{seconds:g}s", 'folded')
+        threading.Thread(target=self._run_sampler, args=(seconds, interval, filename),
+                         name='profile-sampler', daemon=True).start()
+        logger.info(f"开始采样 {seconds:g} 秒，结果: {filename}")
+        return filename
+
+    def _run_sampler(self, seconds, interval, filename):
+        try:
+            stacks = Counter()
+            names = {}
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread in threading.enumerate():
+                    names[thread.ident] = thread.name
+                for ident, frame in sys._current_frames().items():
+                    if ident != me:
+                        stacks[(names.get(ident, ident),) + _stack(frame)] += 1
+                time.sleep(interval)
+
+            with open(os.path.join(self.output_dir, filename), 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{';'.join(str(part) for part in stack)} {count}\n")
+            logger.info(f"采样完成，共 {sum(stacks.values())} 个样本，结果: {filename}")
+        except Exception as e:
+            logger.error(f"采样时出错: {str(e)}")
+        finally:
+            self._sampling = False
+
+    def _filename(self, name, extension):
+        name = name.strip('/').replace('/', '_') or 'root'
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._sequence):04d}-{name}.{extension}"
+
+
+def _stack(frame):
+    """调用栈（从最外层开始），每一帧为 函数名 (文件名:行号)"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(';', ':'))
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+class ProfilerMiddleware:
+    """WSGI中间件：分析带有标记的请求，覆盖Flask的路由分发、处理函数和响应编码"""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        query = {key: values[0] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        headers = {PROFILE_HEADER: environ.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_'))}
+        if not self.profiler.wanted(path, headers, query):
+            return self.app(environ, start_response)
+
+        session = self.profiler.begin()
+        if session is None:
+            return self.app(environ, start_response)
+
+        # 先缓冲完整响应，分析结束后才能在响应头中返回结果文件名
+        captured = []
+        try:
+            iterable = self.app(environ, lambda status, response_headers, exc_info=None:
+                                captured.extend([status, response_headers, exc_info]))
+            try:
+                body = b''.join(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            filename = self.profiler.finish(session, path)
+
+        status, response_headers, exc_info = captured
+        start_response(status, list(response_headers) + [(PROFILE_FILE_HEADER, filename)], exc_info)
+        return [body]
+
+
+# 全局分析器
+profiler = RequestProfiler()
@@ -0,0 +1,127 @@
+"""
+数据裁剪 - 按视图只返回前端用到的字段
+
+LCU返回的战绩和对局详情包含大量前端不会读取的字段（每名玩家上百项统计），
+前端按使用场景请求对应的视图，后端只返回这些字段，减少编码、传输和浏览器解析的开销。
+"""
+
+# 战绩列表中每场对局的玩家统计字段
+_HISTORY_STATS = {
+    key: True for key in (
+        'win', 'kills', 'deaths', 'assists', 'totalMinionsKilled', 'neutralMinionsKilled',
+        'goldEarned', 'totalDamageDealtToChampions', 'visionScore', 'champLevel',
+        'item0', 'item1', 'item2', 'item3', 'item4', 'item5', 'item6',
+    )
+}
+
+# 对局详情中每名玩家的统计字段（包括计算马种评分用到的字段）
+_DETAIL_STATS = {
+    **_HISTORY_STATS,
+    **{key: True for key in (
+        'totalDamageTaken', 'goldSpent', 'firstBloodKill', 'firstBloodAssist',
+        'tripleKills', 'quadraKills', 'pentaKills',
+    )},
+}
+
+# 视图定义：True表示保留整个字段，字典表示只保留其中的字段，列表表示对每个元素按其中的定义裁剪
+HISTORY_VIEWS = {
+    # 战绩页的对局卡片
+    'list': {
+        'gameId': True, 'gameCreation': True, 'gameDuration': True, 'queueId': True,
+        'participants': [{
+            'participantId': True, 'championId': True, 'spell1Id': True, 'spell2Id': True,
+            'stats': _HISTORY_STATS,
+        }],
+    },
+    # 玩家卡片的最近战绩
+    'card': {
+        'gameId': True, 'gameCreation': True, 'queueId': True,
+        'participants': [{
+            'championId': True,
+            'stats': {'win': True, 'kills': True, 'deaths': True, 'assists': True},
+        }],
+    },
+    'full': True,
+}
+
+DETAIL_VIEWS = {
+    # 展开的对局详情面板
+    'summary': {
+        'gameId': True, 'gameCreation': True, 'gameDuration': True, 'queueId': True,
+        'teams': [{'teamId': True, 'win': True}],
+        'participantIdentities': [{
+            'participantId': True,
+            'player': {'puuid': True, 'gameName': True, 'tagLine': True, 'summonerName': True},
+        }],
+        'participants': [{
+            'participantId': True, 'teamId': True, 'championId': True, 'spell1Id': True, 'spell2Id': True,
+            'timeline': {'role': True},
+            'stats': _DETAIL_STATS,
+        }],
+    },
+    'full': True,
+}
+
+
+def project(value, spec):
+    """按视图定义裁剪数据（返回新对象，不修改原数据）
+
+    Args:
+        value: 原始数据
+        spec: 视图定义
+
+    Returns:
+        裁剪后的数据
+    """
+    if spec is True or value is None:
+        return value
+    if isinstance(spec, list):
+        return [project(item, spec[0]) for item in value] if isinstance(value, list) else value
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in spec.items() if key in value}
+    return value
+
+
+def project_history(data, view):
+    """裁剪战绩列表（get_window的返回结构）
+
+    Args:
+        data: 战绩数据
+        view: 视图名，见HISTORY_VIEWS
+
+    Returns:
+        dict: 裁剪后的战绩数据
+
+    Raises:
+        ValueError: 视图名不存在
+    """
+    spec = _view(HISTORY_VIEWS, view)
+    if spec is True:
+        return data
+    games = data.get("games") or {}
+    return {
+        **data,
+        "games": {**games, "games": [project(game, spec) for game in games.get("games") or []]},
+    }
+
+
+def project_detail(data, view):
+    """裁剪对局详情
+
+    Args:
+        data: 对局详情
+        view: 视图名，见DETAIL_VIEWS
+
+    Returns:
+        dict: 裁剪后的对局详情
+
+    Raises:
+        ValueError: 视图名不存在
+    """
+    return project(data, _view(DETAIL_VIEWS, view))
+
+
+def _view(views, name):
+    if name not in views:
+        raise ValueError(f"不支持的视图: {name}，可选: {', '.join(views)}")
+    return views[name]
@@ -1,5 +1,16 @@
-// 数据缓存
-let dataCache = {};
+import { DataCache } from './cache.js';
+
+// 数据缓存（按数据类别确定缓存时间，对局详情同时保存在IndexedDB中）
+const dataCache = new DataCache();
+
+// 正在批量请求中的对局详情（matchId -> Promise），避免展开详情时重复请求
+const pendingMatchDetails = new Map();
+
+// 正在请求中的战绩（缓存键 -> Promise），翻页时可以直接等待正在进行的预取
+const pendingMatchHistory = new Map();
+
+// 标记后台请求的请求头（与后端lcu.PRIORITY_HEADER一致）
+const PRIORITY_HEADER = 'X-JK-Priority';
 
 // API模块
 export const api = {
@@ -7,15 +18,26 @@ export const api = {
     timeout: 20000, // 20秒超时，可能存在网络问题
     
     // 带超时和错误处理的通用请求方法
+    // options.signal：调用方的AbortSignal（例如预取被取消），中止时抛出原始的AbortError
     async fetchWithTimeout(url, options = {}) {
         const controller = new AbortController();
         const { signal } = controller;
+        const externalSignal = options.signal;
+        if (externalSignal) {
+            if (externalSignal.aborted) controller.abort();
+            externalSignal.addEventListener('abort', () => controller.abort(), { once: true });
+        }
         
         // 创建超时定时器
         const timeoutId = setTimeout(() => controller.abort(), this.timeout);
         
+        // 低优先级（预取）请求告知后端，后端访问客户端时让位于界面操作触发的请求
+        const headers = options.priority === 'low'
+            ? { ...options.headers, [PRIORITY_HEADER]: 'background' }
+            : options.headers;
+        
         try {
-            const response = await fetch(url, { ...options, signal });
+            const response = await fetch(url, { ...options, headers, signal });
             clearTimeout(timeoutId); // 清除超时定时器
             
             if (!response.ok) {
@@ -27,6 +49,7 @@ export const api = {
             clearTimeout(timeoutId); // 确保清除定时器
             
             if (error.name === 'AbortError') {
+                if (externalSignal && externalSignal.aborted) throw error;
                 throw new Error('请求超时，请检查网络连接');
             }
             
@@ -54,7 +77,7 @@ export const api = {
             
             // 缓存成功结果
             if (response.status === 'success') {
-                this.setCachedData(cacheKey, response, 5 * 60 * 1000); // 缓存5分钟
+                this.setCachedData(cacheKey, response);
             }
             
             return response;
@@ -75,7 +98,7 @@ export const api = {
             
             // 缓存成功结果
             if (response.status === 'success') {
-                this.setCachedData(cacheKey, response, 5 * 60 * 1000); // 缓存5分钟
+                this.setCachedData(cacheKey, response);
             }
             
             return response;
@@ -85,39 +108,85 @@ export const api = {
         }
     },
     
-    async getMatchHistory(puuid, beginIndex = 0, endIndex = 7) {
-        // 检查缓存是否有效（2分钟内）
-        const cacheKey = `matchHistory_${puuid}_${beginIndex}_${endIndex}`;
+    async getPlayerSummary(puuid) {
+        // 汇总统计随对局详情增量更新，短时间缓存即可
+        const cacheKey = `playerSummary_${puuid}`;
         const cachedData = this.getCachedData(cacheKey);
         if (cachedData) return cachedData;
         
         try {
-            const response = await this.fetchWithTimeout(`/api/get_match_history?puuid=${puuid}&begin_index=${beginIndex}&end_index=${endIndex}`);
+            const response = await this.fetchWithTimeout(`/api/get_player_summary?puuid=${puuid}`);
             
-            // 缓存成功结果
             if (response.status === 'success') {
-                this.setCachedData(cacheKey, response, 2 * 60 * 1000); // 缓存2分钟
+                this.setCachedData(cacheKey, response);
             }
             
             return response;
         } catch (error) {
-            console.error('获取战绩时出错:', error);
+            console.error('获取玩家汇总统计时出错:', error);
             return { status: 'error', message: error.message || '请求失败' };
         }
     },
     
+    // view: list（战绩页）、card（玩家卡片）、full（完整数据），后端只返回对应视图用到的字段
+    // options: 传给fetch的额外参数（预取时传入signal和priority）
+    async getMatchHistory(puuid, beginIndex = 0, endIndex = 7, view = 'list', options = {}) {
+        // 检查缓存是否有效（2分钟内）
+        const cacheKey = `matchHistory_${puuid}_${beginIndex}_${endIndex}_${view}`;
+        const cachedData = this.getCachedData(cacheKey);
+        if (cachedData) return cachedData;
+        
+        // 同一页正在请求中（通常是预取），等待它的结果；预取被取消时再自己请求
+        const pending = pendingMatchHistory.get(cacheKey);
+        if (pending) {
+            const result = await pending;
+            if (result.status === 'success') return result;
+        }
+        
+        const request = this.fetchWithTimeout(`/api/get_match_history?puuid=${puuid}&begin_index=${beginIndex}&end_index=${endIndex}&view=${view}`, options)
+            .then(response => {
+                // 缓存成功结果
+                if (response.status === 'success') {
+                    this.setCachedData(cacheKey, response);
+                }
+                return response;
+            })
+            .catch(error => {
+                if (!options.signal || !options.signal.aborted) {
+                    console.error('获取战绩时出错:', error);
+                }
+                return { status: 'error', message: error.message || '请求失败' };
+            });
+        
+        pendingMatchHistory.set(cacheKey, request);
+        try {
+            return await request;
+        } finally {
+            if (pendingMatchHistory.get(cacheKey) === request) {
+                pendingMatchHistory.delete(cacheKey);
+            }
+        }
+    },
+    
     async getMatchDetail(matchId) {
-        // 检查缓存（对于固定的历史对局，长期缓存）
+        // 检查缓存（对于固定的历史对局，长期缓存，内存中没有时读取IndexedDB）
         const cacheKey = `matchDetail_${matchId}`;
-        const cachedData = this.getCachedData(cacheKey);
+        const cachedData = await dataCache.getAsync(cacheKey);
         if (cachedData) return cachedData;
         
+        // 如果该对局正在批量请求中，直接等待批量结果
+        const pending = pendingMatchDetails.get(String(matchId));
+        if (pending) {
+            const result = await pending;
+            if (result && result.status === 'success') return result;
+        }
+        
         try {
-            const response = await this.fetchWithTimeout(`/api/get_match_detail?match_id=${matchId}`);
+            const response = await this.fetchWithTimeout(`/api/get_match_detail?match_id=${matchId}&view=summary`);
             
             // 缓存成功结果（对局详情可以长时间缓存）
             if (response.status === 'success') {
-                this.setCachedData(cacheKey, response, 24 * 60 * 60 * 1000); // 缓存24小时
+                this.setCachedData(cacheKey, response);
             }
             
             return response;
@@ -127,6 +196,56 @@ export const api = {
         }
     },
     
+    // 批量获取一页战绩的对局详情，一次请求代替逐场请求
+    async getMatchDetails(matchIds, options = {}) {
+        const results = {};
+        const missingIds = [];
+        
+        const cached = await Promise.all(matchIds.map(String).map(async matchId => [
+            matchId, await dataCache.getAsync(`matchDetail_${matchId}`)
+        ]));
+        cached.forEach(([matchId, cachedData]) => {
+            if (cachedData) {
+                results[matchId] = cachedData;
+            } else if (!pendingMatchDetails.has(matchId)) {
+                missingIds.push(matchId);
+            }
+        });
+        
+        if (missingIds.length === 0) return results;
+        
+        const request = this.fetchWithTimeout(`/api/get_match_details?ids=${missingIds.join(',')}&view=summary`, options)
+            .then(response => {
+                if (response.status !== 'success') return {};
+                
+                // 逐场缓存成功结果
+                Object.entries(response.data).forEach(([matchId, result]) => {
+                    if (result.status === 'success') {
+                        this.setCachedData(`matchDetail_${matchId}`, result);
+                    }
+                });
+                return response.data;
+            })
+            .catch(error => {
+                if (!options.signal || !options.signal.aborted) {
+                    console.error('批量获取对局详情时出错:', error);
+                }
+                return {};
+            });
+        
+        missingIds.forEach(matchId => {
+            pendingMatchDetails.set(matchId, request.then(data => data[matchId] || null));
+        });
+        
+        try {
+            Object.assign(results, await request);
+        } finally {
+            missingIds.forEach(matchId => pendingMatchDetails.delete(matchId));
+        }
+        
+        return results;
+    },
+    
     async minimizeWindow() {
         try {
             await this.fetchWithTimeout('/api/minimize_window', { method: 'POST' });
@@ -154,7 +273,7 @@ export const api = {
             
             // 缓存成功结果
             if (response.status === 'success') {
-                this.setCachedData(cacheKey, response, 10 * 60 * 1000); // 缓存10分钟
+                this.setCachedData(cacheKey, response);
             }
             
             return response;
@@ -164,57 +283,63 @@ export const api = {
         }
     },
     
+    // 一次获取英雄选择或游戏中所有玩家的数据，并按单个接口的缓存键写入缓存，之后打开玩家卡片无需再请求
+    async getLobbySnapshot() {
+        try {
+            const response = await this.fetchWithTimeout('/api/lobby_snapshot');
+            if (response.status !== 'success') return response;
+            
+            response.data.players.forEach(player => {
+                if (!player.puuid) return;
+                if (player.summoner && player.summoner.status === 'success') {
+                    this.setCachedData(`otherSummoner_${player.puuid}`, player.summoner);
+                }
+                if (player.ranked && player.ranked.status === 'success') {
+                    this.setCachedData(`rankedStats_${player.puuid}`, player.ranked);
+                }
+                if (player.matches && player.matches.status === 'success') {
+                    this.setCachedData(`matchHistory_${player.puuid}_0_4_card`, player.matches);
+                }
+                if (player.summary) {
+                    this.setCachedData(`playerSummary_${player.puuid}`, { status: 'success', data: player.summary });
+                }
+            });
+            
+            return response;
+        } catch (error) {
+            console.error('获取对局玩家信息时出错:', error);
+            return { status: 'error', message: error.message || '请求失败' };
+        }
+    },
+    
     // 缓存数据管理
+    // ttl省略时按数据类别确定（见cache.js）
     setCachedData(key, data, ttl) {
-        dataCache[key] = {
-            data,
-            expiry: Date.now() + ttl
-        };
+        dataCache.set(key, data, ttl);
     },
     
     getCachedData(key) {
-        const cache = dataCache[key];
-        if (!cache) return null;
-        
-        // 检查缓存是否过期
-        if (cache.expiry < Date.now()) {
-            delete dataCache[key];
-            return null;
-        }
-        
-        return cache.data;
+        return dataCache.get(key);
     },
     
+    // 清空内存缓存，IndexedDB中的对局详情保留
     clearCache() {
-        dataCache = {};
+        dataCache.clear();
     },
     
     // 只清除特定前缀的缓存
     clearCacheByPrefix(prefix) {
-        Object.keys(dataCache).forEach(key => {
-            if (key.startsWith(prefix)) {
-                delete dataCache[key];
-            }
-        });
+        dataCache.deleteByPrefix(prefix);
+    },
+    
+    getCacheStats() {
+        return dataCache.stats();
     }
 };
 
 // 清理过期缓存函数
 export function cleanupExpiredCache() {
-    const now = Date.now();
-    const keysToDelete = [];
-    
-    // 找出过期的缓存项
-    Object.keys(dataCache).forEach(key => {
-        if (dataCache[key] && dataCache[key].expiry < now) {
-            keysToDelete.push(key);
-        }
-    });
-    
-    // 删除过期项
-    keysToDelete.forEach(key => {
-        delete dataCache[key];
-    });
-    
-    console.log(`已清理 ${keysToDelete.length} 个过期缓存项`);
-} 
\ No newline at end of file
+    const removed = dataCache.cleanupExpired();
+    const { entries, bytes } = dataCache.stats();
+    console.log(`已清理 ${removed} 个过期缓存项，剩余 ${entries} 项（约 ${(bytes / 1024).toFixed(0)} KB）`);
+}
@@ -0,0 +1,254 @@
+// 前端数据缓存：内存LRU（按估算字节数限制大小）+ IndexedDB持久化（只用于不会变化的数据）
+
+// 内存缓存上限（按JSON长度估算的字节数）
+const MAX_MEMORY_BYTES = 20 * 1024 * 1024;
+
+// 各类数据的缓存时间，缓存键的前缀（第一个下划线之前）即数据类别
+const FAMILY_TTLS = {
+    currentSummoner: 5 * 60 * 1000,        // 5分钟
+    rankedStats: 5 * 60 * 1000,            // 5分钟
+    otherSummoner: 10 * 60 * 1000,         // 10分钟
+    playerSummary: 60 * 1000,              // 1分钟
+    matchHistory: 2 * 60 * 1000,           // 2分钟
+    matchDetail: 7 * 24 * 60 * 60 * 1000,  // 7天，已结束的对局不会变化
+};
+const DEFAULT_TTL = 60 * 1000;
+
+// 同时写入IndexedDB的数据类别，应用重启后可以直接使用
+const PERSISTENT_FAMILIES = new Set(['matchDetail']);
+
+// IndexedDB中最多保存的条目数
+const MAX_PERSISTENT_ENTRIES = 5000;
+
+const DB_NAME = 'jk-cache';
+const STORE_NAME = 'entries';
+
+function familyOf(key) {
+    const index = key.indexOf('_');
+    return index === -1 ? key : key.substring(0, index);
+}
+
+// 估算数据占用的内存（JSON字符串长度 × 2，JS字符串为UTF-16）
+function estimateSize(data) {
+    try {
+        return JSON.stringify(data).length * 2;
+    } catch (error) {
+        return 0;
+    }
+}
+
+// IndexedDB持久化层，不可用时（例如隐私模式）所有操作静默失败
+class PersistentStore {
+    constructor() {
+        this.dbPromise = null;
+    }
+
+    open() {
+        if (!this.dbPromise) {
+            this.dbPromise = new Promise((resolve) => {
+                if (!window.indexedDB) {
+                    resolve(null);
+                    return;
+                }
+                const request = indexedDB.open(DB_NAME, 1);
+                request.onupgradeneeded = () => {
+                    const store = request.result.createObjectStore(STORE_NAME, { keyPath: 'key' });
+                    store.createIndex('expiry', 'expiry');
+                };
+                request.onsuccess = () => {
+                    resolve(request.result);
+                    this.prune();
+                };
+                request.onerror = () => {
+                    console.warn('无法打开IndexedDB缓存:', request.error);
+                    resolve(null);
+                };
+            });
+        }
+        return this.dbPromise;
+    }
+
+    async transaction(mode, callback) {
+        const db = await this.open();
+        if (!db) return null;
+        return new Promise((resolve) => {
+            const tx = db.transaction(STORE_NAME, mode);
+            const result = callback(tx.objectStore(STORE_NAME));
+            tx.oncomplete = () => resolve(result && 'result' in result ? result.result : null);
+            tx.onerror = () => resolve(null);
+            tx.onabort = () => resolve(null);
+        });
+    }
+
+    get(key) {
+        return this.transaction('readonly', store => store.get(key));
+    }
+
+    put(key, data, expiry) {
+        return this.transaction('readwrite', store => store.put({ key, data, expiry }));
+    }
+
+    delete(key) {
+        return this.transaction('readwrite', store => store.delete(key));
+    }
+
+    deleteByPrefix(prefix) {
+        return this.transaction('readwrite', store => {
+            store.delete(IDBKeyRange.bound(prefix, prefix + '\uffff'));
+        });
+    }
+
+    clear() {
+        return this.transaction('readwrite', store => store.clear());
+    }
+
+    // 删除过期条目，超出条目上限时删除最早过期的条目
+    prune() {
+        return this.transaction('readwrite', store => {
+            store.index('expiry').openCursor(IDBKeyRange.upperBound(Date.now())).onsuccess = (event) => {
+                const cursor = event.target.result;
+                if (cursor) {
+                    cursor.delete();
+                    cursor.continue();
+                }
+            };
+            store.count().onsuccess = (event) => {
+                let overflow = event.target.result - MAX_PERSISTENT_ENTRIES;
+                if (overflow <= 0) return;
+                store.index('expiry').openCursor().onsuccess = (cursorEvent) => {
+                    const cursor = cursorEvent.target.result;
+                    if (cursor && overflow-- > 0) {
+                        cursor.delete();
+                        cursor.continue();
+                    }
+                };
+            };
+        });
+    }
+}
+
+export class DataCache {
+    constructor(maxBytes = MAX_MEMORY_BYTES) {
+        this.maxBytes = maxBytes;
+        this.entries = new Map(); // key -> { data, expiry, size }，Map按插入顺序排列，最近使用的在最后
+        this.bytes = 0;
+        this.persistent = new PersistentStore();
+        this.hits = 0;
+        this.misses = 0;
+        this.persistentHits = 0;
+        this.evictions = 0;
+    }
+
+    // 读取内存缓存
+    get(key) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            this.misses++;
+            return null;
+        }
+
+        if (entry.expiry < Date.now()) {
+            this.remove(key);
+            this.misses++;
+            return null;
+        }
+
+        // 移到最后，表示最近使用
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        this.hits++;
+        return entry.data;
+    }
+
+    // 读取缓存，内存中没有时再查IndexedDB（只对持久化的数据类别）
+    async getAsync(key) {
+        const data = this.get(key);
+        if (data || !PERSISTENT_FAMILIES.has(familyOf(key))) return data;
+
+        const record = await this.persistent.get(key);
+        if (!record || record.expiry < Date.now()) return null;
+
+        this.persistentHits++;
+        this.remember(key, record.data, record.expiry);
+        return record.data;
+    }
+
+    // 写入缓存，ttl默认按数据类别确定
+    set(key, data, ttl) {
+        const expiry = Date.now() + (ttl ?? FAMILY_TTLS[familyOf(key)] ?? DEFAULT_TTL);
+        this.remember(key, data, expiry);
+
+        if (PERSISTENT_FAMILIES.has(familyOf(key))) {
+            this.persistent.put(key, data, expiry);
+        }
+    }
+
+    remember(key, data, expiry) {
+        this.remove(key);
+
+        const size = estimateSize(data);
+        if (size > this.maxBytes) return;
+
+        this.entries.set(key, { data, expiry, size });
+        this.bytes += size;
+
+        // 按最近最少使用的顺序淘汰
+        for (const [oldKey] of this.entries) {
+            if (this.bytes <= this.maxBytes) break;
+            this.remove(oldKey);
+            this.evictions++;
+        }
+    }
+
+    remove(key) {
+        const entry = this.entries.get(key);
+        if (entry) {
+            this.bytes -= entry.size;
+            this.entries.delete(key);
+        }
+    }
+
+    // 清除特定前缀的缓存（包括IndexedDB中的）
+    deleteByPrefix(prefix) {
+        [...this.entries.keys()].forEach(key => {
+            if (key.startsWith(prefix)) this.remove(key);
+        });
+        if (PERSISTENT_FAMILIES.has(familyOf(prefix))) {
+            this.persistent.deleteByPrefix(prefix);
+        }
+    }
+
+    // 清空内存缓存，persistent为true时同时清空IndexedDB
+    clear(persistent = false) {
+        this.entries.clear();
+        this.bytes = 0;
+        if (persistent) {
+            this.persistent.clear();
+        }
+    }
+
+    // 清理过期条目，返回清理的数量
+    cleanupExpired() {
+        const now = Date.now();
+        let removed = 0;
+        [...this.entries].forEach(([key, entry]) => {
+            if (entry.expiry < now) {
+                this.remove(key);
+                removed++;
+            }
+        });
+        return removed;
+    }
+
+    stats() {
+        return {
+            entries: this.entries.size,
+            bytes: this.bytes,
+            maxBytes: this.maxBytes,
+            hits: this.hits,
+            misses: this.misses,
+            persistentHits: this.persistentHits,
+            evictions: this.evictions,
+        };
+    }
+}
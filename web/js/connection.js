@@ -1,14 +1,105 @@
 import { api } from './api.js';
 import { showToast, updateConnectionStatus } from './ui-utils.js';
 import { STRINGS } from './constants.js';
-import { loadSummonerData, updateSummonerDisplay } from './summoner.js';
+import { loadSummonerData, updateSummonerDisplay, loadRankedData, currentSummoner } from './summoner.js';
+import { debounce } from './utils.js';
 
 // 连接相关变量
 let isConnected = false;
 let connectionCheckInterval = null;
+let eventSource = null; // 后端LCU事件推送连接
+
+// 对局结束的游戏流程阶段（后端在此阶段将战绩标记为需要更新，更早的PreEndOfGame可能仍读到旧的战绩）
+const END_OF_GAME_PHASES = ['EndOfGame'];
+
+// 对局结束时EndOfGame阶段和end_of_game事件几乎同时到达，合并为一次刷新
+const REFRESH_AFTER_GAME_DELAY = 2000;
+
+// 可以获取到对局玩家列表的游戏流程阶段
+const LOBBY_PHASES = ['ChampSelect', 'InProgress'];
+
+// 订阅后端推送的LCU事件，连接建立后停止定时轮询
+export function startEventSubscription() {
+    if (!window.EventSource || eventSource) return;
+    
+    eventSource = new EventSource('/api/events');
+    
+    eventSource.onopen = () => {
+        console.log('已订阅LCU事件推送，停止定时轮询');
+        stopConnectionCheck();
+    };
+    
+    eventSource.onmessage = (e) => {
+        try {
+            handleLcuEvent(JSON.parse(e.data));
+        } catch (error) {
+            console.error('处理LCU事件时出错:', error);
+        }
+    };
+    
+    eventSource.onerror = () => {
+        // 后端不支持事件推送时连接会被关闭，断线时EventSource会自动重连，期间恢复定时轮询
+        if (eventSource.readyState === EventSource.CLOSED) {
+            eventSource = null;
+        }
+        if (!connectionCheckInterval) {
+            startScheduleConnectionCheck();
+        }
+    };
+}
+
+// 处理LCU事件，按事件使缓存失效而不是依赖定时刷新
+function handleLcuEvent(event) {
+    switch (event.type) {
+        case 'connection':
+            // 客户端启动或退出
+            checkConnection();
+            break;
+        case 'summoner':
+            // 当前召唤师信息变化（头像、等级、切换账号等）
+            api.clearCacheByPrefix('currentSummoner');
+            if (isConnected) {
+                loadSummonerData();
+            }
+            break;
+        case 'gameflow':
+            if (END_OF_GAME_PHASES.includes(event.phase)) {
+                scheduleRefreshAfterGame();
+            } else if (LOBBY_PHASES.includes(event.phase)) {
+                // 提前获取所有玩家的数据，查看玩家卡片时直接使用缓存
+                api.getLobbySnapshot();
+            }
+            break;
+        case 'end_of_game':
+            scheduleRefreshAfterGame();
+            break;
+    }
+}
+
+// 对局结束后刷新排位和战绩
+const scheduleRefreshAfterGame = debounce(() => refreshAfterGame(), REFRESH_AFTER_GAME_DELAY, 'refreshAfterGame');
+
+async function refreshAfterGame() {
+    if (!currentSummoner || !currentSummoner.puuid) return;
+    
+    const puuid = currentSummoner.puuid;
+    api.clearCacheByPrefix(`rankedStats_${puuid}`);
+    api.clearCacheByPrefix(`matchHistory_${puuid}`);
+    loadRankedData(puuid);
+    
+    // 正在查看自己的战绩时重新加载第一页
+    const activePage = document.querySelector('.page.active');
+    const { viewingPlayerInfo } = await import('./navigation.js');
+    if (activePage && activePage.id === 'match-history-page' && !viewingPlayerInfo) {
+        const { loadMatchHistory } = await import('./match-history.js');
+        loadMatchHistory();
+    }
+}
 
 // 开启定时检测
 export function startScheduleConnectionCheck() {
+    if (connectionCheckInterval) return;
+    
     // 设置定期检查连接状态
     connectionCheckInterval = setInterval(() => {
         checkConnection();
@@ -15,10 +15,10 @@ export const STRINGS = {
     INFO: '提示'
 };
 
-// 图片基础URL
+// 图片基础URL（后端从本地客户端获取并缓存图标，按ID访问，不需要扩展名）
 export const IMAGE_URLS = {
-    CHAMPION_BASE: 'http://ddragon.leagueoflegends.com/cdn/15.10.1/img/champion/',
-    SPELL_BASE: 'http://ddragon.leagueoflegends.com/cdn/15.10.1/img/spell/',
-    ITEM_BASE: 'http://ddragon.leagueoflegends.com/cdn/15.10.1/img/item/',
-    PROFILE_ICON_BASE: 'https://ddragon.leagueoflegends.com/cdn/15.10.1/img/profileicon/'
+    CHAMPION_BASE: '/api/asset/champion/',
+    SPELL_BASE: '/api/asset/spell/',
+    ITEM_BASE: '/api/asset/item/',
+    PROFILE_ICON_BASE: '/api/asset/profileicon/'
 }; 
\ No newline at end of file
@@ -2,6 +2,18 @@ export function calculateHorseRank(matchData) {
     const participants = matchData.data.participants;
     const gameDuration = matchData.data.gameDuration;
 
+    // 后端已批量计算好评分时直接使用
+    if (matchData.horseRanks) {
+        participants.forEach(participant => {
+            const rank = matchData.horseRanks[participant.participantId];
+            if (rank) {
+                participant.horseRankScore = rank.score;
+                participant.horseRank = rank.rank;
+            }
+        });
+        if (participants.every(participant => participant.horseRank)) return matchData;
+    }
+
     // 计算团队总伤害、总击杀和总助攻
     let team1TotalDamage = 0;
     let team2TotalDamage = 0;
@@ -1,5 +1,5 @@
 import { api, cleanupExpiredCache } from './api.js';
-import { checkConnection, startScheduleConnectionCheck } from './connection.js';
+import { checkConnection, startScheduleConnectionCheck, startEventSubscription } from './connection.js';
 import { initializeNavigation } from './navigation.js';
 import { initializeDarkMode } from './settings.js';
 import { initializePlayerCard } from './player-card.js';
@@ -66,7 +66,8 @@ export function initializeApp() {
     // 隐藏加载屏幕
     setTimeout(() => {
         document.getElementById('app-loading').style.display = 'none';
-        // 开启定时检测
+        // 订阅LCU事件推送，不支持时回退到定时检测
+        startEventSubscription();
         startScheduleConnectionCheck();
     }, 2000);
 
@@ -1,7 +1,7 @@
 import { api } from './api.js';
 import { showToast } from './ui-utils.js';
 import { debounce } from './utils.js';
-import { formatTimestamp, formatGameDuration, getGameMode, getChampionKey, getSpellKey, formatLargeNumber } from './utils.js';
+import { formatTimestamp, formatGameDuration, getGameMode, formatLargeNumber } from './utils.js';
 import { STRINGS } from './constants.js';
 import { IMAGE_URLS } from './constants.js';
 import { currentSummoner } from './summoner.js';
@@ -9,12 +9,46 @@ import { showPlayerCard } from './player-card.js';
 import { getConnectionStatus } from './connection.js';
 import { viewingPlayerInfo } from './navigation.js';
 import { calculateHorseRank, getHorseRankCN } from './horse-tag.js';
+import { prefetcher, prefetchMatchPage } from './prefetch.js';
+import { VirtualList } from './virtual-list.js';
 
 // 全局变量
-export let currentMatchPage = 1; // 当前战绩页码
+export let currentMatchPage = 1; // 当前战绩页码（按列表顶部可见的对局计算）
 export let matchesPerPage = 7; // 每页显示的战绩数量
 export let hasMoreMatches = true; // 是否有更多战绩
 
+// 战绩列表：连续的虚拟列表，翻页按钮滚动到对应位置，滚动到末尾时自动加载下一页
+let matchList = null;
+
+// 当前列表的数据来源；generation在重新加载时递增，丢弃过期的请求结果
+const listSource = { puuid: null, nextIndex: 0, loading: null, generation: 0 };
+
+// 展开了详情的对局，卡片被回收后重新渲染时保持展开
+const expandedMatches = new Set();
+
+function getMatchList() {
+    if (!matchList) {
+        const matchesContainer = document.getElementById('matches-container');
+        matchList = new VirtualList(matchesContainer, {
+            renderItem: renderMatchCard,
+            estimatedHeight: 110,
+            onRangeChange: updatePagination,
+            onNearEnd: () => loadMoreMatches()
+        });
+        initializeMatchListEvents(matchesContainer);
+    }
+    return matchList;
+}
+
+// 清空战绩列表（切换玩家或重新加载前调用）
+export function clearMatchList() {
+    listSource.generation++;
+    listSource.puuid = null;
+    listSource.loading = null;
+    expandedMatches.clear();
+    getMatchList().clear();
+}
+
 // 初始化按钮事件
 export function initializeButtons() {
     // 刷新战绩按钮
@@ -26,7 +60,7 @@ export function initializeButtons() {
             
             if (viewingPlayerInfo && viewingPlayerInfo.puuid) {
                 // 刷新其他玩家的战绩
-                loadPlayerMatchHistory(viewingPlayerInfo.puuid, 0, matchesPerPage - 1);
+                loadMatchHistory(0, matchesPerPage - 1, false, viewingPlayerInfo.puuid);
             } else {
                 // 刷新自己的战绩
                 loadMatchHistory(0, matchesPerPage - 1, false);
@@ -40,44 +74,33 @@ export function initializeButtons() {
             refreshSummonerInfo();
         }, 500, 'refresh-summoner'));
         
-    // 分页按钮事件
+    // 分页按钮事件：滚动到上一页/下一页的第一场对局，下一页尚未加载时先加载
     document.getElementById('prev-page-btn').addEventListener('click', 
         debounce(function() {
             if (currentMatchPage > 1) {
-                currentMatchPage--;
-                const beginIndex = (currentMatchPage - 1) * matchesPerPage;
-                const endIndex = beginIndex + matchesPerPage - 1;
-                
-                if (viewingPlayerInfo && viewingPlayerInfo.puuid) {
-                    // 加载其他玩家的战绩
-                    loadPlayerMatchHistory(viewingPlayerInfo.puuid, beginIndex, endIndex);
-                } else {
-                    // 加载自己的战绩
-                    loadMatchHistory(beginIndex, endIndex, false);
-                }
+                getMatchList().scrollToIndex((currentMatchPage - 2) * matchesPerPage);
             }
         }, 300, 'prev-page'));
         
     document.getElementById('next-page-btn').addEventListener('click', 
-        debounce(function() {
-            if (hasMoreMatches) {
-                currentMatchPage++;
-                const beginIndex = (currentMatchPage - 1) * matchesPerPage;
-                const endIndex = beginIndex + matchesPerPage - 1;
-                
-                if (viewingPlayerInfo && viewingPlayerInfo.puuid) {
-                    // 加载其他玩家的战绩
-                    loadPlayerMatchHistory(viewingPlayerInfo.puuid, beginIndex, endIndex);
-                } else {
-                    // 加载自己的战绩
-                    loadMatchHistory(beginIndex, endIndex, false);
-                }
+        debounce(async function() {
+            const list = getMatchList();
+            const targetIndex = currentMatchPage * matchesPerPage;
+            if (targetIndex >= list.items.length && hasMoreMatches) {
+                await loadMoreMatches();
             }
+            list.scrollToIndex(targetIndex);
         }, 300, 'next-page'));
 }
 
-// 加载战绩历史
-export async function loadMatchHistory(beginIndex = 0, endIndex = 6, appendData = false) {
+// 加载战绩历史（从beginIndex开始重新加载列表）
+// puuid为空时加载自己的战绩；返回接口结果
+export async function loadMatchHistory(beginIndex = 0, endIndex = 6, appendData = false, puuid = null) {
+    if (appendData) {
+        await loadMoreMatches();
+        return;
+    }
+    
     const matchLoading = document.getElementById('matches-loading');
     const matchesContainer = document.getElementById('matches-container');
     const paginationContainer = document.getElementById('pagination-container');
@@ -85,259 +108,276 @@ export async function loadMatchHistory(beginIndex = 0, endIndex = 6, appendData
     const nextPageBtn = document.getElementById('next-page-btn');
     const currentPageSpan = document.getElementById('current-page');
     
-    // 如果不是追加模式，清空之前的内容并显示加载动画
-    if (!appendData) {
-        matchesContainer.innerHTML = '';
-        matchLoading.style.display = 'flex';
-        
-        // 更新当前页码显示
-        currentPageSpan.textContent = currentMatchPage.toString();
-        
-        // 设置上一页按钮状态
-        prevPageBtn.disabled = currentMatchPage <= 1;
-        
-        // 暂时禁用下一页按钮，直到加载完成确定是否有更多数据
-        nextPageBtn.disabled = true;
-    } else {
-        // 追加模式下，显示加载更多的指示器
-        const loadingMore = document.createElement('div');
-        loadingMore.className = 'loading-more-container';
-        loadingMore.innerHTML = `
-            <div class="spinner small-spinner"></div>
-            <p>加载更多...</p>
-        `;
-        matchesContainer.appendChild(loadingMore);
-    }
+    // 丢弃上一页排队中的预取
+    prefetcher.clear();
+    
+    // 清空之前的内容并显示加载动画
+    clearMatchList();
+    const generation = listSource.generation;
+    matchLoading.style.display = 'flex';
+    
+    // 更新当前页码显示
+    currentMatchPage = Math.floor(beginIndex / matchesPerPage) + 1;
+    currentPageSpan.textContent = currentMatchPage.toString();
     
-    if (!currentSummoner || !currentSummoner.puuid) {
+    // 设置上一页按钮状态
+    prevPageBtn.disabled = true;
+    
+    // 暂时禁用下一页按钮，直到加载完成确定是否有更多数据
+    nextPageBtn.disabled = true;
+    
+    const targetPuuid = puuid || (currentSummoner && currentSummoner.puuid);
+    if (!targetPuuid) {
         console.error('无法加载战绩，用户信息不完整');
         matchesContainer.innerHTML = `<div class="error-message">尚未连接到客户端或获取用户信息，请先连接并获取用户信息</div>`;
         matchLoading.style.display = 'none';
         paginationContainer.style.display = 'none';
-        return;
+        return { status: 'error', message: '用户信息不完整' };
     }
     
     try {
         // 获取战绩数据
-        const result = await api.getMatchHistory(currentSummoner.puuid, beginIndex, endIndex);
+        const result = await api.getMatchHistory(targetPuuid, beginIndex, endIndex);
         
-        // 如果正在加载更多，先删除加载更多指示器
-        if (appendData) {
-            const loadingMore = matchesContainer.querySelector('.loading-more-container');
-            if (loadingMore) {
-                matchesContainer.removeChild(loadingMore);
-            }
-        }
+        // 等待期间已经切换到其他玩家或重新加载
+        if (generation !== listSource.generation) return result;
         
         if (result.status === 'success') {
+            const games = (result.data && result.data.games && result.data.games.games) || [];
+            
+            // 如果返回的战绩数量小于请求的数量，说明没有更多数据了
+            listSource.puuid = targetPuuid;
+            listSource.nextIndex = endIndex + 1;
+            hasMoreMatches = games.length >= endIndex - beginIndex + 1;
+            
             // 渲染战绩
-            renderMatchHistory(result.data, appendData);
+            renderMatchHistory(result.data, false);
             
-            // 更新分页控件可见性
+            // 更新分页控件
             paginationContainer.style.display = 'flex';
+            updatePagination();
             
-            // 确定是否有更多数据可加载
-            if (result.data && result.data.games && result.data.games.games) {
-                // 如果返回的战绩数量小于请求的数量，说明没有更多数据了
-                hasMoreMatches = result.data.games.games.length >= matchesPerPage;
-                nextPageBtn.disabled = !hasMoreMatches;
-            } else {
-                hasMoreMatches = false;
-                nextPageBtn.disabled = true;
-            }
+            // 空闲时预取本页对局详情和下一页战绩
+            prefetchMatchPage(targetPuuid, beginIndex, endIndex, games, hasMoreMatches);
         } else {
-            if (!appendData) {
-                matchesContainer.innerHTML = `<div class="error-message">加载对局记录失败: ${result.message || '未知错误'}</div>`;
-                paginationContainer.style.display = 'none';
-            } else {
-                // 追加模式下的错误处理
-                const errorMsg = document.createElement('div');
-                errorMsg.className = 'error-message';
-                errorMsg.textContent = `加载更多对局记录失败: ${result.message || '未知错误'}`;
-                matchesContainer.appendChild(errorMsg);
-            }
+            matchesContainer.innerHTML = `<div class="error-message">加载对局记录失败: ${result.message || '未知错误'}</div>`;
+            paginationContainer.style.display = 'none';
         }
         
         // 隐藏加载动画，显示内容
         matchLoading.style.display = 'none';
+        return result;
     } catch (error) {
         console.error('加载战绩时出错:', error);
         
-        if (!appendData) {
+        if (generation === listSource.generation) {
             matchesContainer.innerHTML = `<div class="error-message">加载对局记录失败: ${error.message || '未知错误'}</div>`;
             paginationContainer.style.display = 'none';
-        } else {
-            // 追加模式下的错误处理
-            const loadingMore = matchesContainer.querySelector('.loading-more-container');
-            if (loadingMore) {
-                matchesContainer.removeChild(loadingMore);
-            }
-            
-            const errorMsg = document.createElement('div');
-            errorMsg.className = 'error-message';
-            errorMsg.textContent = `加载更多对局记录失败: ${error.message || '未知错误'}`;
-            matchesContainer.appendChild(errorMsg);
+            matchLoading.style.display = 'none';
         }
-        
-        matchLoading.style.display = 'none';
+        return { status: 'error', message: error.message || '未知错误' };
     }
 }
 
+// 加载下一页战绩并追加到列表末尾（滚动到末尾或点击下一页时调用）
+export function loadMoreMatches() {
+    if (!listSource.puuid || !hasMoreMatches) return Promise.resolve();
+    if (listSource.loading) return listSource.loading;
+    
+    const { puuid, generation } = listSource;
+    const beginIndex = listSource.nextIndex;
+    const endIndex = beginIndex + matchesPerPage - 1;
+    
+    const request = api.getMatchHistory(puuid, beginIndex, endIndex).then(result => {
+        if (generation !== listSource.generation) return;
+        
+        if (result.status !== 'success') {
+            showToast(`加载更多对局记录失败: ${result.message || '未知错误'}`, 'error');
+            return;
+        }
+        
+        const games = (result.data && result.data.games && result.data.games.games) || [];
+        listSource.nextIndex = endIndex + 1;
+        hasMoreMatches = games.length >= matchesPerPage;
+        
+        renderMatchHistory(result.data, true);
+        updatePagination();
+        prefetchMatchPage(puuid, beginIndex, endIndex, games, hasMoreMatches);
+    }).finally(() => {
+        if (listSource.loading === request) {
+            listSource.loading = null;
+        }
+    });
+    
+    listSource.loading = request;
+    return request;
+}
+
+// 按列表顶部可见的对局更新页码和翻页按钮
+function updatePagination() {
+    const list = getMatchList();
+    currentMatchPage = Math.floor(list.firstVisible / matchesPerPage) + 1;
+    
+    document.getElementById('current-page').textContent = currentMatchPage.toString();
+    document.getElementById('prev-page-btn').disabled = currentMatchPage <= 1;
+    document.getElementById('next-page-btn').disabled =
+        !hasMoreMatches && currentMatchPage * matchesPerPage >= list.items.length;
+}
+
 // 渲染战绩历史
 export function renderMatchHistory(data, appendData = false) {
     const matchesContainer = document.getElementById('matches-container');
+    const list = getMatchList();
     
     // 检查数据是否为空
     if (!data || !data.games || !data.games.games || data.games.games.length === 0) {
         if (!appendData) {
+            list.clear();
             matchesContainer.innerHTML = `<div class="no-data">${STRINGS.NO_DATA}</div>`;
-        } else {
-            // 追加模式下不覆盖现有内容，只显示一个提示
-            const noMoreData = document.createElement('div');
-            noMoreData.className = 'no-more-data';
-            noMoreData.textContent = '没有更多的战绩记录';
-            matchesContainer.appendChild(noMoreData);
         }
         return;
     }
 
-    const games = data.games.games;
+    // 列表只保存渲染卡片用到的字段，不保留完整的战绩数据
+    const summaries = data.games.games.map(summarizeGame);
     
-    // 创建文档片段来减少DOM操作
-    const fragment = document.createDocumentFragment();
+    if (appendData) {
+        list.append(summaries);
+    } else {
+        expandedMatches.clear();
+        list.setItems(summaries);
+    }
+}
 
-    games.forEach(game => {
-        // 找到当前玩家在这场比赛中的数据
-        let participant = game.participants[0];
+// 提取战绩卡片用到的字段
+function summarizeGame(game) {
+    // 战绩接口返回的participants只包含当前玩家
+    const participant = game.participants[0];
+    const stats = participant.stats;
+    
+    return {
+        gameId: String(game.gameId),
+        queueId: game.queueId,
+        gameCreation: game.gameCreation,
+        gameDuration: game.gameDuration,
+        championId: participant.championId,
+        spell1Id: participant.spell1Id,
+        spell2Id: participant.spell2Id,
+        win: stats.win,
+        kills: stats.kills || 0,
+        deaths: stats.deaths || 0,
+        assists: stats.assists || 0,
+        items: [stats.item0, stats.item1, stats.item2, stats.item3, stats.item4, stats.item5, stats.item6]
+    };
+}
 
-        // 判断是否获胜
-        const isWin = participant.stats.win;
-        
-        // 获取游戏模式
-        const queueId = game.queueId;
-        const gameMode = getGameMode(queueId);
-        
-        // 获取KDA
-        const kills = participant.stats.kills || 0;
-        const deaths = participant.stats.deaths || 0;
-        const assists = participant.stats.assists || 0;
-        const kda = deaths === 0 ? 'Perfect' : ((kills + assists) / deaths).toFixed(2);
-        
-        // 获取英雄信息
-        const championId = participant.championId;
-        const championKey = getChampionKey(championId);
-        const spell1Key = getSpellKey(participant.spell1Id);
-        const spell2Key = getSpellKey(participant.spell2Id);
+// 把对局渲染到战绩卡片节点（节点可能是回收复用的）
+function renderMatchCard(matchCard, match) {
+    const isWin = match.win;
+    const gameMode = getGameMode(match.queueId);
+    const kda = match.deaths === 0 ? 'Perfect' : ((match.kills + match.assists) / match.deaths).toFixed(2);
 
-        // 创建战绩卡片
-        const matchCard = document.createElement('div');
-        matchCard.className = `match-card ${isWin ? 'win' : 'loss'}`;
-        matchCard.dataset.matchId = game.gameId; // 存储matchId用于事件委托
-        
-        // 性能优化：使用模板字符串一次性构建HTML
-        // 使用懒加载图片 (loading="lazy")
-        matchCard.innerHTML = `
-            <div class="match-content">
-                <div class="match-info">
-                    <div class="match-type">${gameMode}</div>
-                    <div class="match-time">${formatTimestamp(game.gameCreation)}</div>
-                    <div class="match-divider"></div>
-                    <div class="match-result ${isWin ? 'win' : 'loss'}">${isWin ? '胜利' : '失败'}</div>
-                    <div class="match-duration">${formatGameDuration(game.gameDuration)}</div>
-                </div>
-                <div class="champion-info">
-                    <img class="champion-icon" loading="lazy" src="${IMAGE_URLS.CHAMPION_BASE}${championKey}.png" alt="英雄">
-                    <div class="spells">
-                        <img class="spell-icon" loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${spell1Key}.png" alt="技能1">
-                        <img class="spell-icon" loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${spell2Key}.png" alt="技能2">
-                    </div>
-                    <div class="kda">
-                        <span>${kills}</span> / <span class="deaths">${deaths}</span> / <span>${assists}</span>
-                        <div class="kda-ratio">KDA: ${kda}</div>
-                    </div>
-                    <div class="items">
-                        ${renderItems(participant.stats)}
-                    </div>
+    matchCard.className = `match-card ${isWin ? 'win' : 'loss'}`;
+    matchCard.dataset.matchId = match.gameId; // 存储matchId用于事件委托
+    
+    // 性能优化：使用模板字符串一次性构建HTML
+    // 使用懒加载图片 (loading="lazy")
+    matchCard.innerHTML = `
+        <div class="match-content">
+            <div class="match-info">
+                <div class="match-type">${gameMode}</div>
+                <div class="match-time">${formatTimestamp(match.gameCreation)}</div>
+                <div class="match-divider"></div>
+                <div class="match-result ${isWin ? 'win' : 'loss'}">${isWin ? '胜利' : '失败'}</div>
+                <div class="match-duration">${formatGameDuration(match.gameDuration)}</div>
+            </div>
+            <div class="champion-info">
+                <img class="champion-icon" loading="lazy" src="${IMAGE_URLS.CHAMPION_BASE}${match.championId}" alt="英雄">
+                <div class="spells">
+                    <img class="spell-icon" loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${match.spell1Id}" alt="技能1">
+                    <img class="spell-icon" loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${match.spell2Id}" alt="技能2">
                 </div>
-                <div class="other-info">
-                    <!-- 预留内容 -->
+                <div class="kda">
+                    <span>${match.kills}</span> / <span class="deaths">${match.deaths}</span> / <span>${match.assists}</span>
+                    <div class="kda-ratio">KDA: ${kda}</div>
                 </div>
-                <div class="down-button">
-                    <button class="expand-btn" data-match-id="${game.gameId}" title="查看详情">
-                        <i class="ri-arrow-down-s-line"></i>
-                    </button>
+                <div class="items">
+                    ${renderItems(match.items)}
                 </div>
             </div>
-            <div class="match-details" id="match-details-${game.gameId}">
-                <div id="detail-content-${game.gameId}">
-                    <div class="loading-container" style="height: 150px;">
-                        <div class="spinner"></div>
-                        <p>${STRINGS.LOADING}</p>
-                    </div>
+            <div class="other-info">
+                <!-- 预留内容 -->
+            </div>
+            <div class="down-button">
+                <button class="expand-btn" data-match-id="${match.gameId}" title="查看详情">
+                    <i class="ri-arrow-down-s-line"></i>
+                </button>
+            </div>
+        </div>
+        <div class="match-details" id="match-details-${match.gameId}">
+            <div id="detail-content-${match.gameId}">
+                <div class="loading-container" style="height: 150px;">
+                    <div class="spinner"></div>
+                    <p>${STRINGS.LOADING}</p>
                 </div>
             </div>
-        `;
-
-        fragment.appendChild(matchCard);
-    });
+        </div>
+    `;
     
-    // 一次性添加所有卡片到容器
-    if (!appendData) {
-        matchesContainer.innerHTML = '';
+    // 之前展开过的对局保持展开（详情已缓存，直接渲染）
+    if (expandedMatches.has(match.gameId)) {
+        const detailsContainer = matchCard.querySelector('.match-details');
+        matchCard.querySelector('.expand-btn').classList.add('active');
+        detailsContainer.classList.add('active');
+        loadMatchDetail(match.gameId, detailsContainer);
     }
-    matchesContainer.appendChild(fragment);
-    
-    // 使用事件委托为所有展开按钮添加点击事件
-    // 这比单独给每个按钮添加事件更高效
-    if (!matchesContainer.hasAttribute('data-has-event-delegation')) {
-        matchesContainer.addEventListener('click', function(e) {
-            // 寻找被点击的展开按钮
-            const expandBtn = e.target.closest('.expand-btn');
-            if (!expandBtn) return;
-            
-            const matchId = expandBtn.getAttribute('data-match-id');
-            if (!matchId) return;
-            
-            const detailsContainer = document.getElementById(`match-details-${matchId}`);
-            if (!detailsContainer) return;
-            
-            const isActive = detailsContainer.classList.contains('active');
-            
-            if (isActive) {
-                // 如果已经展开，则收起
-                expandBtn.classList.remove('active');
-                detailsContainer.classList.remove('active');
-            } else {
-                // 如果未展开，则展开并加载数据
-                expandBtn.classList.add('active');
-                detailsContainer.classList.add('active');
-                
-                // 加载对局详情数据
-                loadMatchDetail(matchId, detailsContainer);
-            }
-        });
+}
+
+// 使用事件委托为所有展开按钮添加点击事件（卡片节点会被回收复用，不能单独绑定）
+function initializeMatchListEvents(matchesContainer) {
+    matchesContainer.addEventListener('click', function(e) {
+        // 寻找被点击的展开按钮
+        const expandBtn = e.target.closest('.expand-btn');
+        if (!expandBtn) return;
         
-        // 标记已添加事件委托
-        matchesContainer.setAttribute('data-has-event-delegation', 'true');
-    }
+        const matchId = expandBtn.getAttribute('data-match-id');
+        if (!matchId) return;
+        
+        const detailsContainer = expandBtn.closest('.match-card').querySelector('.match-details');
+        if (!detailsContainer) return;
+        
+        const isActive = detailsContainer.classList.contains('active');
+        
+        if (isActive) {
+            // 如果已经展开，则收起
+            expandBtn.classList.remove('active');
+            detailsContainer.classList.remove('active');
+            expandedMatches.delete(matchId);
+        } else {
+            // 如果未展开，则展开并加载数据
+            expandBtn.classList.add('active');
+            detailsContainer.classList.add('active');
+            expandedMatches.add(matchId);
+            
+            // 加载对局详情数据
+            loadMatchDetail(matchId, detailsContainer);
+        }
+    });
 }
 
 // 渲染物品栏 - 优化
-function renderItems(stats) {
-    const itemIds = [
-        stats.item0, stats.item1, stats.item2,
-        stats.item3, stats.item4, stats.item5
-    ];
+function renderItems(items) {
+    const itemIds = items.slice(0, 6);
     
     // 将饰品(trinket)单独处理
-    const trinketId = stats.item6;
+    const trinketId = items[6];
 
     let itemsHtml = '';
 
     // 先添加主要装备
     itemIds.forEach((itemId) => {
         if (itemId && itemId !== 0) {
-            itemsHtml += `<img class="item-icon" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${itemId}.png" alt="物品">`;
+            itemsHtml += `<img class="item-icon" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${itemId}" alt="物品">`;
         } else {
             itemsHtml += `<div class="empty-item"></div>`;
         }
@@ -345,7 +385,7 @@ function renderItems(stats) {
     
     // 最后添加饰品
     if (trinketId && trinketId !== 0) {
-        itemsHtml += `<img class="item-icon trinket" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${trinketId}.png" alt="饰品">`;
+        itemsHtml += `<img class="item-icon trinket" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${trinketId}" alt="饰品">`;
     } else {
         itemsHtml += `<div class="empty-item trinket"></div>`;
     }
@@ -355,9 +395,11 @@ function renderItems(stats) {
 
 // 加载对局详情
 export async function loadMatchDetail(matchId, detailsContainer) {
+    // 在卡片节点内查找，卡片在列表中被回收后不再写入
+    const detailContent = detailsContainer.querySelector(`#detail-content-${matchId}`);
+    if (!detailContent) return;
+    
     try {
-        const detailContent = document.getElementById(`detail-content-${matchId}`);
-        
         // 显示加载中...
         detailContent.innerHTML = `
             <div class="loading-container" style="height: 150px;">
@@ -368,6 +410,7 @@ export async function loadMatchDetail(matchId, detailsContainer) {
         
         // 请求后端API获取详情数据
         const result = await api.getMatchDetail(matchId);
+        if (!detailContent.isConnected) return;
         
         if (result.status === 'success') {
             // 计算牛马标签
@@ -394,7 +437,7 @@ export async function loadMatchDetail(matchId, detailsContainer) {
         }
     } catch (error) {
         console.error('加载对局详情时出错:', error);
-        document.getElementById(`detail-content-${matchId}`).innerHTML = `
+        detailContent.innerHTML = `
             <div class="error-message">
                 <p>加载对局详情时出错：${error.message || STRINGS.UNKNOWN_ERROR}</p>
                 <button class="secondary-btn retry-btn" data-match-id="${matchId}">
@@ -404,7 +447,7 @@ export async function loadMatchDetail(matchId, detailsContainer) {
         `;
         
         // 添加重试按钮事件
-        const retryBtn = document.getElementById(`detail-content-${matchId}`).querySelector('.retry-btn');
+        const retryBtn = detailContent.querySelector('.retry-btn');
         if (retryBtn) {
             retryBtn.addEventListener('click', function() {
                 loadMatchDetail(matchId, detailsContainer);
@@ -532,11 +575,6 @@ function createPlayerRowElement(player, participantIdentities, currentPuuid) {
     const summonerName = `${playerInfo.gameName || playerInfo.summonerName || '未知玩家'}#${playerInfo.tagLine}`;
     const truncatedName = summonerName.length > 20 ? summonerName.substring(0, 10) + '...' : summonerName;
     
-    // 获取英雄和技能信息以准备渲染
-    const championKey = getChampionKey(player.championId);
-    const spell1Key = getSpellKey(player.spell1Id);
-    const spell2Key = getSpellKey(player.spell2Id);
-    
     // 创建玩家行
     const playerRow = document.createElement('div');
     playerRow.className = `compact-player-row ${isCurrent ? 'current-player' : ''}`;
@@ -545,10 +583,10 @@ function createPlayerRowElement(player, participantIdentities, currentPuuid) {
     playerRow.innerHTML = `
         <div class="player-info-cell">
             <div class="champion-summoner">
-                <img class="champion-avatar" loading="lazy" src="${IMAGE_URLS.CHAMPION_BASE}${championKey}.png" alt="英雄">
+                <img class="champion-avatar" loading="lazy" src="${IMAGE_URLS.CHAMPION_BASE}${player.championId}" alt="英雄">
                 <div class="summoner-spells">
-                    <img loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${spell1Key}.png" alt="技能1">
-                    <img loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${spell2Key}.png" alt="技能2">
+                    <img loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${player.spell1Id}" alt="技能1">
+                    <img loading="lazy" src="${IMAGE_URLS.SPELL_BASE}${player.spell2Id}" alt="技能2">
                 </div>
                 <div class="player-name clickable ${isCurrent ? 'current' : ''}" 
                      data-puuid="${playerInfo.puuid || ''}" 
@@ -625,7 +663,7 @@ function renderCompactItems(stats) {
     items.forEach(itemId => {
         if (itemId && itemId !== 0) {
             // 有装备，显示装备图标 (使用懒加载)
-            html += `<img class="item-icon" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${itemId}.png" alt="物品">`;
+            html += `<img class="item-icon" loading="lazy" src="${IMAGE_URLS.ITEM_BASE}${itemId}" alt="物品">`;
         } else {
             // 无装备，显示空装备槽
             html += `<div class="item-icon empty-item"></div>`;
@@ -1,6 +1,7 @@
-import { loadMatchHistory } from './match-history.js';
+import { loadMatchHistory, clearMatchList } from './match-history.js';
 import { currentSummoner } from './summoner.js';
 import { getConnectionStatus } from './connection.js';
+import { prefetcher } from './prefetch.js';
 
 // 导航堆栈
 let navigationStack = [];
@@ -36,6 +37,9 @@ export function initializeNavigation() {
                 return;
             }
 
+            // 切换页面时取消尚未完成的预取
+            prefetcher.cancel();
+
             // 更新菜单项状态
             menuItems.forEach(mi => mi.classList.remove('active'));
             this.classList.add('active');
@@ -59,7 +63,7 @@ export function initializeNavigation() {
                         const paginationContainer = document.getElementById('pagination-container');
                         
                         // 清空之前的内容
-                        matchesContainer.innerHTML = '';
+                        clearMatchList();
                         matchLoading.style.display = 'flex';
                         
                         // 重置页码
@@ -138,6 +142,8 @@ export function navigateBack() {
 
 // 导航到首页
 export function navigateToHome() {
+    prefetcher.cancel();
+    
     // 切换到个人信息页面
     document.querySelectorAll('.menu-item').forEach(item => item.classList.remove('active'));
     document.querySelector('.menu-item[data-page="summoner"]').classList.add('active');
@@ -154,6 +160,8 @@ export function navigateToHome() {
 
 // 导航到我的战绩页面
 export function navigateToMyHistory() {
+    prefetcher.cancel();
+    
     // 重置查看的玩家
     viewingPlayerInfo = null;
     
@@ -179,7 +187,7 @@ export function navigateToMyHistory() {
     const matchesContainer = document.getElementById('matches-container');
     const matchLoading = document.getElementById('matches-loading');
     
-    matchesContainer.innerHTML = '';
+    clearMatchList();
     matchLoading.style.display = 'flex';
     
     document.getElementById('current-page').textContent = '1';
@@ -201,6 +209,9 @@ export function showPlayerHistoryPage(puuid, gameName, tagLine) {
     // 保存导航历史
     addToNavigationStack();
     
+    // 切换玩家时取消之前玩家的预取
+    prefetcher.cancel();
+    
     // 存储查看的玩家信息
     viewingPlayerInfo = { puuid, gameName, tagLine };
     
@@ -223,11 +234,9 @@ export function showPlayerHistoryPage(puuid, gameName, tagLine) {
     addNavigationHeader(matchHistoryPage, gameName);
     
     // 显示加载界面
-    const matchesContainer = document.getElementById('matches-container');
     const matchLoading = document.getElementById('matches-loading');
-    const paginationContainer = document.getElementById('pagination-container');
     
-    matchesContainer.innerHTML = '';
+    clearMatchList();
     matchLoading.style.display = 'flex';
     
     // 重置页码
@@ -280,63 +289,11 @@ export async function loadPlayerMatchHistory(puuid, beginIndex = 0, endIndex = 6
         return;
     }
     
-    const matchLoading = document.getElementById('matches-loading');
-    const matchesContainer = document.getElementById('matches-container');
-    const paginationContainer = document.getElementById('pagination-container');
-    const prevPageBtn = document.getElementById('prev-page-btn');
-    const nextPageBtn = document.getElementById('next-page-btn');
-    const currentPageSpan = document.getElementById('current-page');
-    
-    // 清空之前的内容并显示加载动画
-    matchesContainer.innerHTML = '';
-    matchLoading.style.display = 'flex';
-    
-    // 更新当前页码显示
-    currentPageSpan.textContent = window.currentMatchPage.toString();
-    
-    // 设置上一页按钮状态
-    prevPageBtn.disabled = window.currentMatchPage <= 1;
-    
-    // 暂时禁用下一页按钮，直到加载完成确定是否有更多数据
-    nextPageBtn.disabled = true;
+    // 与自己的战绩共用同一个列表，翻页和滚动加载都按这个玩家进行
+    const result = await loadMatchHistory(beginIndex, endIndex, false, puuid);
     
-    try {
-        const { api } = await import('./api.js');
-        const { renderMatchHistory } = await import('./match-history.js');
-        
-        // 获取战绩数据
-        const result = await api.getMatchHistory(puuid, beginIndex, endIndex);
-        
-        if (result.status === 'success') {
-            // 渲染战绩
-            renderMatchHistory(result.data, false);
-            
-            // 更新分页控件可见性
-            paginationContainer.style.display = 'flex';
-            
-            // 确定是否有更多数据可加载
-            if (result.data && result.data.games && result.data.games.games) {
-                // 如果返回的战绩数量小于请求的数量，说明没有更多数据了
-                window.hasMoreMatches = result.data.games.games.length >= (endIndex - beginIndex + 1);
-                nextPageBtn.disabled = !window.hasMoreMatches;
-            } else {
-                window.hasMoreMatches = false;
-                nextPageBtn.disabled = true;
-            }
-        } else {
-            const { showToast } = await import('./ui-utils.js');
-            showToast(result.message || '加载对局记录失败', 'error');
-            
-            matchesContainer.innerHTML = `<div class="error-message">加载对局记录失败: ${result.message || '未知错误'}</div>`;
-            paginationContainer.style.display = 'none';
-        }
-        
-        // 隐藏加载动画，显示内容
-        matchLoading.style.display = 'none';
-    } catch (error) {
-        console.error('加载战绩时出错:', error);
-        matchesContainer.innerHTML = `<div class="error-message">加载对局记录失败: ${error.message || '未知错误'}</div>`;
-        paginationContainer.style.display = 'none';
-        matchLoading.style.display = 'none';
+    if (result && result.status !== 'success') {
+        const { showToast } = await import('./ui-utils.js');
+        showToast(result.message || '加载对局记录失败', 'error');
     }
-} 
\ No newline at end of file
+}
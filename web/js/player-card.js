@@ -3,7 +3,8 @@ import { showToast } from './ui-utils.js';
 import { showPlayerHistoryPage } from './navigation.js';
 import { viewingPlayerInfo } from './navigation.js';
 import { IMAGE_URLS } from './constants.js';
-import { getGameMode, getChampionKey, formatTimestamp } from './utils.js';
+import { getGameMode, formatTimestamp } from './utils.js';
+import { getHorseRankCN } from './horse-tag.js';
 
 // 初始化玩家卡片事件
 export function initializePlayerCard() {
@@ -61,10 +62,11 @@ export async function showPlayerCard(puuid, gameName, tagLine) {
     
     try {
         // 并行请求玩家数据
-        const [summonerResult, rankedResult, matchesResult] = await Promise.all([
+        const [summonerResult, rankedResult, matchesResult, summaryResult] = await Promise.all([
             api.getSummonerByPuuid(puuid),
             api.getRankedStats(puuid),
-            api.getMatchHistory(puuid, 0, 4)
+            api.getMatchHistory(puuid, 0, 4, 'card'),
+            api.getPlayerSummary(puuid)
         ]);
         
         // 检查玩家基本信息是否获取成功
@@ -75,8 +77,9 @@ export async function showPlayerCard(puuid, gameName, tagLine) {
         
         // 渲染玩家卡片内容
         renderPlayerCardContent(content, summonerResult.data, 
-            rankedResult.status === 'success' ? rankedResult.data : null, 
-            matchesResult.status === 'success' ? matchesResult.data : null);
+            rankedResult.status === 'success' ? rankedResult.data : null,
+            matchesResult.status === 'success' ? matchesResult.data : null,
+            summaryResult.status === 'success' ? summaryResult.data : null);
         
     } catch (error) {
         console.error('加载玩家信息时出错:', error);
@@ -85,13 +88,13 @@ export async function showPlayerCard(puuid, gameName, tagLine) {
 }
 
 // 渲染玩家卡片内容
-export function renderPlayerCardContent(container, summoner, rankedData, matchesData) {
+export function renderPlayerCardContent(container, summoner, rankedData, matchesData, summaryData = null) {
     // 创建玩家信息概要
     const summary = document.createElement('div');
     summary.className = 'player-summary';
     summary.innerHTML = `
         <div class="player-avatar">
-            <img src="${IMAGE_URLS.PROFILE_ICON_BASE}${summoner.profileIconId}.png" alt="玩家图标">
+            <img src="${IMAGE_URLS.PROFILE_ICON_BASE}${summoner.profileIconId}" alt="玩家图标">
             <div class="player-level">${summoner.summonerLevel}</div>
         </div>
         <div class="player-info">
@@ -136,7 +139,6 @@ export function renderPlayerCardContent(container, summoner, rankedData, matches
             
             const isWin = participant.stats.win;
             const championId = participant.championId;
-            const championKey = getChampionKey(championId);
             const kills = participant.stats.kills || 0;
             const deaths = participant.stats.deaths || 0;
             const assists = participant.stats.assists || 0;
@@ -144,7 +146,7 @@ export function renderPlayerCardContent(container, summoner, rankedData, matches
             const matchCard = document.createElement('div');
             matchCard.className = `simple-match-card ${isWin ? 'win' : 'loss'}`;
             matchCard.innerHTML = `
-                <img class="simple-champion" src="${IMAGE_URLS.CHAMPION_BASE}${championKey}.png" alt="英雄">
+                <img class="simple-champion" src="${IMAGE_URLS.CHAMPION_BASE}${championId}" alt="英雄">
                 <div class="simple-match-info">
                     <div class="simple-match-result">
                         <span class="result-${isWin ? 'win' : 'loss'}">${isWin ? '胜利' : '失败'}</span>
@@ -170,9 +172,43 @@ export function renderPlayerCardContent(container, summoner, rankedData, matches
     container.innerHTML = '';
     container.appendChild(summary);
     container.appendChild(ranks);
+    if (summaryData) {
+        container.appendChild(createPlayerStatsSummary(summaryData));
+    }
     container.appendChild(recentMatches);
 }
 
+// 创建汇总统计（后端按已获取的对局详情增量维护）
+function createPlayerStatsSummary(summaryData) {
+    const section = document.createElement('div');
+    section.className = 'player-stats-summary';
+    
+    const recent = summaryData.recent;
+    const horseRanks = Object.entries(recent.horse_ranks)
+        .sort((a, b) => b[1] - a[1])
+        .map(([rank, count]) => `${getHorseRankCN(rank)}×${count}`)
+        .join(' ');
+    const topChampions = summaryData.champions.slice(0, 3).map(champion => `
+        <div class="summary-champion">
+            <img src="${IMAGE_URLS.CHAMPION_BASE}${champion.championId}" alt="英雄">
+            <span>${champion.games}场 ${Math.round(champion.win_rate * 100)}% KDA ${champion.kda}</span>
+        </div>
+    `).join('');
+    
+    section.innerHTML = `
+        <h4>近期表现</h4>
+        <div class="summary-stats-row">
+            <span>近${recent.games}场胜率 ${Math.round(recent.win_rate * 100)}%</span>
+            <span>分均补兵 ${summaryData.avg_cpm}</span>
+            <span>伤害占比 ${Math.round(summaryData.avg_damage_share * 100)}%</span>
+        </div>
+        ${horseRanks ? `<div class="summary-stats-row">${horseRanks}</div>` : ''}
+        <div class="summary-champions">${topChampions}</div>
+    `;
+    
+    return section;
+}
+
 // 创建简单排位卡片
 function createSimpleRankCard(queueData, queueName) {
     const card = document.createElement('div');
@@ -0,0 +1,99 @@
+import { api } from './api.js';
+
+// 空闲时预取：当前页对局详情、下一页战绩
+// 任务逐个执行（同一时间最多一个预取请求），不会挤占用户操作触发的请求
+// 翻页时只丢弃排队中的任务（正在预取的往往就是用户要翻到的那一页），离开战绩页或切换玩家时全部取消
+
+// 任务优先级，数字小的先执行
+export const PREFETCH_PRIORITY = {
+    VISIBLE_DETAILS: 0, // 当前页的对局详情（用户随时可能展开）
+    NEXT_PAGE: 1,       // 下一页战绩
+};
+
+// 浏览器一直忙碌时，最多等待这么久也会执行
+const IDLE_TIMEOUT = 2000;
+
+// requestIdleCallback不可用时退化为setTimeout
+const requestIdle = window.requestIdleCallback
+    ? (callback) => window.requestIdleCallback(callback, { timeout: IDLE_TIMEOUT })
+    : (callback) => setTimeout(callback, 200);
+const cancelIdle = window.cancelIdleCallback || clearTimeout;
+
+class PrefetchScheduler {
+    constructor() {
+        this.queue = []; // { key, task, priority }
+        this.controller = new AbortController();
+        this.idleHandle = null;
+        this.running = false;
+    }
+
+    // 添加预取任务，相同key的任务只保留一个；task接收AbortSignal
+    schedule(key, task, priority = PREFETCH_PRIORITY.NEXT_PAGE) {
+        if (this.queue.some(item => item.key === key)) return;
+
+        this.queue.push({ key, task, priority });
+        this.queue.sort((a, b) => a.priority - b.priority);
+        this.pump();
+    }
+
+    // 丢弃排队中的任务，正在执行的请求继续完成
+    clear() {
+        this.queue = [];
+        if (this.idleHandle !== null) {
+            cancelIdle(this.idleHandle);
+            this.idleHandle = null;
+        }
+    }
+
+    // 丢弃排队中的任务，并中止正在执行的请求
+    cancel() {
+        this.clear();
+        this.controller.abort();
+        this.controller = new AbortController();
+    }
+
+    pump() {
+        if (this.running || this.idleHandle !== null || this.queue.length === 0) return;
+
+        this.idleHandle = requestIdle(async () => {
+            this.idleHandle = null;
+            const item = this.queue.shift();
+            if (!item) return;
+
+            const { signal } = this.controller;
+            this.running = true;
+            try {
+                await item.task(signal);
+            } catch (error) {
+                if (!signal.aborted) {
+                    console.warn(`预取失败 (${item.key}):`, error);
+                }
+            } finally {
+                this.running = false;
+                this.pump();
+            }
+        });
+    }
+}
+
+// 全局预取调度器
+export const prefetcher = new PrefetchScheduler();
+
+// 战绩页渲染完成后调用：预取当前页的对局详情，还有更多战绩时预取下一页
+export function prefetchMatchPage(puuid, beginIndex, endIndex, games, hasMore) {
+    if (games && games.length > 0) {
+        const matchIds = games.map(game => game.gameId);
+        prefetcher.schedule(`details_${matchIds.join(',')}`,
+            signal => api.getMatchDetails(matchIds, { signal, priority: 'low' }),
+            PREFETCH_PRIORITY.VISIBLE_DETAILS);
+    }
+
+    if (puuid && hasMore) {
+        const pageSize = endIndex - beginIndex + 1;
+        const nextBegin = endIndex + 1;
+        const nextEnd = endIndex + pageSize;
+        prefetcher.schedule(`history_${puuid}_${nextBegin}_${nextEnd}`,
+            signal => api.getMatchHistory(puuid, nextBegin, nextEnd, 'list', { signal, priority: 'low' }),
+            PREFETCH_PRIORITY.NEXT_PAGE);
+    }
+}
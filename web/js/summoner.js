@@ -49,7 +49,7 @@ export function updateSummonerDisplay(summoner) {
     
     if (summoner) {
         // 更新主用户信息
-        summonerIcon.src = `${IMAGE_URLS.PROFILE_ICON_BASE}${summoner.profileIconId}.png`;
+        summonerIcon.src = `${IMAGE_URLS.PROFILE_ICON_BASE}${summoner.profileIconId}`;
         summonerName.textContent = summoner.displayName || summoner.gameName || summoner.summonerName;
         summonerLevel.textContent = summoner.summonerLevel;
         
@@ -62,7 +62,7 @@ export function updateSummonerDisplay(summoner) {
     } else {
         // 重置为默认状态
         miniUserInfo.innerHTML = `<span>请先连接到系统</span>`;
-        summonerIcon.src = `${IMAGE_URLS.PROFILE_ICON_BASE}29.png`;
+        summonerIcon.src = `${IMAGE_URLS.PROFILE_ICON_BASE}29`;
         summonerName.textContent = STRINGS.UNKNOWN_USER;
         summonerLevel.textContent = '0';
         summonerTagline.textContent = '';
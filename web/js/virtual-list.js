@@ -0,0 +1,234 @@
+// 虚拟列表：只在DOM中保留可见区域及前后少量缓冲的条目，滚动时复用节点
+// 条目高度可以不同（例如展开了对局详情），渲染后实测并缓存，未渲染过的条目使用估计高度
+// 可见区域按容器相对于窗口的位置计算，不依赖具体是哪一层元素在滚动
+
+export class VirtualList {
+    /**
+     * @param {HTMLElement} container 列表容器，子节点完全由虚拟列表管理
+     * @param {Object} options
+     * @param {Function} options.renderItem (node, item, index) => void，把条目渲染到（可能是复用的）节点上
+     * @param {number} options.estimatedHeight 未测量条目的估计高度
+     * @param {number} options.overscan 可见区域前后额外渲染的条目数
+     * @param {Function} options.onRangeChange ({ start, end, firstVisible }) => void
+     * @param {Function} options.onNearEnd 渲染范围到达列表末尾时调用（用于加载更多）
+     */
+    constructor(container, { renderItem, estimatedHeight = 100, overscan = 4, onRangeChange = null, onNearEnd = null }) {
+        this.container = container;
+        this.renderItem = renderItem;
+        this.estimatedHeight = estimatedHeight;
+        this.overscan = overscan;
+        this.onRangeChange = onRangeChange;
+        this.onNearEnd = onNearEnd;
+
+        this.items = [];
+        this.heights = [];         // 实测高度（包括间距），未测量时为undefined
+        this.rendered = new Map(); // index -> 节点
+        this.pool = [];            // 移出可见区域、等待复用的节点
+        this.start = 0;
+        this.end = -1;
+        this.firstVisible = 0;
+        this.nearEndKey = null;
+        this.frame = null;
+
+        // 滚动事件不冒泡，在捕获阶段监听所有滚动
+        this.handleScroll = () => this.scheduleUpdate();
+        document.addEventListener('scroll', this.handleScroll, { capture: true, passive: true });
+        window.addEventListener('resize', this.handleScroll);
+
+        // 条目高度变化（展开详情、图片加载）或列表从隐藏变为显示时重新计算
+        this.resizeObserver = new ResizeObserver(() => this.scheduleUpdate());
+        this.resizeObserver.observe(container);
+    }
+
+    // 替换全部条目
+    setItems(items) {
+        this.items = items.slice();
+        this.heights = [];
+        this.releaseAll();
+        this.update();
+    }
+
+    // 在末尾追加条目
+    append(items) {
+        this.items.push(...items);
+        this.update();
+    }
+
+    // 清空列表
+    clear() {
+        this.items = [];
+        this.heights = [];
+        this.releaseAll();
+        this.container.replaceChildren();
+        this.container.style.paddingTop = '';
+        this.container.style.paddingBottom = '';
+    }
+
+    // 滚动到指定条目
+    scrollToIndex(index) {
+        if (index < 0 || index >= this.items.length) return;
+
+        const scroller = findScrollParent(this.container);
+        const offset = this.offsets()[index];
+        const delta = this.container.getBoundingClientRect().top + offset - scroller.getBoundingClientRect().top;
+        scroller.scrollTop += delta;
+        this.update();
+    }
+
+    scheduleUpdate() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.update());
+        }
+    }
+
+    update() {
+        if (this.frame !== null) {
+            cancelAnimationFrame(this.frame);
+            this.frame = null;
+        }
+
+        const count = this.items.length;
+        if (count === 0) return;
+
+        const offsets = this.offsets();
+
+        // 可见区域（相对于容器顶部）
+        const rect = this.container.getBoundingClientRect();
+        const viewTop = Math.max(0, -rect.top);
+        const viewBottom = Math.max(viewTop, window.innerHeight - rect.top);
+
+        const firstVisible = Math.min(count - 1, upperBound(offsets, viewTop) - 1);
+        const lastVisible = Math.min(count - 1, Math.max(firstVisible, lowerBound(offsets, viewBottom) - 1));
+        const start = Math.max(0, firstVisible - this.overscan);
+        const end = Math.min(count - 1, lastVisible + this.overscan);
+
+        if (start !== this.start || end !== this.end || this.rendered.size !== end - start + 1) {
+            this.renderRange(start, end);
+        }
+
+        // 实测高度与之前使用的高度不同时，下一帧再按实测高度计算一次范围
+        let finalOffsets = offsets;
+        if (this.measure(firstVisible)) {
+            finalOffsets = this.offsets();
+            this.scheduleUpdate();
+        }
+
+        this.container.style.paddingTop = `${finalOffsets[start]}px`;
+        this.container.style.paddingBottom = `${finalOffsets[count] - finalOffsets[end + 1]}px`;
+
+        if (firstVisible !== this.firstVisible || start !== this.start || end !== this.end) {
+            this.firstVisible = firstVisible;
+            this.start = start;
+            this.end = end;
+            if (this.onRangeChange) this.onRangeChange({ start, end, firstVisible });
+        }
+
+        // 每个列表长度只通知一次到达末尾
+        if (end === count - 1 && this.nearEndKey !== count) {
+            this.nearEndKey = count;
+            if (this.onNearEnd) this.onNearEnd();
+        }
+    }
+
+    renderRange(start, end) {
+        // 回收移出范围的节点
+        this.rendered.forEach((node, index) => {
+            if (index < start || index > end) {
+                this.rendered.delete(index);
+                this.pool.push(node);
+            }
+        });
+
+        const nodes = [];
+        for (let index = start; index <= end; index++) {
+            let node = this.rendered.get(index);
+            if (!node) {
+                node = this.pool.pop() || document.createElement('div');
+                this.renderItem(node, this.items[index], index);
+                this.rendered.set(index, node);
+            }
+            nodes.push(node);
+        }
+
+        this.container.replaceChildren(...nodes);
+    }
+
+    // 测量已渲染节点的高度，返回是否有变化
+    // anchor（第一个可见条目）上方的条目高度变化时调整滚动位置，避免可见内容跳动
+    measure(anchor) {
+        let changed = false;
+        let shiftAbove = 0;
+        const gap = parseFloat(getComputedStyle(this.container).rowGap) || 0;
+
+        this.rendered.forEach((node, index) => {
+            if (!node.isConnected || node.offsetHeight === 0) return; // 列表被隐藏时不测量
+            const style = getComputedStyle(node);
+            const height = node.offsetHeight + parseFloat(style.marginTop) + parseFloat(style.marginBottom) + gap;
+            const previous = this.heights[index];
+            if (previous !== height) {
+                if (index < anchor) {
+                    shiftAbove += height - (previous ?? this.estimatedHeight);
+                }
+                this.heights[index] = height;
+                changed = true;
+            }
+        });
+
+        if (shiftAbove !== 0) {
+            findScrollParent(this.container).scrollTop += shiftAbove;
+        }
+        return changed;
+    }
+
+    // 各条目的起始位置（长度为条目数+1，最后一项为总高度）
+    offsets() {
+        const offsets = new Array(this.items.length + 1);
+        offsets[0] = 0;
+        for (let index = 0; index < this.items.length; index++) {
+            offsets[index + 1] = offsets[index] + (this.heights[index] ?? this.estimatedHeight);
+        }
+        return offsets;
+    }
+
+    releaseAll() {
+        this.rendered.forEach(node => this.pool.push(node));
+        this.rendered.clear();
+        this.start = 0;
+        this.end = -1;
+        this.firstVisible = 0;
+        this.nearEndKey = null;
+    }
+}
+
+// 第一个大于value的位置
+function upperBound(array, value) {
+    let low = 0;
+    let high = array.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (array[mid] <= value) low = mid + 1; else high = mid;
+    }
+    return low;
+}
+
+// 第一个大于等于value的位置
+function lowerBound(array, value) {
+    let low = 0;
+    let high = array.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (array[mid] < value) low = mid + 1; else high = mid;
+    }
+    return low;
+}
+
+// 查找实际在滚动的祖先元素
+function findScrollParent(element) {
+    for (let parent = element.parentElement; parent; parent = parent.parentElement) {
+        const overflowY = getComputedStyle(parent).overflowY;
+        if ((overflowY === 'auto' || overflowY === 'scroll') && parent.scrollHeight > parent.clientHeight) {
+            return parent;
+        }
+    }
+    return document.scrollingElement || document.documentElement;
+}